@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+本地 HTTP 渲染接口 - 供 ERP 等系统直接调用，不需要经过 Streamlit 页面
+
+接口:
+    POST /render              请求体为 SKU 配置 JSON（字段与 SKUConfig 构造函数一致），返回 PDF
+    POST /render?format=png   返回 PNG，可加 &max_width=2000 按预览分辨率渲染
+    POST /render?format=svg   返回 SVG（矢量文字和条码），字体和资源图片引用本服务的 /assets/...，
+                              只支持声明式样式（/styles 中 vector_output 为 true 的样式）
+    GET  /assets/<路径>        assets 目录下的字体和图片（供 SVG 引用）
+    GET  /styles              可用样式及其必需参数
+    GET  /health              存活检查
+    GET  /metrics             Prometheus 文本格式的运行统计
+
+渲染在进程池中进行：每个工作进程按 (样式, PPI) 缓存生成器，启动时预热常用组合，
+资源图片、面板缓存和静态图层模板在进程生命周期内只加载一次。
+渲染结果先写入临时文件，再分块流式返回，大幅面 PDF 不会在进程间整体传输。
+
+运行:
+    python api_server.py --port 8765 --workers 4 --warm mcombo_standard:300 barberpub_fulloverlap:300
+"""
+import argparse
+import json
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+import pathlib as Path
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, quote, unquote
+
+from generation_core_v2 import SKUConfig, BoxMarkGenerator
+from style_base import StyleRegistry
+from render_worker import ASSET_URL_PREFIX, init_render_worker, render_to_file
+
+
+BASE_DIR = Path.Path(__file__).parent
+STREAM_CHUNK_SIZE = 256 * 1024
+CONTENT_TYPES = {'pdf': 'application/pdf', 'png': 'image/png', 'svg': 'image/svg+xml'}
+# 请求计数按路由归类，未知路径统一记为 other，避免任意 URL 产生无限多的指标序列
+METRIC_ROUTES = ('/render', '/metrics', '/health', '/styles')
+
+
+# ---------------------------------------------------------------------------
+# 服务端
+# ---------------------------------------------------------------------------
+
+class RenderMetrics:
+    """线程安全的运行统计，按 Prometheus 文本格式输出"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.requests = {}  # (route, status) -> 次数
+        self.render_count = 0
+        self.render_seconds = 0.0
+        self.output_bytes = 0
+        self.in_flight = 0
+        self.rejected = 0
+
+    def count_request(self, path, status):
+        key = (request_route(path), status)
+        with self._lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def count_render(self, seconds, size):
+        with self._lock:
+            self.render_count += 1
+            self.render_seconds += seconds
+            self.output_bytes += size
+
+    def add_in_flight(self, delta):
+        with self._lock:
+            self.in_flight += delta
+
+    def count_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def render_text(self, workers, max_pending):
+        with self._lock:
+            lines = [
+                '# HELP boxmark_requests_total HTTP requests by route and status',
+                '# TYPE boxmark_requests_total counter',
+            ]
+            for (route, status), count in sorted(self.requests.items()):
+                lines.append(f'boxmark_requests_total{{route="{route}",status="{status}"}} {count}')
+            lines += [
+                '# TYPE boxmark_renders_total counter',
+                f'boxmark_renders_total {self.render_count}',
+                '# TYPE boxmark_render_seconds_sum counter',
+                f'boxmark_render_seconds_sum {self.render_seconds:.6f}',
+                '# TYPE boxmark_output_bytes_total counter',
+                f'boxmark_output_bytes_total {self.output_bytes}',
+                '# TYPE boxmark_rejected_total counter',
+                f'boxmark_rejected_total {self.rejected}',
+                '# TYPE boxmark_in_flight gauge',
+                f'boxmark_in_flight {self.in_flight}',
+                '# TYPE boxmark_workers gauge',
+                f'boxmark_workers {workers}',
+                '# TYPE boxmark_max_pending gauge',
+                f'boxmark_max_pending {max_pending}',
+                '# TYPE boxmark_uptime_seconds gauge',
+                f'boxmark_uptime_seconds {time.time() - self.started:.1f}',
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+def request_route(path):
+    """把请求路径归类为固定的几个路由标签：/render、/assets、/metrics 等，其余路径为 other"""
+    if path in METRIC_ROUTES:
+        return path
+    if path.startswith(ASSET_URL_PREFIX):
+        return ASSET_URL_PREFIX.rstrip('/')
+    return 'other'
+
+
+class RenderServer(ThreadingHTTPServer):
+    """
+    HTTP 渲染服务
+    - 每个连接一个线程，线程只负责收发数据，渲染交给进程池
+    - 排队中和运行中的请求超过 max_pending 时直接返回 503，避免请求无限堆积
+    """
+    daemon_threads = True
+
+    def __init__(self, address, workers=None, max_pending=None, warm=(), base_dir=BASE_DIR, template_dir=None):
+        super().__init__(address, RenderRequestHandler)
+        self.assets_dir = (Path.Path(base_dir) / 'assets').resolve()
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or max(64, self.workers * 8)
+        self.metrics = RenderMetrics()
+        self.spool_dir = tempfile.mkdtemp(prefix='boxmark-render-')
+        self._pending = threading.BoundedSemaphore(self.max_pending)
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=init_render_worker,
+            initargs=(base_dir, template_dir, self.spool_dir, tuple(warm)),
+        )
+        # 提交空任务让所有工作进程立即启动并完成预热，第一个请求不必等待加载资源
+        for future in [self.pool.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+    def render(self, config_data, output_format, max_width):
+        """提交渲染并等待结果；队列已满时返回 None"""
+        if not self._pending.acquire(blocking=False):
+            self.metrics.count_rejected()
+            return None
+        self.metrics.add_in_flight(1)
+        try:
+            path, size, seconds = self.pool.submit(render_to_file, config_data, output_format, max_width).result()
+        finally:
+            self.metrics.add_in_flight(-1)
+            self._pending.release()
+        self.metrics.count_render(seconds, size)
+        return path, size
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(cancel_futures=True)
+        for name in os.listdir(self.spool_dir):
+            os.remove(os.path.join(self.spool_dir, name))
+        os.rmdir(self.spool_dir)
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """请求处理：JSON 进，PDF / PNG 出（分块流式传输）"""
+    protocol_version = 'HTTP/1.1'
+    server_version = 'BoxMarkRender/1.0'
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/health':
+            self._send_json(200, {'status': 'ok'})
+        elif path == '/styles':
+            self._send_json(200, BoxMarkGenerator.list_available_styles())
+        elif path == '/metrics':
+            body = self.server.metrics.render_text(self.server.workers, self.server.max_pending).encode('utf-8')
+            self._send_bytes(200, body, 'text/plain; version=0.0.4; charset=utf-8')
+        elif path.startswith(ASSET_URL_PREFIX):
+            self._send_asset(unquote(path[len(ASSET_URL_PREFIX):]))
+        else:
+            self._send_json(404, {'error': f'未知路径: {path}'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        # 先读完请求体再响应（包括 404 / 400），保持 HTTP/1.1 连接可以继续复用
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            self.close_connection = True
+            self._send_json(400, {'error': 'Content-Length 无效'})
+            return
+        body = self.rfile.read(length)
+        if url.path != '/render':
+            self._send_json(404, {'error': f'未知路径: {url.path}'})
+            return
+        query = parse_qs(url.query)
+        output_format = query.get('format', ['pdf'])[0].lower()
+        if output_format not in CONTENT_TYPES:
+            self._send_json(400, {'error': f'不支持的输出格式: {output_format}，可选: {list(CONTENT_TYPES)}'})
+            return
+        try:
+            max_width = int(query['max_width'][0]) if 'max_width' in query else None
+            config_data = json.loads(body or b'null')
+            # 在收到请求的线程里先校验一遍，配置错误直接返回 400，不占用工作进程
+            sku_config = SKUConfig.from_dict(config_data)
+            if sku_config.style_name not in StyleRegistry.list_styles():
+                raise ValueError(f"未找到样式: {sku_config.style_name}")
+            if output_format == 'svg' and not StyleRegistry.supports_vector_output(sku_config.style_name):
+                raise ValueError(f"样式 {sku_config.style_name} 不支持 SVG 输出，请使用 pdf 或 png")
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        try:
+            rendered = self.server.render(config_data, output_format, max_width)
+        except Exception as e:
+            self._send_json(500, {'error': f'渲染失败: {e}'})
+            return
+        if rendered is None:
+            self._send_json(503, {'error': '渲染队列已满，请稍后重试'})
+            return
+
+        path, size = rendered
+        try:
+            self._stream_file(path, CONTENT_TYPES[output_format], f'{sku_config.sku_name}.{output_format}')
+        finally:
+            os.remove(path)
+
+    def _send_asset(self, relative):
+        """发送 assets 目录下的文件（不允许访问目录之外的路径），浏览器可长期缓存"""
+        path = (self.server.assets_dir / relative).resolve()
+        if not path.is_relative_to(self.server.assets_dir) or not path.is_file():
+            self._send_json(404, {'error': f'未找到资源: {relative}'})
+            return
+        content_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+        body = path.read_bytes()
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'max-age=86400')
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.metrics.count_request(ASSET_URL_PREFIX, 200)
+
+    def _stream_file(self, path, content_type, filename):
+        """按 STREAM_CHUNK_SIZE 分块（Transfer-Encoding: chunked）发送文件"""
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Disposition', content_disposition(filename))
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                self.wfile.write(f'{len(chunk):X}\r\n'.encode('ascii'))
+                self.wfile.write(chunk)
+                self.wfile.write(b'\r\n')
+        self.wfile.write(b'0\r\n\r\n')
+        self.server.metrics.count_request('/render', 200)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self._send_bytes(status, body, 'application/json; charset=utf-8')
+
+    def _send_bytes(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.metrics.count_request(urlparse(self.path).path, status)
+
+
+def content_disposition(filename):
+    """
+    附件文件名的 Content-Disposition 头（RFC 6266 / 5987）：filename* 为 UTF-8 编码的原文件名，
+    filename 为不支持 filename* 的客户端准备的 ASCII 回退（非 ASCII、引号和控制字符替换为 _）
+    """
+    fallback = ''.join(char if ' ' <= char <= '~' and char not in '"\\' else '_' for char in filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+def parse_warm_specs(specs):
+    """解析预热参数，格式为 样式名:PPI，如 mcombo_standard:300"""
+    warm = []
+    for spec in specs:
+        style_name, _, ppi = spec.partition(':')
+        warm.append((style_name, int(ppi or 300)))
+    return warm
+
+
+def main():
+    parser = argparse.ArgumentParser(description='箱唛本地 HTTP 渲染服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=None, help='渲染进程数，默认等于 CPU 核数')
+    parser.add_argument('--max-pending', type=int, default=None, help='排队+运行中的请求上限，默认为进程数的 8 倍，至少 64')
+    parser.add_argument('--warm', nargs='*', default=[], help='启动时预热的 样式名:PPI 组合')
+    parser.add_argument('--template-dir', default=None, help='静态图层模板的落盘目录（多个进程共享）')
+    args = parser.parse_args()
+
+    server = RenderServer((args.host, args.port), workers=args.workers, max_pending=args.max_pending,
+                          warm=parse_warm_specs(args.warm), template_dir=args.template_dir)
+    print(f"✅ 渲染服务已启动: http://{args.host}:{args.port}  (进程数: {server.workers})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
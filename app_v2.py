@@ -3,18 +3,149 @@
 Streamlit 应用 - 新版，支持多样式选择
 """
 import streamlit as st
+import streamlit.components.v1 as components
 from PIL import Image, ImageDraw
 import pathlib as Path
 import io
 
 # 导入新版生成核心
 from generation_core_v2 import SKUConfig, BoxMarkGenerator
+from render_service import RenderService
+from bulk_render import BulkRenderJob, parse_sku_table, template_csv
+from deep_zoom import viewer_html
 
 # 导入所有样式以自动注册
 import style_mcombo_standard
 import style_simple
 # 未来添加更多样式时在这里导入
 
+@st.cache_resource
+def get_generator(style_name, ppi):
+    """按 (样式, PPI) 缓存生成器：跨重跑、跨会话共享，资源图片和面板缓存只加载一次"""
+    base_dir = Path.Path(__file__).parent
+    return BoxMarkGenerator(base_dir=base_dir, style_name=style_name, ppi=ppi)
+
+
+# 第一阶段快速预览的分辨率上限（约 36–50 PPI 即可看清排版）
+FAST_PREVIEW_PPI = 40
+PREVIEW_WIDTH = 2000
+# 深度缩放瓦片写在 static/dzi/<指纹>/ 下，由 Streamlit 静态文件服务（.streamlit/config.toml 中开启）提供
+DZI_STATIC_DIR = Path.Path(__file__).parent / 'static' / 'dzi'
+DZI_STATIC_URL = '/app/static/dzi'
+
+
+@st.cache_resource
+def get_render_service():
+    """进程内渲染服务（所有会话共享）：有界队列、按核数设置工作线程、全局内存预算，相同配置的请求合并渲染"""
+    base_dir = Path.Path(__file__).parent
+    return RenderService(base_dir=base_dir, generator_factory=get_generator, tiles_root=DZI_STATIC_DIR)
+
+
+def deep_zoom_url(full_result):
+    """高清渲染结果的 .dzi 地址；没有瓦片或瓦片已被清理时返回 None"""
+    dzi_path = full_result.get('dzi')
+    if dzi_path is None or not dzi_path.exists():
+        return None
+    return f"{DZI_STATIC_URL}/{dzi_path.relative_to(DZI_STATIC_DIR).as_posix()}"
+
+
+def submit_full_render(sku_config):
+    """提交第二阶段：后台按印刷分辨率渲染高清预览和 PDF（其他会话已在渲染同一配置时直接共享结果）"""
+    cancel_full_render()
+    job = get_render_service().submit(sku_config, preview_width=PREVIEW_WIDTH)
+    st.session_state.full_job = {
+        'fingerprint': job.fingerprint,
+        'job': job,
+    }
+
+
+def cancel_full_render():
+    """取消当前会话尚未完成的后台渲染（其他会话仍在等待同一任务时任务继续运行）"""
+    job = st.session_state.full_job
+    if job is not None:
+        job['job'].cancel()
+        st.session_state.full_job = None
+
+
+@st.fragment(run_every=1)
+def poll_full_render():
+    """每秒检查一次后台渲染，显示任务状态和排队位置，完成后换上高清预览和下载按钮"""
+    job = st.session_state.full_job
+    if job is None:
+        return
+    render_job = job['job']
+    if not render_job.done():
+        position = render_job.position
+        if position > 0:
+            st.caption(f"⏳ 高清渲染排队中：前面还有 {position - 1} 个任务…")
+        else:
+            st.caption("⏳ 正在后台渲染高清预览和 PDF，完成后会自动替换…")
+        return
+    st.session_state.full_job = None
+    if render_job.status == 'failed':
+        st.session_state.full_error = str(render_job.error)
+    elif render_job.status == 'done':
+        st.session_state.full_result = dict(render_job.result, fingerprint=job['fingerprint'])
+        st.session_state.generated_image = render_job.result['preview']
+    elif render_job.status == 'cancelled':
+        # 任务被其他请求取消（当前会话仍需要结果）：重新提交
+        try:
+            submit_full_render(render_job.sku_config)
+        except RuntimeError as e:
+            st.session_state.full_error = str(e)
+    st.rerun()
+
+
+@st.fragment(run_every=1)
+def poll_bulk_render():
+    """每秒刷新批量任务进度，任务结束后整页重跑以显示结果"""
+    job = st.session_state.bulk_job
+    if job.done():
+        st.rerun()
+    finished = job.completed + len(job.failures)
+    st.progress(job.progress, text=f"⏳ 批量生成中：{finished}/{job.total}")
+    if st.button("⏹️ 取消批量生成"):
+        job.cancel()
+
+
+def show_bulk_result(job):
+    """显示批量任务结果；ZIP 在点击下载时才从磁盘读取"""
+    if job.status == 'failed':
+        st.error(f"❌ 批量生成失败: {job.error}")
+    elif job.status == 'cancelled':
+        st.warning(f"⏹️ 已取消，ZIP 中包含已完成的 {job.completed}/{job.total} 个 PDF")
+    else:
+        st.success(f"✅ 批量生成完成：{job.completed}/{job.total} 个 PDF")
+    if job.failures:
+        with st.expander(f"⚠️ {len(job.failures)} 个 SKU 渲染失败"):
+            for row_number, sku, message in job.failures:
+                st.markdown(f"- 第 {row_number} 行 {sku}: {message}")
+    if job.completed:
+        st.download_button(
+            label="📥 下载 ZIP",
+            data=job.read_zip,
+            file_name="carton_markings.zip",
+            mime="application/zip"
+        )
+
+
+@st.cache_resource
+def get_available_styles():
+    """缓存样式元数据（名称、描述、必需参数）"""
+    return BoxMarkGenerator.list_available_styles()
+
+
+@st.cache_resource
+def load_preview_image():
+    """缓存页面顶部的示例预览图，不存在时返回 None"""
+    preview_image_path = Path.Path(__file__).parent / 'layout_validation.jpg'
+    if not preview_image_path.exists():
+        return None
+    with Image.open(preview_image_path) as image:
+        image.load()
+        return image.copy()
+
+
 # 设置页面配置
 st.set_page_config(
     page_title="箱唛生成器",
@@ -25,8 +156,22 @@ st.set_page_config(
 # 初始化 session state
 if 'generated_image' not in st.session_state:
     st.session_state.generated_image = None
-if 'pdf_bytes' not in st.session_state:
-    st.session_state.pdf_bytes = None
+if 'pdf_config' not in st.session_state:
+    # 最近一次预览对应的印刷分辨率配置
+    st.session_state.pdf_config = None
+if 'full_job' not in st.session_state:
+    # 后台高清渲染任务：{'fingerprint', 'job'}
+    st.session_state.full_job = None
+if 'full_result' not in st.session_state:
+    # 后台高清渲染结果：{'fingerprint', 'pdf_bytes', 'preview', 'size'}
+    st.session_state.full_result = None
+    st.session_state.full_error = None
+if 'bulk_job' not in st.session_state:
+    # 批量渲染任务（BulkRenderJob）
+    st.session_state.bulk_job = None
+if 'last_render' not in st.session_state:
+    # 上一次生成的布局结果，用于增量重绘（只重绘受修改字段影响的面板）
+    st.session_state.last_render = None
 
 # 页面标题
 st.title("📦 MCombo 箱唛生成器 V2")
@@ -34,11 +179,10 @@ st.caption("🎨 支持多样式切换的新版箱唛生成系统")
 
 # 添加示例预览图
 try:
-    preview_image_path = Path.Path(__file__).parent / 'layout_validation.jpg'
-    if preview_image_path.exists():
+    preview_img = load_preview_image()
+    if preview_img is not None:
         col_logo1, col_logo2, col_logo3 = st.columns([1, 2, 1])
         with col_logo2:
-            preview_img = Image.open(preview_image_path)
             st.image(preview_img, caption="箱唛示例预览", width="stretch")
 except:
     pass
@@ -46,189 +190,296 @@ except:
 st.markdown("---")
 
 # 获取所有可用样式
-available_styles = BoxMarkGenerator.list_available_styles()
+available_styles = get_available_styles()
 style_names = [s['name'] for s in available_styles]
 style_descriptions = {s['name']: s['description'] for s in available_styles}
 
-# 样式选择器（放在最上方）
-st.header("🎨 样式选择")
-selected_style = st.selectbox(
-    "选择箱唛样式",
-    options=style_names,
-    format_func=lambda x: f"{x} - {style_descriptions[x]}",
-    index=0
-)
+tab_single, tab_bulk = st.tabs(["📦 单个生成", "📚 批量生成"])
 
-st.info(f"当前样式: **{selected_style}** - {style_descriptions[selected_style]}")
+with tab_single:
+    # 样式选择器（放在最上方）
+    st.header("🎨 样式选择")
+    selected_style = st.selectbox(
+        "选择箱唛样式",
+        options=style_names,
+        format_func=lambda x: f"{x} - {style_descriptions[x]}",
+        index=0
+    )
 
-# 获取当前样式所需的参数
-current_style_info = next((s for s in available_styles if s['name'] == selected_style), None)
-required_params = current_style_info['required_params'] if current_style_info else []
+    st.info(f"当前样式: **{selected_style}** - {style_descriptions[selected_style]}")
 
-st.markdown("---")
+    # 获取当前样式所需的参数
+    current_style_info = next((s for s in available_styles if s['name'] == selected_style), None)
+    required_params = current_style_info['required_params'] if current_style_info else []
 
-# 创建两列布局
-col1, col2 = st.columns([1, 1])
+    st.markdown("---")
+
+    # 创建两列布局
+    col1, col2 = st.columns([1, 1])
 
-with col1:
-    st.header("📝 基本信息")
+    with col1:
+        st.header("📝 基本信息")
     
-    # SKU 名称
-    sku_name = st.text_input("SKU 名称", value="CA-6160-OE678BR-1", help="例如: CA-6160-OE678BR-1")
+        # SKU 名称
+        sku_name = st.text_input("SKU 名称", value="CA-6160-OE678BR-1", help="例如: CA-6160-OE678BR-1")
     
-    # 尺寸信息
-    st.subheader("箱子尺寸 (cm)")
-    col_l, col_w, col_h = st.columns(3)
-    with col_l:
-        length_cm = st.number_input("长度", min_value=1.0, value=77.0, step=0.5)
-    with col_w:
-        width_cm = st.number_input("宽度", min_value=1.0, value=67.5, step=0.5)
-    with col_h:
-        height_cm = st.number_input("高度", min_value=1.0, value=47.0, step=0.5)
+        # 尺寸信息
+        st.subheader("箱子尺寸 (cm)")
+        col_l, col_w, col_h = st.columns(3)
+        with col_l:
+            length_cm = st.number_input("长度", min_value=1.0, value=77.0, step=0.5)
+        with col_w:
+            width_cm = st.number_input("宽度", min_value=1.0, value=67.5, step=0.5)
+        with col_h:
+            height_cm = st.number_input("高度", min_value=1.0, value=47.0, step=0.5)
     
-    # PPI 设置
-    ppi = st.selectbox("分辨率 (PPI)", options=[72, 150, 300], index=1, help="150适合屏幕预览，300适合印刷")
+        # PPI 设置
+        ppi = st.selectbox("分辨率 (PPI)", options=[72, 150, 300], index=1, help="150适合屏幕预览，300适合印刷")
+        pdf_compression = st.selectbox(
+            "PDF 压缩方式",
+            options=['dct', 'indexed', 'bilevel'],
+            format_func=lambda x: {'dct': 'JPEG（默认）', 'indexed': '无损（平涂图稿按索引色压缩，更小）',
+                                   'bilevel': '索引色 + 黑色 1 位图层（有损：深色变为纯黑，黑条和文字边缘最锐利）'}[x],
+            help="箱唛大多是平涂色块和黑色文字，无损压缩没有 JPEG 振铃；不超过 256 色时按索引色写入，通常比 JPEG 更小，"
+                 "颜色更多（图片素材的抗锯齿边缘等）时自动改为 RGB 无损压缩，文件会更大"
+        )
+        color_mode = st.selectbox(
+            "画布颜色模式",
+            options=list(SKUConfig.COLOR_MODES),
+            format_func=lambda x: {'RGB': 'RGB（默认）', 'P': '调色板（8 位索引色，内存约 1/3）',
+                                   'CMYK': 'CMYK（印刷，按 ICC 配置文件转换）'}[x],
+            help="调色板模式适合超大箱子，配合索引色压缩时 PDF 直接写入画布索引；"
+                 "CMYK 模式的 PDF 直接交付印刷，ICC 配置文件由环境变量 BOXMARK_CMYK_PROFILE 指定，只支持 JPEG 压缩"
+        )
 
-with col2:
-    st.header("📋 样式特定参数")
+    with col2:
+        st.header("📋 样式特定参数")
     
-    # 根据选择的样式显示不同的参数输入框
-    style_params = {}
+        # 根据选择的样式显示不同的参数输入框
+        style_params = {}
     
-    # 通用参数（大多数样式都需要）
-    if 'product' in required_params:
-        product = st.text_input("产品名称", value="Lift Recliner", help="例如: Lift Recliner")
-        style_params['product'] = product
+        # 通用参数（大多数样式都需要）
+        if 'product' in required_params:
+            product = st.text_input("产品名称", value="Lift Recliner", help="例如: Lift Recliner")
+            style_params['product'] = product
     
-    if 'box_number' in required_params:
-        st.subheader("箱号信息")
-        col_total, col_current = st.columns(2)
-        with col_total:
-            total_boxes = st.number_input("总箱数", min_value=1, value=3, step=1)
-        with col_current:
-            current_box = st.number_input("当前箱号", min_value=1, value=1, step=1)
-        style_params['box_number'] = {
-            'total_boxes': int(total_boxes),
-            'current_box': int(current_box)
-        }
+        if 'box_number' in required_params:
+            st.subheader("箱号信息")
+            col_total, col_current = st.columns(2)
+            with col_total:
+                total_boxes = st.number_input("总箱数", min_value=1, value=3, step=1)
+            with col_current:
+                current_box = st.number_input("当前箱号", min_value=1, value=1, step=1)
+            style_params['box_number'] = {
+                'total_boxes': int(total_boxes),
+                'current_box': int(current_box)
+            }
     
-    # MCombo 标准样式的额外参数
-    if selected_style == "mcombo_standard":
-        st.subheader("MCombo 标准样式参数")
+        # MCombo 标准样式的额外参数
+        if selected_style == "mcombo_standard":
+            st.subheader("MCombo 标准样式参数")
         
-        color = st.text_input("颜色", value="Beige", help="例如: Beige, Brown")
-        size = st.text_input("尺寸标注", value="(Oversize)", help="例如: (Oversize), (Standard)")
+            color = st.text_input("颜色", value="Beige", help="例如: Beige, Brown")
+            size = st.text_input("尺寸标注", value="(Oversize)", help="例如: (Oversize), (Standard)")
         
-        st.subheader("重量信息")
-        col_gw, col_nw = st.columns(2)
-        with col_gw:
-            gross_weight = st.number_input("毛重 (lbs)", min_value=0.0, value=106.9, step=0.1)
-        with col_nw:
-            net_weight = st.number_input("净重 (lbs)", min_value=0.0, value=94.4, step=0.1)
+            st.subheader("重量信息")
+            col_gw, col_nw = st.columns(2)
+            with col_gw:
+                gross_weight = st.number_input("毛重 (lbs)", min_value=0.0, value=106.9, step=0.1)
+            with col_nw:
+                net_weight = st.number_input("净重 (lbs)", min_value=0.0, value=94.4, step=0.1)
         
-        st.subheader("箱子尺寸标注 (英寸)")
-        col_l_in, col_w_in, col_h_in = st.columns(3)
-        with col_l_in:
-            length_in = st.number_input("长 (in)", min_value=0.0, value=30.3, step=0.1)
-        with col_w_in:
-            width_in = st.number_input("宽 (in)", min_value=0.0, value=26.6, step=0.1)
-        with col_h_in:
-            height_in = st.number_input("高 (in)", min_value=0.0, value=18.5, step=0.1)
+            st.subheader("箱子尺寸标注 (英寸)")
+            col_l_in, col_w_in, col_h_in = st.columns(3)
+            with col_l_in:
+                length_in = st.number_input("长 (in)", min_value=0.0, value=30.3, step=0.1)
+            with col_w_in:
+                width_in = st.number_input("宽 (in)", min_value=0.0, value=26.6, step=0.1)
+            with col_h_in:
+                height_in = st.number_input("高 (in)", min_value=0.0, value=18.5, step=0.1)
         
-        sn_code = st.text_input("SN 码", value="08429381073953", help="条形码序列号")
-        sponge_verified = st.selectbox("海绵认证", options=["否", "是"], index=1) == "是"
+            sn_code = st.text_input("SN 码", value="08429381073953", help="条形码序列号")
+            sponge_verified = st.selectbox("海绵认证", options=["否", "是"], index=1) == "是"
         
-        style_params.update({
-            'color': color,
-            'size': size,
-            'side_text': {
-                'gw_value': gross_weight,
-                'nw_value': net_weight,
-                'dimention_text': f'BOX SIZE: {length_in}\'\' x {width_in}\'\' x {height_in}\'\'',
-                'sn_code': sn_code
-            },
-            'sponge_verified': sponge_verified
-        })
-
-# 生成按钮区域
-st.markdown("---")
-col_btn1, col_btn2, col_btn3 = st.columns([1, 1, 2])
+            style_params.update({
+                'color': color,
+                'size': size,
+                'side_text': {
+                    'gw_value': gross_weight,
+                    'nw_value': net_weight,
+                    'dimention_text': f'BOX SIZE: {length_in}\'\' x {width_in}\'\' x {height_in}\'\'',
+                    'sn_code': sn_code
+                },
+                'sponge_verified': sponge_verified
+            })
 
-with col_btn1:
-    generate_preview = st.button("🖼️ 生成预览", type="primary")
+    # 生成按钮区域
+    st.markdown("---")
+    col_btn1, col_btn2, col_btn3 = st.columns([1, 1, 2])
 
-with col_btn2:
-    current_sku = sku_name.strip() if sku_name and sku_name.strip() else "carton_marking"
-    
-    if st.session_state.pdf_bytes:
-        st.download_button(
-            label="📥 下载 PDF",
-            data=st.session_state.pdf_bytes,
-            file_name=f"{current_sku}.pdf",
-            mime="application/pdf"
+    with col_btn1:
+        generate_preview = st.button("🖼️ 生成预览", type="primary")
+
+    # 根据当前输入构建 SKU 配置：点击生成时使用；输入变化时据此取消过期的后台渲染
+    try:
+        current_config = SKUConfig(
+            sku_name=sku_name,
+            length_cm=length_cm,
+            width_cm=width_cm,
+            height_cm=height_cm,
+            style_name=selected_style,
+            ppi=ppi,
+            pdf_compression=pdf_compression,
+            color_mode=color_mode,
+            **style_params
         )
-    else:
-        st.button("📥 下载 PDF (请先生成预览)", disabled=True)
+    except Exception:
+        current_config = None
 
-# 生成逻辑
-if generate_preview:
-    with st.spinner(f"正在使用 {selected_style} 样式生成箱唛..."):
-        try:
-            # 创建 SKU 配置
-            test_sku = SKUConfig(
-                sku_name=sku_name,
-                length_cm=length_cm,
-                width_cm=width_cm,
-                height_cm=height_cm,
-                style_name=selected_style,
-                ppi=ppi,
-                **style_params
-            )
-            
-            # 创建生成器
-            base_dir = Path.Path(__file__).parent
-            generator = BoxMarkGenerator(base_dir=base_dir, style_name=selected_style, ppi=ppi)
-            
-            # 生成完整布局
-            canvas = generator.generate_complete_layout(test_sku)
-            
-            # 转换为 RGB 用于显示和保存
-            canvas_rgb = canvas.convert('RGB')
+    job = st.session_state.full_job
+    if job is not None and (current_config is None or current_config.fingerprint() != job['fingerprint']):
+        cancel_full_render()
+
+    # 生成逻辑（第一阶段：低分辨率快速预览，立即显示）
+    if generate_preview:
+        with st.spinner(f"正在使用 {selected_style} 样式生成箱唛..."):
+            try:
+                # 创建 SKU 配置
+                test_sku = SKUConfig(
+                    sku_name=sku_name,
+                    length_cm=length_cm,
+                    width_cm=width_cm,
+                    height_cm=height_cm,
+                    style_name=selected_style,
+                    ppi=ppi,
+                    pdf_compression=pdf_compression,
+                    color_mode=color_mode,
+                    **style_params
+                )
             
-            # 生成 PDF 到内存（高分辨率）
-            pdf_buffer = io.BytesIO()
-            canvas_rgb.save(pdf_buffer, "PDF", resolution=ppi, quality=100)
-            st.session_state.pdf_bytes = pdf_buffer.getvalue()
+                # 获取生成器（按样式和 PPI 缓存，所有会话共享）
+                generator = get_generator(selected_style, ppi)
             
-            # 创建缩略图用于网页预览
-            max_preview_width = 2000
-            if canvas_rgb.width > max_preview_width:
-                preview_ratio = max_preview_width / canvas_rgb.width
-                preview_size = (max_preview_width, int(canvas_rgb.height * preview_ratio))
-                preview_image = canvas_rgb.resize(preview_size, Image.Resampling.LANCZOS)
-            else:
-                preview_image = canvas_rgb
+                # 按低分辨率直接渲染（不超过 FAST_PREVIEW_PPI 且宽度不超过 2000px），增量模式下只重绘受修改字段影响的面板
+                fast_config = test_sku.replace(ppi=min(ppi, FAST_PREVIEW_PPI))
+                render = generator.generate_preview(fast_config, max_width=PREVIEW_WIDTH, previous=st.session_state.last_render)
+                st.session_state.last_render = render
+                st.session_state.generated_image = render['canvas'].convert('RGB')
+                st.session_state.pdf_config = test_sku
+                st.session_state.full_error = None
             
-            # 保存预览图到内存
-            st.session_state.generated_image = preview_image
+                # 第二阶段：后台渲染高清预览和 PDF（同一配置已有结果时不再重复渲染）
+                full_result = st.session_state.full_result
+                full_job = st.session_state.full_job
+                if full_result is not None and full_result['fingerprint'] == test_sku.fingerprint():
+                    st.session_state.generated_image = full_result['preview']
+                elif full_job is None or full_job['fingerprint'] != test_sku.fingerprint():
+                    try:
+                        submit_full_render(test_sku)
+                    except RuntimeError as e:
+                        st.session_state.full_error = str(e)
             
-            total_width, total_height = canvas.size
-            st.success(f"✅ 箱唛生成成功！（样式: {selected_style}）")
-            st.info(f"📐 PDF尺寸: {total_width}x{total_height}px ({total_width/test_sku.dpi:.1f}cm x {total_height/test_sku.dpi:.1f}cm) | 🎨 分辨率: {ppi} PPI | 预览图已自动缩放")
+                total_width_cm = max(x + w for x, y, w, h in render['layout'].values()) / (render['ppi'] / 2.54)
+                total_height_cm = max(y + h for x, y, w, h in render['layout'].values()) / (render['ppi'] / 2.54)
+                st.success(f"✅ 箱唛生成成功！（样式: {selected_style}）")
+                st.info(f"📐 展开尺寸: {total_width_cm:.1f}cm x {total_height_cm:.1f}cm | 🎨 PDF 分辨率: {ppi} PPI | 快速预览按 {render['ppi']} PPI 渲染")
+                st.caption(f"♻️ 本次重绘 {len(render['changed'])}/{len(render['layout'])} 个区域，其余面板沿用上一次的结果")
             
-        except Exception as e:
-            st.error(f"❌ 生成失败: {str(e)}")
-            import traceback
-            st.code(traceback.format_exc())
+            except Exception as e:
+                st.error(f"❌ 生成失败: {str(e)}")
+                import traceback
+                st.code(traceback.format_exc())
 
-# 显示预览
-if st.session_state.generated_image:
-    st.markdown("---")
-    st.header("🖼️ 预览")
-    st.image(st.session_state.generated_image, use_container_width=True)
+    with col_btn2:
+        current_sku = sku_name.strip() if sku_name and sku_name.strip() else "carton_marking"
+    
+        pdf_config = st.session_state.pdf_config
+        full_result = st.session_state.full_result
+        if pdf_config is not None and full_result is not None and full_result['fingerprint'] == pdf_config.fingerprint():
+            st.download_button(
+                label="📥 下载 PDF",
+                data=full_result['pdf_bytes'],
+                file_name=f"{current_sku}.pdf",
+                mime="application/pdf"
+            )
+        elif st.session_state.full_job is not None:
+            st.button("📥 下载 PDF (高清渲染中...)", disabled=True)
+        else:
+            st.button("📥 下载 PDF (请先生成预览)", disabled=True)
+
+    if st.session_state.full_error:
+        st.error(f"❌ 高清渲染失败: {st.session_state.full_error}")
+
+    # 显示预览
+    if st.session_state.generated_image:
+        st.markdown("---")
+        st.header("🖼️ 预览")
+        if st.session_state.full_job is not None:
+            poll_full_render()
+        dzi_url = None
+        if st.session_state.full_job is None and full_result is not None and pdf_config is not None \
+                and full_result['fingerprint'] == pdf_config.fingerprint():
+            dzi_url = deep_zoom_url(full_result)
+        if dzi_url and st.toggle("🔍 可缩放高清预览（拖动平移、滚轮缩放、双击复位）", value=True):
+            # 只下载当前视野内的瓦片，放大后可以看清条码数字和小号文字
+            components.html(viewer_html(dzi_url, height=700), height=710)
+        else:
+            st.image(st.session_state.generated_image, use_container_width=True)
+    
+        if st.session_state.full_job is None and full_result is not None and pdf_config is not None \
+                and full_result['fingerprint'] == pdf_config.fingerprint():
+            st.info("💡 提示：高清预览已生成，点击上方'下载 PDF'按钮保存文件")
+        elif st.session_state.full_job is None:
+            st.info("💡 提示：输入已修改，请重新点击'生成预览'")
+
+with tab_bulk:
+    st.header("📚 批量生成")
+    st.caption("上传包含多个 SKU 的 CSV / Excel 表格，后台并行渲染，全部 PDF 打包为 ZIP 下载")
+    
+    col_bulk1, col_bulk2 = st.columns([1, 1])
+    with col_bulk1:
+        bulk_style = st.selectbox(
+            "默认样式（表格中没有 style_name 列时使用）",
+            options=style_names,
+            format_func=lambda x: f"{x} - {style_descriptions[x]}",
+            key='bulk_style'
+        )
+    with col_bulk2:
+        bulk_ppi = st.selectbox("默认分辨率 (PPI)", options=[72, 150, 300], index=2, key='bulk_ppi')
+    
+    st.download_button(
+        label="📄 下载 CSV 模板",
+        data=template_csv(bulk_style, bulk_ppi),
+        file_name="carton_markings_template.csv",
+        mime="text/csv"
+    )
+    uploaded_table = st.file_uploader("上传 SKU 表格", type=['csv', 'xlsx'])
+    
+    bulk_configs = []
+    if uploaded_table is not None:
+        try:
+            bulk_configs, bulk_errors = parse_sku_table(uploaded_table.getvalue(), uploaded_table.name, bulk_style, bulk_ppi)
+            st.success(f"✅ 读取到 {len(bulk_configs)} 个有效 SKU")
+            if bulk_errors:
+                with st.expander(f"⚠️ {len(bulk_errors)} 行无法读取，将被跳过"):
+                    for row_number, message in bulk_errors:
+                        st.markdown(f"- 第 {row_number} 行: {message}")
+        except ValueError as e:
+            st.error(f"❌ 表格读取失败: {str(e)}")
+    
+    bulk_job = st.session_state.bulk_job
+    bulk_running = bulk_job is not None and not bulk_job.done()
+    if st.button("🚀 开始批量生成", type="primary", disabled=not bulk_configs or bulk_running):
+        if bulk_job is not None:
+            bulk_job.cleanup()
+        base_dir = Path.Path(__file__).parent
+        st.session_state.bulk_job = BulkRenderJob(bulk_configs, base_dir=base_dir).start()
     
-    if st.session_state.pdf_bytes:
-        st.info("💡 提示：预览图已生成，点击上方'下载 PDF'按钮保存文件")
+    bulk_job = st.session_state.bulk_job
+    if bulk_job is not None and not bulk_job.done():
+        poll_bulk_render()
+    elif bulk_job is not None:
+        show_bulk_result(bulk_job)
 
 # 页面底部说明
 st.markdown("---")
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+资源优化 - 离线整理 assets/ 目录，输出到 assets/_optimized/ 并生成样式加载时使用的索引（index.json）
+- 去重：内容相同的文件（各样式目录里重复的字体、Logo 等）按内容哈希只保存一份
+- 裁边：图片裁掉全透明的边距，索引记录原图尺寸和内容位置，加载时还原
+- 缩小：只经 scaled_resource 使用的图片，按各样式在最大箱型、300 PPI 下实际缩放到的最大尺寸（留余量）缩小
+- 平涂图稿：颜色（含透明度）不超过 256 种的图片保存为调色板 PNG，无损
+样式通过 asset_preprocessing.open_asset / asset_file 加载资源：同一内容只解码一次并在样式之间共享；
+源文件修改后（大小或修改时间变化）对应条目自动失效，改用原文件，重新运行本命令即可
+
+用法:
+    python asset_optimizer.py                               # 优化并报告节省的空间、解码耗时和内存
+    python asset_optimizer.py --max-box-cm 200 120 120      # 指定最大箱型（长 宽 高，cm）
+    python asset_optimizer.py --no-downscale --dry-run      # 不缩小图片，只统计不写文件
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import itertools
+import json
+import math
+import os
+import time
+import pathlib as Path
+
+import numpy as np
+from PIL import Image
+
+import asset_preprocessing
+from asset_preprocessing import OPTIMIZED_DIR_NAME, INDEX_FILE_NAME
+from benchmarks import SAMPLE_CASES, sample_config
+from generation_core_v2 import BoxMarkGenerator
+
+
+BASE_DIR = Path.Path(__file__).parent
+IMAGE_SUFFIXES = ('.png',)
+# 缩小图片时按此分辨率计算需要的尺寸
+TARGET_PPI = 300
+# 探测各资源缩放尺寸时的渲染分辨率（尺寸与分辨率成正比，低分辨率渲染后换算）
+PROBE_PPI = 30
+# 需要尺寸的余量（抵消低分辨率探测的取整误差）
+SIZE_MARGIN = 0.1
+
+
+class _AccessLog(dict):
+    """探测时替换样式的 resources，记录被样式直接读取（不经 scaled_resource）的资源名"""
+
+    def __init__(self, resources):
+        super().__init__(resources)
+        self.accessed = set()
+
+    def __getitem__(self, name):
+        self.accessed.add(name)
+        return super().__getitem__(name)
+
+    def get(self, name, default=None):
+        self.accessed.add(name)
+        return super().get(name, default)
+
+
+def file_digest(path):
+    """文件内容的 sha256"""
+    return hashlib.sha256(Path.Path(path).read_bytes()).hexdigest()
+
+
+def probe_resource_usage(base_dir, min_box_cm, max_box_cm, probe_ppi=PROBE_PPI):
+    """
+    渲染每个样式的极端箱型（长、宽、高分别取最小/最大值，箱数 2/3），返回：
+        peaks:  {源文件路径: (宽, 高)}  经 scaled_resource 缩放到的最大尺寸（换算到 TARGET_PPI）
+        direct: {源文件路径}           被样式直接读取的资源（按原图尺寸使用，不能缩小）
+        skipped: 样式无法排版（箱型太小等）而跳过的组合数
+    """
+    peaks, direct, skipped = {}, set(), 0
+    for style_name in SAMPLE_CASES:
+        generator = BoxMarkGenerator(base_dir=base_dir, style_name=style_name, ppi=probe_ppi)
+        style = generator.style
+        sources = {name: image.info.get('asset_source') for name, image in style.resources.items()}
+        # 预先准备所有资源，探测期间 resources 只会被样式代码直接读取
+        for name in style.resources:
+            style.prepared_resource(name)
+        style.resources = _AccessLog(style.resources)
+        for l_cm, w_cm, h_cm in itertools.product(*zip(min_box_cm, max_box_cm)):
+            for total_boxes in (2, 3):
+                sku_config = sample_config(style_name, probe_ppi, length_cm=l_cm, width_cm=w_cm, height_cm=h_cm)
+                sku_config = sku_config.replace(box_number={'total_boxes': total_boxes, 'current_box': 1})
+                try:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        generator.generate_complete_layout(sku_config)
+                except (ValueError, ZeroDivisionError):
+                    skipped += 1
+        for name, (width, height) in style.resource_peaks.items():
+            source = sources.get(name)
+            if source:
+                peak = peaks.get(source, (0, 0))
+                scale = TARGET_PPI / probe_ppi
+                peaks[source] = (max(peak[0], math.ceil(width * scale)), max(peak[1], math.ceil(height * scale)))
+        direct.update(sources[name] for name in style.resources.accessed if sources.get(name))
+    return peaks, direct, skipped
+
+
+def _palette_png(image):
+    """颜色不超过 256 种的 RGBA 图片转为带 RGBA 调色板的 'P' 图片（无损），否则返回 None"""
+    colors = image.getcolors(256)
+    if colors is None:
+        return None
+    pixels = np.asarray(image).view(np.uint32).reshape(image.height, image.width)
+    palette, indices = np.unique(pixels, return_inverse=True)
+    indexed = Image.fromarray(indices.reshape(pixels.shape).astype(np.uint8), 'P')
+    indexed.putpalette(palette.view(np.uint8).tobytes(), 'RGBA')
+    return indexed
+
+
+def optimize_image(path, downscale=1.0):
+    """
+    优化单张图片，返回 (PNG 字节, 索引条目中的图片信息)
+    downscale < 1 时先按比例缩小；之后裁掉透明边距，平涂图稿保存为调色板 PNG
+    """
+    with Image.open(path) as source:
+        image = source.convert('RGBA')
+    nominal_size = image.size
+    if downscale < 1:
+        size = tuple(max(1, math.ceil(length * downscale)) for length in image.size)
+        image = image.resize(size, Image.Resampling.LANCZOS)
+    box = image.getchannel('A').getbbox() or (0, 0, 1, 1)
+    content = image.crop(box)
+    stored = _palette_png(content) or content
+    buffer = io.BytesIO()
+    stored.save(buffer, 'PNG', optimize=True)
+    info = {'size': list(nominal_size), 'canvas': list(image.size), 'offset': list(box[:2]),
+            'mode': stored.mode}
+    return buffer.getvalue(), info
+
+
+def downscale_factor(path, peaks, direct, margin=SIZE_MARGIN):
+    """只经 scaled_resource 使用、且原图大于需要尺寸的图片返回缩小比例，否则返回 1"""
+    key = str(path)
+    if key in direct or key not in peaks:
+        return 1.0
+    with Image.open(path) as image:
+        width, height = image.size
+    need_w, need_h = peaks[key]
+    return min(1.0, max(need_w / width, need_h / height) * (1 + margin))
+
+
+def optimize_assets(assets_dir, peaks=None, direct=(), dry_run=False):
+    """
+    优化 assets_dir 下的所有文件，写入 assets_dir/_optimized/（dry_run 时不写文件）
+    peaks / direct 为 probe_resource_usage 的结果，不传时不缩小图片
+    返回 (索引, 统计信息)
+    """
+    assets_dir = Path.Path(assets_dir)
+    output_dir = assets_dir / OPTIMIZED_DIR_NAME
+    sources = sorted(path for path in assets_dir.rglob('*')
+                     if path.is_file() and OPTIMIZED_DIR_NAME not in path.relative_to(assets_dir).parts)
+    # 同一内容的不同路径按所有路径中最严格的要求处理（任一路径被直接使用则不缩小，需要尺寸取最大）
+    by_digest = {}
+    for path in sources:
+        by_digest.setdefault(file_digest(path), []).append(path)
+
+    index = {'version': 1, 'target_ppi': TARGET_PPI, 'files': {}}
+    outputs = {}
+    downscaled = []
+    for digest, paths in by_digest.items():
+        suffix = paths[0].suffix.lower()
+        name = f"{digest[:16]}{suffix}"
+        info = {}
+        if suffix in IMAGE_SUFFIXES:
+            factor = 1.0
+            if peaks:
+                factor = max(downscale_factor(path, peaks, direct) for path in paths)
+            data, info = optimize_image(paths[0], factor)
+            if factor < 1:
+                downscaled.append((paths[0].relative_to(assets_dir).as_posix(), info['size'], info['canvas']))
+        else:
+            data = paths[0].read_bytes()
+        outputs[name] = data
+        for path in paths:
+            stat = os.stat(path)
+            index['files'][path.relative_to(assets_dir).as_posix()] = {
+                'file': name, 'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns, **info}
+
+    if not dry_run:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for stale in output_dir.iterdir():
+            if stale.name not in outputs and stale.name != INDEX_FILE_NAME:
+                stale.unlink()
+        for name, data in outputs.items():
+            (output_dir / name).write_bytes(data)
+        tmp_path = output_dir / (INDEX_FILE_NAME + '.tmp')
+        tmp_path.write_text(json.dumps(index, ensure_ascii=False, indent=1), encoding='utf-8')
+        tmp_path.replace(output_dir / INDEX_FILE_NAME)
+
+    stats = {
+        'source_files': len(sources),
+        'source_bytes': sum(path.stat().st_size for path in sources),
+        'output_files': len(outputs),
+        'output_bytes': sum(len(data) for data in outputs.values()),
+        'downscaled': downscaled,
+    }
+    return index, stats
+
+
+def measure_loading(assets_dir, index):
+    """
+    加载索引中所有图片：原方式（每个路径各自解码）与 open_asset（按优化后的文件共享解码）的耗时和解码后的内存
+    返回 ((原耗时秒数, 原内存字节), (优化后耗时秒数, 优化后内存字节))
+    """
+    assets_dir = Path.Path(assets_dir)
+    paths = [assets_dir / relative for relative, entry in index['files'].items() if 'canvas' in entry]
+
+    start = time.perf_counter()
+    originals = []
+    for path in paths:
+        with Image.open(path) as image:
+            originals.append(image.convert('RGBA'))
+    before = (time.perf_counter() - start, sum(image.width * image.height * 4 for image in originals))
+    del originals
+
+    asset_preprocessing._indexes.clear()
+    asset_preprocessing._decoded.clear()
+    start = time.perf_counter()
+    loaded = [asset_preprocessing.open_asset(path) for path in paths]
+    unique = {id(image): image for image in loaded}.values()
+    after = (time.perf_counter() - start, sum(image.width * image.height * 4 for image in unique))
+    return before, after
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线优化 assets/ 目录（去重、裁边、缩小、调色板化）并生成加载索引')
+    parser.add_argument('--assets', default=str(BASE_DIR / 'assets'), help='资源目录')
+    parser.add_argument('--min-box-cm', type=float, nargs=3, default=[20, 20, 20], metavar=('L', 'W', 'H'),
+                        help='探测用的最小箱型（cm）')
+    parser.add_argument('--max-box-cm', type=float, nargs=3, default=[150, 150, 150], metavar=('L', 'W', 'H'),
+                        help='探测用的最大箱型（cm），图片按此箱型在 300 PPI 下需要的尺寸缩小')
+    parser.add_argument('--no-downscale', action='store_true', help='不缩小图片（只去重、裁边、调色板化）')
+    parser.add_argument('--dry-run', action='store_true', help='只统计，不写文件')
+    args = parser.parse_args()
+
+    assets_dir = Path.Path(args.assets)
+    peaks, direct = (None, ())
+    if not args.no_downscale:
+        print(f"探测资源尺寸（{PROBE_PPI} PPI，箱型 {args.min_box_cm} - {args.max_box_cm} cm）...")
+        peaks, direct, skipped = probe_resource_usage(assets_dir.parent, args.min_box_cm, args.max_box_cm)
+        if skipped:
+            print(f"跳过 {skipped} 个样式无法排版的箱型组合")
+    index, stats = optimize_assets(assets_dir, peaks, direct, dry_run=args.dry_run)
+
+    print(f"文件:     {stats['source_files']} 个 -> {stats['output_files']} 个"
+          f"（去重 {stats['source_files'] - stats['output_files']} 个）")
+    print(f"安装大小: {stats['source_bytes'] / 1024 / 1024:.1f} MB -> {stats['output_bytes'] / 1024 / 1024:.1f} MB")
+    for relative, nominal, stored in stats['downscaled']:
+        print(f"缩小:     {relative}  {nominal[0]}x{nominal[1]} -> {stored[0]}x{stored[1]}")
+    if peaks and not stats['downscaled']:
+        print("缩小:     没有超过最大箱型所需尺寸的图片")
+    if args.dry_run:
+        print("未写入文件（--dry-run），跳过解码耗时和内存统计")
+        return
+    (before_s, before_bytes), (after_s, after_bytes) = measure_loading(assets_dir, index)
+    print(f"图片解码: {before_s * 1000:.0f} ms -> {after_s * 1000:.0f} ms")
+    print(f"解码内存: {before_bytes / 1024 / 1024:.0f} MB -> {after_bytes / 1024 / 1024:.0f} MB")
+    print(f"索引:     {assets_dir / OPTIMIZED_DIR_NAME / INDEX_FILE_NAME}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+资源图片预处理 - 裁掉透明边距、预乘 alpha，缩放和粘贴只处理有内容的部分
+- 资源按 alpha 的包围盒裁剪，记录原图尺寸和内容位置；缩放后的图片仍是原图等比缩放的完整尺寸，版面计算不受影响
+- 裁剪后的内容预先转换为预乘 alpha（'RGBa'）：Pillow 缩放 RGBA 时每次都要先把整张原图转换为预乘 alpha，这里只转换一次
+- 缩放只对内容范围（加上重采样核的半径）重采样，透明边距直接留空；结果与整张缩放等价（个别像素因浮点舍入相差 1-2 个色阶）
+- 缩放结果登记其内容范围，paste_asset 只混合这一部分
+- open_asset / asset_file 按 asset_optimizer 生成的索引加载优化后的资源文件（没有索引时读取原文件）
+"""
+import json
+import math
+import os
+import threading
+import weakref
+import pathlib as Path
+from PIL import Image
+
+from style_base import DerivedImageCache
+
+
+# asset_optimizer 的输出目录（位于 assets/ 下）和索引文件名
+OPTIMIZED_DIR_NAME = '_optimized'
+INDEX_FILE_NAME = 'index.json'
+
+
+# 重采样核的半径（缩小时按缩小倍数放大），与 Pillow 的定义相同
+FILTER_SUPPORT = {
+    Image.Resampling.BILINEAR: 1.0,
+    Image.Resampling.BICUBIC: 2.0,
+    Image.Resampling.LANCZOS: 3.0,
+}
+
+_contents = DerivedImageCache()
+_indexes = {}  # assets 目录 -> 索引（没有索引时为 None）
+_indexes_lock = threading.Lock()
+_decoded = weakref.WeakValueDictionary()  # 优化后的文件路径 -> 解码后的图片（各样式共享）
+
+
+def _axis_window(start, end, length, target, support):
+    """
+    单个方向上：内容 [start, end) 缩放后可能影响的目标像素范围 (dest_start, dest_end)，
+    以及重采样这些目标像素需要读取的源像素范围 (pad_start, pad_end)
+    """
+    scale = length / target
+    radius = support * max(scale, 1.0)
+    dest_start = max(0, math.floor((start - radius) / scale - 0.5))
+    dest_end = min(target, math.ceil((end + radius) / scale + 0.5))
+    pad_start = max(0, math.floor(dest_start * scale - radius) - 1)
+    pad_end = min(length, math.ceil(dest_end * scale + radius) + 1)
+    return dest_start, dest_end, pad_start, pad_end
+
+
+class PreparedAsset:
+    """
+    预处理后的资源（RGBA）：size 为原图尺寸，box 为内容（alpha 非零）在原图中的范围，
+    premultiplied 为内容部分的预乘 alpha 图像（'RGBa'）
+    """
+
+    def __init__(self, image):
+        if image.mode != 'RGBA':
+            image = image.convert('RGBA')
+        self.image = image
+        self.size = image.size
+        # asset_optimizer 缩小过的资源按原图尺寸计算缩放目标，版面与原图相同
+        self.nominal_size = tuple(image.info.get('nominal_size', image.size))
+        self.box = image.getchannel('A').getbbox()
+        self.premultiplied = image.crop(self.box).convert('RGBa') if self.box else None
+
+    def resize(self, size, resample=Image.Resampling.LANCZOS):
+        """
+        缩放到 size，与 image.resize(size, resample) 等价（resample 需在 FILTER_SUPPORT 中）
+        内容范围之外的透明像素不参与重采样；裁掉了边距时，个别像素可能因重采样系数的浮点舍入与整张缩放相差 1-2 个色阶
+        返回完整尺寸的 RGBA 图片，有透明边距时登记其内容范围供 paste_asset 使用
+        """
+        size = tuple(size)
+        if size == self.size:
+            return self.image.copy()
+        if self.box is None:
+            return Image.new('RGBA', size, (0, 0, 0, 0))
+        support = FILTER_SUPPORT[resample]
+        left, top, right, bottom = self.box
+        dest_x0, dest_x1, pad_x0, pad_x1 = _axis_window(left, right, self.size[0], size[0], support)
+        dest_y0, dest_y1, pad_y0, pad_y1 = _axis_window(top, bottom, self.size[1], size[1], support)
+        # 内容周围补足重采样核覆盖的透明像素（不超出原图），各目标像素读取的源像素与整张缩放时相同
+        if (pad_x0, pad_y0, pad_x1, pad_y1) == self.box:
+            source = self.premultiplied
+        else:
+            source = Image.new('RGBa', (pad_x1 - pad_x0, pad_y1 - pad_y0), (0, 0, 0, 0))
+            source.paste(self.premultiplied, (left - pad_x0, top - pad_y0))
+        scale_x, scale_y = self.size[0] / size[0], self.size[1] / size[1]
+        source_box = (dest_x0 * scale_x - pad_x0, dest_y0 * scale_y - pad_y0,
+                      dest_x1 * scale_x - pad_x0, dest_y1 * scale_y - pad_y0)
+        content = source.resize((dest_x1 - dest_x0, dest_y1 - dest_y0), resample, box=source_box).convert('RGBA')
+        content_box = (dest_x0, dest_y0, dest_x1, dest_y1)
+        if content_box == (0, 0) + size:
+            return content
+        result = Image.new('RGBA', size, (0, 0, 0, 0))
+        result.paste(content, content_box[:2])
+        _contents.get_or_create(result, lambda _: content_box)
+        return result
+
+
+def asset_content_box(image):
+    """PreparedAsset.resize 的结果中有内容的范围 (left, top, right, bottom)；没有登记时返回 None"""
+    return _contents.get(image)
+
+
+def paste_asset(canvas, image, xy):
+    """
+    把 RGBA 图片按自身透明度粘贴到画布上，与 canvas.paste(image, xy, mask=image) 结果相同
+    预处理过的资源只混合有内容的部分，透明边距跳过
+    """
+    box = asset_content_box(image)
+    if box is None:
+        canvas.paste(image, xy, mask=image)
+    else:
+        piece = image.crop(box)
+        canvas.paste(piece, (xy[0] + box[0], xy[1] + box[1]), mask=piece)
+    return canvas
+
+
+def load_asset_index(assets_dir):
+    """读取 assets 目录下 asset_optimizer 生成的索引（按目录缓存），没有索引时返回 None"""
+    assets_dir = Path.Path(assets_dir)
+    with _indexes_lock:
+        if assets_dir not in _indexes:
+            path = assets_dir / OPTIMIZED_DIR_NAME / INDEX_FILE_NAME
+            _indexes[assets_dir] = json.loads(path.read_text(encoding='utf-8')) if path.exists() else None
+        return _indexes[assets_dir]
+
+
+def _index_entry(path):
+    """
+    查找资源文件在索引中的条目，返回 (优化后的文件路径, 条目)
+    不在 assets 目录下、没有索引、或源文件在优化之后被修改过时返回 (None, None)
+    """
+    path = Path.Path(path)
+    for assets_dir in path.parents:
+        if assets_dir.name != 'assets':
+            continue
+        index = load_asset_index(assets_dir)
+        entry = index and index['files'].get(path.relative_to(assets_dir).as_posix())
+        if not entry:
+            return None, None
+        if path.exists():
+            stat = os.stat(path)
+            if (stat.st_size, stat.st_mtime_ns) != (entry['source_size'], entry['source_mtime_ns']):
+                return None, None
+        return assets_dir / OPTIMIZED_DIR_NAME / entry['file'], entry
+    return None, None
+
+
+def asset_file(path):
+    """字体等按路径使用的资源：返回优化后（去重）的文件路径，索引中没有时返回原路径"""
+    optimized, _ = _index_entry(path)
+    return str(optimized or path)
+
+
+def open_asset(path):
+    """
+    打开图片资源并转换为 RGBA；索引中有条目时读取优化后的文件，按记录的内容位置还原（裁边前的）尺寸
+    同一个优化后的文件只解码一次，返回的图片在样式之间共享，只能读取（缩放、粘贴、复制），不能就地修改
+    """
+    optimized, entry = _index_entry(path)
+    if optimized is None:
+        with Image.open(path) as source:
+            image = source.convert('RGBA')
+        image.info['asset_source'] = str(path)
+        return image
+    image = _decoded.get(str(optimized))
+    if image is None:
+        with Image.open(optimized) as stored:
+            content = stored.convert('RGBA')
+        canvas_size = tuple(entry['canvas'])
+        if content.size == canvas_size:
+            image = content
+        else:
+            image = Image.new('RGBA', canvas_size, (0, 0, 0, 0))
+            image.paste(content, tuple(entry['offset']))
+        if canvas_size != tuple(entry['size']):
+            image.info['nominal_size'] = tuple(entry['size'])
+        image.info['asset_source'] = str(path)
+        _decoded[str(optimized)] = image
+    return image
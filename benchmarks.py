@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+性能基准 - 用真实样式渲染的箱唛对比不同实现的耗时和输出大小
+
+用法:
+    python benchmarks.py pdf --ppi 150            # PDF 压缩方式：文件大小和编码耗时
+    python benchmarks.py palette --ppi 300        # 调色板模式与 RGB 画布：内存、渲染和 PDF 编码耗时
+    python benchmarks.py cmyk --profile ISOcoated_v2.icc  # CMYK 模式与整张画布 convert('CMYK')：换 SKU 耗时
+    python benchmarks.py stripes --ppi 300        # 斜纹条块：逐条多边形与图块平铺的耗时随箱长的变化
+    python benchmarks.py composite --ppi 300      # 图层合成：逐个 paste 与分段计划合成的耗时
+    python benchmarks.py incremental --ppi 60     # 增量渲染与完整渲染的结果是否一致（换 SKU、换样式）
+"""
+import argparse
+import contextlib
+import io
+import time
+import pathlib as Path
+
+from PIL import Image, ImageChops
+
+from generation_core_v2 import SKUConfig, BoxMarkGenerator
+from pdf_writer import StreamingPDFWriter
+from color_management import CMYKConverter
+from layer_compositor import LayerCompositor, LayerPlan
+import general_functions
+
+
+BASE_DIR = Path.Path(__file__).parent
+
+# 每种样式一个典型尺寸的箱唛
+SAMPLE_SIDE_TEXT = {'gw_value': 30.9, 'nw_value': 24.7, 'sn_code': '09429381135347', 'origin_text': 'MADE IN CHINA'}
+SAMPLE_CASES = {
+    'mcombo_standard': dict(length_cm=77, width_cm=67.5, height_cm=47, color='Beige', product='Lift Recliner',
+                            size='(Oversize)', sponge_verified=True),
+    'barberpub_topandbottom': dict(length_cm=86, width_cm=27, height_cm=76, color='Cream White',
+                                   product='Electric Beauty SPA Chair'),
+    'barberpub_doubleopening': dict(length_cm=86, width_cm=57, height_cm=46, color='Cream White',
+                                    product='Electric Beauty SPA Chair'),
+    'barberpub_fulloverlap': dict(length_cm=86, width_cm=37, height_cm=76, color='Cream White',
+                                  product='Electric Beauty SPA Chair'),
+}
+
+
+def sample_config(style_name, ppi, **changes):
+    """返回某个样式的示例配置"""
+    return SKUConfig(sku_name='6153-SF9908CW-2', style_name=style_name, ppi=ppi,
+                     side_text=SAMPLE_SIDE_TEXT, box_number={'total_boxes': 3, 'current_box': 2},
+                     **{**SAMPLE_CASES[style_name], **changes})
+
+
+def render_sample(style_name, ppi, **changes):
+    """渲染示例箱唛（屏蔽样式代码的调试输出），返回 (sku_config, canvas)"""
+    sku_config = sample_config(style_name, ppi, **changes)
+    generator = BoxMarkGenerator(base_dir=BASE_DIR, style_name=style_name, ppi=ppi)
+    with contextlib.redirect_stdout(io.StringIO()):
+        canvas = generator.generate_complete_layout(sku_config)
+    return sku_config, canvas
+
+
+def timed(func, repeat=3):
+    """运行 repeat 次，返回 (最短耗时秒数, 最后一次的返回值)"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_pdf(styles, ppi, repeat):
+    """对比 Pillow 自带的 PDF 保存和 StreamingPDFWriter 各压缩方式的文件大小与编码耗时"""
+    print(f"PDF 压缩方式对比（{ppi} PPI）")
+    print(f"{'样式':<26}{'方式':<10}{'大小 (KB)':>12}{'编码 (s)':>10}")
+    for style_name in styles:
+        sku_config, canvas = render_sample(style_name, ppi)
+
+        def pillow_pdf():
+            buffer = io.BytesIO()
+            canvas.convert('RGB').save(buffer, 'PDF', resolution=ppi, quality=100)
+            return buffer.getbuffer().nbytes
+
+        def writer_pdf(compression):
+            buffer = io.BytesIO()
+            with StreamingPDFWriter(buffer) as writer:
+                writer.add_page(canvas, ppi, compression=compression)
+            return buffer.getbuffer().nbytes
+
+        rows = [('pillow', *timed(pillow_pdf, repeat))]
+        for compression in StreamingPDFWriter.COMPRESSIONS:
+            rows.append((compression, *timed(lambda: writer_pdf(compression), repeat)))
+        for name, seconds, size in rows:
+            print(f"{style_name:<26}{name:<10}{size / 1024:>12.0f}{seconds:>10.2f}")
+
+
+def bench_palette(styles, ppi, repeat):
+    """对比 RGB 与调色板（'P'）模式：画布内存、增量渲染（换 SKU 名称）耗时和 indexed PDF 编码耗时"""
+    print(f"调色板模式对比（{ppi} PPI）")
+    print(f"{'样式':<26}{'模式':<6}{'画布 (MB)':>11}{'换 SKU (s)':>12}{'PDF (s)':>10}")
+    for style_name in styles:
+        sku_config = sample_config(style_name, ppi)
+        generator = BoxMarkGenerator(base_dir=BASE_DIR, style_name=style_name, ppi=ppi)
+        for color_mode in ('RGB', 'P'):
+            config = sku_config.replace(color_mode=color_mode)
+            with contextlib.redirect_stdout(io.StringIO()):
+                previous = generator.generate_layout_incremental(config)
+                names = iter(range(repeat))
+                seconds, render = timed(lambda: generator.generate_layout_incremental(
+                    config.replace(sku_name=f'6153-SF9908CW-{next(names)}'), previous=previous), repeat)
+            canvas = render['canvas']
+
+            def indexed_pdf():
+                with StreamingPDFWriter(io.BytesIO()) as writer:
+                    writer.add_page(canvas, ppi, compression='indexed')
+
+            pdf_seconds, _ = timed(indexed_pdf, repeat)
+            canvas_mb = canvas.width * canvas.height * len(canvas.getbands()) / (1024 * 1024)
+            print(f"{style_name:<26}{color_mode:<6}{canvas_mb:>11.0f}{seconds:>12.2f}{pdf_seconds:>10.2f}")
+
+
+def bench_cmyk(styles, ppi, repeat, profile):
+    """
+    对比每换一个 SKU 得到 CMYK 画布的耗时：
+    - convert: RGB 增量渲染后整张画布 convert('CMYK')（Pillow 简单公式）
+    - icc:     RGB 增量渲染后整张画布按 ICC 配置文件转换（指定 --profile 时）
+    - native:  CMYK 模式增量渲染，只转换发生变化的面板
+    """
+    converter = CMYKConverter(profile)
+    print(f"CMYK 输出对比（{ppi} PPI，配置文件: {profile or '无（简单公式）'}）")
+    print(f"{'样式':<26}{'方式':<10}{'换 SKU (s)':>12}")
+    for style_name in styles:
+        sku_config = sample_config(style_name, ppi)
+        generator = BoxMarkGenerator(base_dir=BASE_DIR, style_name=style_name, ppi=ppi, cmyk_profile=profile)
+        names = iter(range(1000))
+
+        def next_config(color_mode):
+            return sku_config.replace(sku_name=f'6153-SF9908CW-{next(names)}', color_mode=color_mode)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            rgb_previous = generator.generate_layout_incremental(sku_config)
+            cmyk_previous = generator.generate_layout_incremental(sku_config.replace(color_mode='CMYK'))
+
+            def full_canvas(convert):
+                render = generator.generate_layout_incremental(next_config('RGB'), previous=rgb_previous)
+                return convert(render['canvas'])
+
+            rows = [('convert', timed(lambda: full_canvas(lambda canvas: canvas.convert('CMYK')), repeat)[0])]
+            if profile:
+                rows.append(('icc', timed(lambda: full_canvas(converter.convert), repeat)[0]))
+            rows.append(('native', timed(lambda: generator.generate_layout_incremental(
+                next_config('CMYK'), previous=cmyk_previous), repeat)[0]))
+        for name, seconds in rows:
+            print(f"{style_name:<26}{name:<10}{seconds:>12.2f}")
+
+
+def bench_stripes(lengths, ppi, repeat, stripe_height_cm=1.5, stripe_width_px=150):
+    """斜纹条块的绘制耗时随箱长的变化：逐条多边形（原函数）与预渲染图块平铺（首次含图块渲染 / 缓存命中）"""
+    dpi = ppi / 2.54
+    stripe_h_px = int(stripe_height_cm * dpi)
+    background = (161, 142, 102)
+    print(f"斜纹条块绘制（{ppi} PPI，条纹高 {stripe_height_cm}cm，斜纹宽 {stripe_width_px}px）")
+    print(f"{'箱长 (cm)':<10}{'宽 (px)':>8}{'多边形 (ms)':>13}{'图块首次 (ms)':>15}{'图块 (ms)':>11}")
+    for length_cm in lengths:
+        canvas = Image.new('RGB', (int(length_cm * dpi), stripe_h_px * 2), background)
+
+        def polygons():
+            general_functions.draw_diagonal_stripes(canvas, stripe_height_cm, dpi, 0, stripe_width_px,
+                                                    (0, 0, 0), background)
+
+        def tiled():
+            general_functions.draw_diagonal_stripes_tiled(canvas, stripe_height_cm, dpi, 0, stripe_width_px,
+                                                          (0, 0, 0), background)
+
+        polygon_seconds, _ = timed(polygons, repeat)
+        general_functions._diagonal_stripe_tile.cache_clear()
+        cold_seconds, _ = timed(tiled, 1)
+        tiled_seconds, _ = timed(tiled, repeat)
+        print(f"{length_cm:<10}{canvas.width:>8}{polygon_seconds * 1000:>13.1f}"
+              f"{cold_seconds * 1000:>15.1f}{tiled_seconds * 1000:>11.1f}")
+
+
+def bench_composite(styles, ppi, repeat, icon_height_cm=12):
+    """
+    把样式的全部 RGBA 资源（缩放到同一高度、依次错开叠放）合成到正面大小的画布上：
+    - paste:   逐个 canvas.paste(icon, xy, mask=icon)
+    - plan:    建立全部分段计划（首次合成共享图标时的额外耗时）
+    - layers:  LayerCompositor 按缓存的分段计划合成
+    """
+    dpi = ppi / 2.54
+    print(f"图层合成对比（{ppi} PPI，图标高 {icon_height_cm}cm）")
+    print(f"{'样式':<26}{'图层':>6}{'paste (ms)':>12}{'plan (ms)':>11}{'layers (ms)':>13}")
+    for style_name in styles:
+        sku_config = sample_config(style_name, ppi)
+        generator = BoxMarkGenerator(base_dir=BASE_DIR, style_name=style_name, ppi=ppi)
+        icons = [general_functions.scale_by_height(image, int(icon_height_cm * dpi))
+                 for image in generator.style.resources.values()
+                 if isinstance(image, Image.Image) and image.mode == 'RGBA']
+        canvas = Image.new('RGB', (sku_config.l_px, sku_config.h_px), sku_config.background_color)
+        step_x = max(1, (canvas.width - min(icon.width for icon in icons)) // len(icons))
+        step_y = max(1, (canvas.height - icons[0].height) // len(icons))
+        positions = [(i * step_x, i * step_y) for i in range(len(icons))]
+
+        def paste_chain():
+            for icon, xy in zip(icons, positions):
+                canvas.paste(icon, xy, mask=icon)
+
+        def compositor():
+            layers = LayerCompositor()
+            for icon, xy in zip(icons, positions):
+                layers.add(icon, xy, shared=True)
+            layers.composite(canvas)
+
+        paste_seconds, _ = timed(paste_chain, repeat)
+        plan_seconds, _ = timed(lambda: [LayerPlan(icon) for icon in icons], 1)
+        compositor()
+        layers_seconds, _ = timed(compositor, repeat)
+        print(f"{style_name:<26}{len(icons):>6}{paste_seconds * 1000:>12.1f}{plan_seconds * 1000:>11.1f}"
+              f"{layers_seconds * 1000:>13.1f}")
+
+
+def bench_incremental(styles, ppi, repeat):
+    """
+    检查增量渲染（previous=上一次结果）与完整渲染的画布是否逐像素一致，并对比耗时：
+    - 换 SKU：同一样式只改 SKU 名称
+    - 换样式：上一次结果来自另一个样式（布局可能相同，映射的面板不同）
+    """
+    print(f"增量渲染一致性（{ppi} PPI）")
+    print(f"{'场景':<52}{'不同像素':>10}{'增量 (s)':>10}{'完整 (s)':>10}")
+    generators = {style_name: BoxMarkGenerator(base_dir=BASE_DIR, style_name=style_name, ppi=ppi)
+                  for style_name in styles}
+    cases = [(style_name, style_name) for style_name in styles]
+    cases += [(before, after) for before in styles for after in styles if before != after]
+    for before, after in cases:
+        sku_config = sample_config(after, ppi)
+        # 上一次结果：同一样式时换一个 SKU 名称；换样式时用另一个样式、相同的箱子尺寸渲染
+        dimensions = {key: SAMPLE_CASES[after][key] for key in ('length_cm', 'width_cm', 'height_cm')}
+        previous_config = sample_config(before, ppi, **dimensions)
+        if before == after:
+            previous_config = previous_config.replace(sku_name='6153-SF9908CW-9')
+        with contextlib.redirect_stdout(io.StringIO()):
+            previous = generators[before].generate_layout_incremental(previous_config)
+            incremental_seconds, render = timed(
+                lambda: generators[after].generate_layout_incremental(sku_config, previous=previous), repeat)
+            fresh_seconds, fresh = timed(lambda: generators[after].generate_layout_incremental(sku_config), repeat)
+        diff = ImageChops.difference(render['canvas'].convert('RGB'), fresh['canvas'].convert('RGB'))
+        mismatched = sum(diff.convert('L').point(lambda value: 255 if value else 0).histogram()[255:])
+        name = f"{before} -> {after}" if before != after else f"{after}（换 SKU）"
+        print(f"{name:<52}{mismatched:>10}{incremental_seconds:>10.2f}{fresh_seconds:>10.2f}")
+
+
+def main():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--styles', nargs='*', default=list(SAMPLE_CASES), help='参与测试的样式')
+    common.add_argument('--repeat', type=int, default=3, help='每项重复次数（取最短耗时）')
+    parser = argparse.ArgumentParser(description='箱唛生成性能基准')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    pdf_parser = subparsers.add_parser('pdf', parents=[common], help='PDF 压缩方式：文件大小和编码耗时')
+    pdf_parser.add_argument('--ppi', type=int, default=150)
+
+    palette_parser = subparsers.add_parser('palette', parents=[common], help='调色板模式与 RGB 画布：内存和耗时')
+    palette_parser.add_argument('--ppi', type=int, default=300)
+
+    cmyk_parser = subparsers.add_parser('cmyk', parents=[common], help='CMYK 模式与整张画布转换：换 SKU 耗时')
+    cmyk_parser.add_argument('--ppi', type=int, default=300)
+    cmyk_parser.add_argument('--profile', default=None, help='CMYK ICC 配置文件路径')
+
+    stripes_parser = subparsers.add_parser('stripes', parents=[common], help='斜纹条块：多边形与图块平铺的耗时')
+    stripes_parser.add_argument('--ppi', type=int, default=300)
+    stripes_parser.add_argument('--lengths', type=float, nargs='*', default=[50, 100, 200, 400],
+                                help='箱长（cm）')
+
+    composite_parser = subparsers.add_parser('composite', parents=[common], help='图层合成：paste 与分段计划合成的耗时')
+    composite_parser.add_argument('--ppi', type=int, default=300)
+
+    incremental_parser = subparsers.add_parser('incremental', parents=[common],
+                                               help='增量渲染与完整渲染的一致性（换 SKU、换样式）')
+    incremental_parser.add_argument('--ppi', type=int, default=60)
+
+    args = parser.parse_args()
+    if args.benchmark == 'pdf':
+        bench_pdf(args.styles, args.ppi, args.repeat)
+    elif args.benchmark == 'palette':
+        bench_palette(args.styles, args.ppi, args.repeat)
+    elif args.benchmark == 'cmyk':
+        bench_cmyk(args.styles, args.ppi, args.repeat, args.profile)
+    elif args.benchmark == 'stripes':
+        bench_stripes(args.lengths, args.ppi, args.repeat)
+    elif args.benchmark == 'composite':
+        bench_composite(args.styles, args.ppi, args.repeat)
+    elif args.benchmark == 'incremental':
+        bench_incremental(args.styles, args.ppi, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
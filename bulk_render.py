@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+批量渲染 - 从 CSV / Excel 表格读取多个 SKU，多进程并行渲染
+每完成一个 PDF 就写入磁盘上的 ZIP 并删除临时文件，内存中不会同时保存所有 PDF
+进程数和同时渲染的任务按内存预算限制：工作进程使用较小的缓存，任务按预估峰值内存提交
+
+表格第一行为列名，每行一个箱唛：
+    基本列: sku_name, length_cm, width_cm, height_cm, style_name, ppi, bottom_gb_h_cm, pdf_compression
+    样式列: color, product, size, sponge_verified
+    侧唛列: gw_value, nw_value, sn_code, origin_text, dimention_text  -> side_text
+    箱号列: total_boxes, current_box                                  -> box_number
+空单元格视为未填写；style_name / ppi 列缺失或为空时使用页面上选择的默认值
+"""
+import csv
+import io
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from generation_core_v2 import SKUConfig
+from render_worker import init_render_worker, render_to_file, estimate_render_bytes
+
+
+BASE_COLUMNS = ('sku_name', 'length_cm', 'width_cm', 'height_cm', 'style_name', 'ppi', 'bottom_gb_h_cm',
+                'pdf_compression', 'color', 'product', 'size', 'sponge_verified')
+SIDE_TEXT_COLUMNS = ('gw_value', 'nw_value', 'sn_code', 'origin_text', 'dimention_text')
+BOX_NUMBER_COLUMNS = ('total_boxes', 'current_box')
+FLOAT_COLUMNS = ('length_cm', 'width_cm', 'height_cm', 'bottom_gb_h_cm', 'gw_value', 'nw_value')
+INT_COLUMNS = ('ppi', 'total_boxes', 'current_box')
+TRUE_VALUES = ('1', 'true', 'yes', 'y', '是')
+
+# 批量任务中每个 SKU 基本都不同，面板缓存几乎不会命中；工作进程的每个 (样式, PPI) 生成器只保留较小的缓存
+BULK_PANEL_CACHE_MB = 32
+BULK_TEMPLATE_CACHE_MB = 64
+# 会话关闭后没有清理的工作目录（含 ZIP）超过这个时间即删除
+WORK_DIR_PREFIX = 'boxmark-bulk-'
+WORK_DIR_MAX_AGE_HOURS = 24
+
+
+def read_sku_table(data, filename):
+    """
+    读取上传的表格，返回每行一个 {列名: 字符串} 的列表
+    支持 .csv（UTF-8 / GBK）和 .xlsx（需要安装 openpyxl）
+    """
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        try:
+            import openpyxl
+        except ImportError:
+            raise ValueError("读取 Excel 需要安装 openpyxl：pip install openpyxl，或把表格另存为 CSV")
+        workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+        try:
+            rows = [['' if cell is None else str(cell) for cell in row]
+                    for row in workbook.worksheets[0].iter_rows(values_only=True)]
+        finally:
+            workbook.close()
+    else:
+        for encoding in ('utf-8-sig', 'gbk'):
+            try:
+                text = data.decode(encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+        else:
+            raise ValueError("无法识别 CSV 编码，请保存为 UTF-8 格式")
+        rows = list(csv.reader(io.StringIO(text)))
+
+    if not rows:
+        raise ValueError("表格为空")
+    header = [name.strip() for name in rows[0]]
+    return [dict(zip(header, (value.strip() for value in row)))
+            for row in rows[1:] if any(value.strip() for value in row)]
+
+
+def row_to_config(row, default_style, default_ppi):
+    """把表格中的一行转换为 SKUConfig；数值格式错误或缺少必需列时抛出 ValueError"""
+    values = {}
+    for name, value in row.items():
+        if value == '':
+            continue
+        if name in FLOAT_COLUMNS:
+            value = float(value)
+        elif name in INT_COLUMNS:
+            value = int(float(value))
+        elif name == 'sponge_verified':
+            value = value.lower() in TRUE_VALUES
+        values[name] = value
+
+    unknown = set(values) - set(BASE_COLUMNS + SIDE_TEXT_COLUMNS + BOX_NUMBER_COLUMNS)
+    if unknown:
+        raise ValueError(f"不支持的列: {sorted(unknown)}")
+    config_data = {name: values[name] for name in BASE_COLUMNS if name in values}
+    config_data.setdefault('style_name', default_style)
+    config_data.setdefault('ppi', default_ppi)
+    if any(name in values for name in SIDE_TEXT_COLUMNS):
+        config_data['side_text'] = {name: values.get(name) for name in SIDE_TEXT_COLUMNS if name in values}
+    if any(name in values for name in BOX_NUMBER_COLUMNS):
+        config_data['box_number'] = {name: values.get(name) for name in BOX_NUMBER_COLUMNS}
+    return SKUConfig.from_dict(config_data)
+
+
+def parse_sku_table(data, filename, default_style, default_ppi):
+    """
+    读取并校验整张表格
+    Returns:
+        tuple: ([(行号, SKUConfig), ...], [(行号, 错误信息), ...])，行号从表格第 2 行（第一条数据）开始计
+    """
+    configs, errors = [], []
+    for row_number, row in enumerate(read_sku_table(data, filename), start=2):
+        try:
+            configs.append((row_number, row_to_config(row, default_style, default_ppi)))
+        except (ValueError, TypeError, KeyError) as e:
+            errors.append((row_number, str(e)))
+    return configs, errors
+
+
+def _archive_name(row_number, sku_name):
+    """ZIP 内的文件名：行号前缀保证唯一，去掉文件名中不允许的字符"""
+    safe_name = re.sub(r'[\\/:*?"<>|\s]+', '_', sku_name).strip('_') or 'carton_marking'
+    return f"{row_number:04d}_{safe_name}.pdf"
+
+
+def cleanup_stale_work_dirs(max_age_hours=WORK_DIR_MAX_AGE_HOURS):
+    """删除临时目录下超过 max_age_hours 没有写入的批量任务工作目录（浏览器关闭后会话不会调用 cleanup）"""
+    cutoff = time.time() - max_age_hours * 3600
+    root = tempfile.gettempdir()
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if not name.startswith(WORK_DIR_PREFIX) or not os.path.isdir(path):
+            continue
+        try:
+            newest = max([os.path.getmtime(path)] +
+                         [os.path.getmtime(os.path.join(path, entry)) for entry in os.listdir(path)])
+        except OSError:
+            continue
+        if newest < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class BulkRenderJob:
+    """
+    后台批量渲染任务
+    - 渲染在进程池中并行进行，每个进程按 (样式, PPI) 复用预热好的生成器
+    - memory_budget_mb: 工作进程缓存与同时渲染的任务（按 estimate_render_bytes 预估）之和的上限，
+      据此减少进程数；预算不够时任务排队，只有一个任务在渲染时总是允许提交
+    - 每个 PDF 完成后立即写入 ZIP（不压缩，PDF 本身已压缩）并删除临时文件
+    - 状态: 'running' -> 'done' / 'cancelled' / 'failed'
+    """
+
+    def __init__(self, configs, base_dir, workers=None, memory_budget_mb=2048):
+        self.configs = configs
+        self.base_dir = base_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.total = len(configs)
+        self.completed = 0
+        self.failures = []  # [(行号, SKU 名称, 错误信息), ...]
+        self.status = 'running'
+        self.error = None
+        cleanup_stale_work_dirs()
+        self.work_dir = tempfile.mkdtemp(prefix=WORK_DIR_PREFIX)
+        self.zip_path = os.path.join(self.work_dir, 'carton_markings.zip')
+        self.cancel_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='boxmark-bulk', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    @property
+    def progress(self):
+        return (self.completed + len(self.failures)) / self.total if self.total else 1.0
+
+    def done(self):
+        return self.status != 'running'
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def read_zip(self):
+        """读取 ZIP 内容（供下载按钮在点击时调用，读取后关闭文件）"""
+        with open(self.zip_path, 'rb') as f:
+            return f.read()
+
+    def cleanup(self):
+        """删除工作目录（包括 ZIP），用于开始新任务或会话结束前"""
+        self.cancel()
+        self._thread.join()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def plan_workers(self, warm):
+        """
+        按内存预算确定进程数，返回 (进程数, 渲染任务可用的预算字节数)
+        每个进程为用到的每种 (样式, PPI) 各保留一份缓存，再加上最大的单个任务
+        """
+        cache_bytes = len(warm) * (BULK_PANEL_CACHE_MB + BULK_TEMPLATE_CACHE_MB) * 1024 * 1024
+        largest = max((estimate_render_bytes(config) for _, config in self.configs), default=0)
+        workers = max(1, min(self.workers, self.total, self.memory_budget // (cache_bytes + largest or 1)))
+        return workers, self.memory_budget - workers * cache_bytes
+
+    def _run(self):
+        spool_dir = os.path.join(self.work_dir, 'spool')
+        pool = None
+        pending = deque(self.configs)
+        running = {}  # future -> (行号, SKUConfig, 预估字节数)
+        reserved = 0
+        # 准备阶段（建目录、规划进程数、启动进程池）出错也要把状态置为 failed，不能一直停在 running
+        try:
+            os.mkdir(spool_dir)
+            warm = sorted({(config.style_name, config.ppi) for _, config in self.configs})
+            workers, render_budget = self.plan_workers(warm)
+            # spawn 启动的工作进程不会继承 Web 服务的线程和锁，预热本任务用到的所有 (样式, PPI)
+            pool = ProcessPoolExecutor(max_workers=workers,
+                                       mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=init_render_worker,
+                                       initargs=(self.base_dir, None, spool_dir, tuple(warm),
+                                                 BULK_PANEL_CACHE_MB, BULK_TEMPLATE_CACHE_MB))
+            with zipfile.ZipFile(self.zip_path, 'w', compression=zipfile.ZIP_STORED) as archive:
+                while (pending or running) and not self.cancel_event.is_set():
+                    # 按表格顺序提交：进程有空闲且预估内存放得下时提交，没有任务在渲染时总是提交
+                    while pending and len(running) < workers:
+                        row_number, config = pending[0]
+                        nbytes = estimate_render_bytes(config)
+                        if running and reserved + nbytes > render_budget:
+                            break
+                        pending.popleft()
+                        future = pool.submit(render_to_file, config.to_dict(), 'pdf', None)
+                        running[future] = (row_number, config, nbytes)
+                        reserved += nbytes
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        row_number, config, nbytes = running.pop(future)
+                        reserved -= nbytes
+                        try:
+                            path, size, seconds = future.result()
+                        except Exception as e:
+                            self.failures.append((row_number, config.sku_name, str(e)))
+                            continue
+                        archive.write(path, _archive_name(row_number, config.sku_name))
+                        os.remove(path)
+                        self.completed += 1
+            self.status = 'cancelled' if self.cancel_event.is_set() else 'done'
+        except Exception as e:
+            self.error = str(e)
+            self.status = 'failed'
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+
+def template_csv(style_name, ppi):
+    """生成批量上传用的 CSV 模板（含一行示例）"""
+    header = list(BASE_COLUMNS + SIDE_TEXT_COLUMNS + BOX_NUMBER_COLUMNS)
+    example = {
+        'sku_name': 'CA-6160-OE678BR-1', 'length_cm': 77, 'width_cm': 67.5, 'height_cm': 47,
+        'style_name': style_name, 'ppi': ppi, 'color': 'Beige', 'product': 'Lift Recliner',
+        'size': '(Oversize)', 'sponge_verified': '是', 'gw_value': 106.9, 'nw_value': 94.4,
+        'sn_code': '08429381073953', 'total_boxes': 3, 'current_box': 1,
+    }
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    writer.writerow([example.get(name, '') for name in header])
+    return buffer.getvalue().encode('utf-8-sig')
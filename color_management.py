@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+印刷色彩管理 - 基于 ICC 配置文件的 RGB -> CMYK 转换
+- 转换对象（ImageCms）按 (配置文件, 渲染意图) 只构建一次并缓存，查找表的计算不会在每次转换时重复
+- CMYK 模式下样式仍按 RGB 绘制面板，面板生成后转换为 CMYK 并按面板对象缓存：
+  背景、Logo、斜纹等静态面板只转换一次，换 SKU 时只转换包含文字/条码的面板，不再合成后整张画布转换
+- 未指定配置文件时使用 Pillow 内置的简单公式（与 convert('CMYK') 相同，不做色彩管理）
+
+配置文件可以在创建生成器时传入，也可以用环境变量 BOXMARK_CMYK_PROFILE 指定（如印厂提供的 ISOcoated_v2.icc）
+"""
+import os
+import threading
+from PIL import Image, ImageCms
+
+from style_base import DerivedImageCache
+
+
+DEFAULT_CMYK_PROFILE = os.environ.get('BOXMARK_CMYK_PROFILE') or None
+RENDERING_INTENTS = {
+    'perceptual': ImageCms.Intent.PERCEPTUAL,
+    'relative': ImageCms.Intent.RELATIVE_COLORIMETRIC,
+    'saturation': ImageCms.Intent.SATURATION,
+    'absolute': ImageCms.Intent.ABSOLUTE_COLORIMETRIC,
+}
+
+_transforms = {}
+_transforms_lock = threading.Lock()
+
+
+def rgb_to_cmyk_transform(profile, intent='perceptual'):
+    """返回 sRGB -> CMYK 配置文件的转换对象，按 (配置文件路径, 渲染意图) 缓存"""
+    key = (str(profile), intent)
+    with _transforms_lock:
+        transform = _transforms.get(key)
+        if transform is None:
+            transform = ImageCms.buildTransform(ImageCms.createProfile('sRGB'), str(profile), 'RGB', 'CMYK',
+                                                renderingIntent=RENDERING_INTENTS[intent])
+            _transforms[key] = transform
+    return transform
+
+
+class CMYKConverter:
+    """
+    RGB -> CMYK 转换器，一个生成器一个
+    - convert_panel: 面板按对象缓存转换结果（面板缓存命中时不会重复转换）
+    - ink / new_canvas: 边框、底色等固定颜色只换算一次
+    """
+
+    def __init__(self, profile=DEFAULT_CMYK_PROFILE, intent='perceptual'):
+        if intent not in RENDERING_INTENTS:
+            raise ValueError(f"不支持的渲染意图: {intent}，可选: {', '.join(RENDERING_INTENTS)}")
+        self.profile = profile
+        self.intent = intent
+        self.transform = rgb_to_cmyk_transform(profile, intent) if profile else None
+        self._panels = DerivedImageCache()
+        self._inks = {}
+
+    def convert(self, image):
+        """把 RGB / RGBA 图像转换为 CMYK（RGBA 的透明度丢弃，面板都是不透明的）"""
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        if self.transform is None:
+            return image.convert('CMYK')
+        return ImageCms.applyTransform(image, self.transform)
+
+    def convert_panel(self, panel):
+        """转换面板并按对象缓存：同一个 RGB 面板（来自面板缓存）总是得到同一个 CMYK 面板"""
+        return self._panels.get_or_create(panel, self.convert)
+
+    def ink(self, color):
+        """RGB 颜色对应的 CMYK 值（按颜色缓存）"""
+        color = tuple(color[:3])
+        ink = self._inks.get(color)
+        if ink is None:
+            ink = self.convert(Image.new('RGB', (1, 1), color)).getpixel((0, 0))
+            self._inks[color] = ink
+        return ink
+
+    def new_canvas(self, size, color):
+        """创建以该 RGB 颜色为底色的 CMYK 画布"""
+        return Image.new('CMYK', size, self.ink(color))
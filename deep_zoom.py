@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+深度缩放瓦片 - 把整张高清画布写成 DZI 格式的瓦片金字塔（每级 256 像素的瓦片），浏览器只下载可见范围的瓦片
+缩小到 2000 像素的预览看不清条码数字和小号标签文字，而整张 27000 像素的画布又不能整体编码发送：
+- 画布按条带读取（每条带 TILE_SIZE 行），每条带切出一行瓦片后立即写盘，同时 2 倍缩小送给下一级，逐级向下
+- 每一级只保留一行瓦片（加上重叠像素）的缓冲，内存与画布宽度成正比，不生成任何一级的整幅图片
+- 目录结构与 Deep Zoom（OpenSeadragon 等查看器通用）一致：<name>.dzi + <name>_files/<级别>/<列>_<行>.jpg
+
+viewer_html 返回一个不依赖外部脚本的查看器页面（拖动平移、滚轮缩放、双击复位），可放进 st.components.v1.html
+
+用法:
+    dzi_path = write_deep_zoom(canvas, 'static/dzi/6153-SF9908CW-2')
+"""
+import json
+import math
+import pathlib as Path
+import shutil
+from PIL import Image
+
+
+TILE_SIZE = 256
+TILE_OVERLAP = 1
+TILE_FORMAT = 'jpg'
+TILE_QUALITY = 85
+
+
+class _PyramidLevel:
+    """金字塔中的一级：累积条带，凑够一行瓦片（含重叠像素）就切片写盘"""
+
+    def __init__(self, writer, level, size):
+        self.writer = writer
+        self.level = level
+        self.width, self.height = size
+        self.directory = writer.files_dir / str(level)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.buffer = None   # 缓冲的行（画布的 [top, top + buffer.height) 行）
+        self.top = 0
+        self.next_row = 0    # 下一行要写出的瓦片行号
+        self.carry = None    # 缩小到下一级时剩下的奇数行
+
+    def feed(self, band):
+        """追加条带（宽度等于本级宽度），写出已凑齐的瓦片行，并把 2 倍缩小的结果送给下一级"""
+        if self.buffer is None:
+            self.buffer = band
+        else:
+            merged = Image.new(band.mode, (self.width, self.buffer.height + band.height))
+            merged.paste(self.buffer, (0, 0))
+            merged.paste(band, (0, self.buffer.height))
+            self.buffer = merged
+        self._write_ready_rows()
+        if self.level > 0:
+            self._reduce(band)
+
+    def _reduce(self, band):
+        # 按偶数行缩小，结果与整幅图片 reduce(2) 相同；奇数行留到下一条带
+        if self.carry is not None:
+            merged = Image.new(band.mode, (self.width, band.height + 1))
+            merged.paste(self.carry, (0, 0))
+            merged.paste(band, (0, 1))
+            band, self.carry = merged, None
+        if band.height % 2:
+            self.carry = band.crop((0, band.height - 1, self.width, band.height))
+            band = band.crop((0, 0, self.width, band.height - 1))
+        if band.height:
+            self.writer.levels[self.level - 1].feed(band.reduce(2))
+
+    def _row_span(self, row):
+        """瓦片行 row 覆盖的像素行范围（含上下重叠）"""
+        tile, overlap = self.writer.tile_size, self.writer.overlap
+        return max(0, row * tile - overlap), min(self.height, (row + 1) * tile + overlap)
+
+    def _write_ready_rows(self):
+        tile, overlap = self.writer.tile_size, self.writer.overlap
+        bottom = self.top + self.buffer.height
+        while self.next_row * tile < self.height:
+            row_top, row_bottom = self._row_span(self.next_row)
+            if bottom < row_bottom:
+                break
+            strip = self.buffer.crop((0, row_top - self.top, self.width, row_bottom - self.top))
+            for column in range(math.ceil(self.width / tile)):
+                left = max(0, column * tile - overlap)
+                right = min(self.width, (column + 1) * tile + overlap)
+                self.writer.save_tile(strip.crop((left, 0, right, strip.height)),
+                                      self.directory / f"{column}_{self.next_row}.{self.writer.tile_format}")
+            self.next_row += 1
+            # 只保留下一行瓦片需要的重叠像素
+            keep_from = min(self.next_row * tile - overlap, bottom)
+            self.buffer = self.buffer.crop((0, keep_from - self.top, self.width, self.buffer.height))
+            self.top = keep_from
+
+    def flush(self):
+        """画布结束：剩下的奇数行缩小后送给下一级"""
+        if self.level > 0 and self.carry is not None:
+            carry, self.carry = self.carry, None
+            self.writer.levels[self.level - 1].feed(carry.reduce(2))
+
+
+class DeepZoomWriter:
+    """
+    按条带写 DZI 瓦片金字塔
+    用法:
+        writer = DeepZoomWriter(output_dir, canvas.size)
+        for band in bands:          # 自上而下、宽度等于画布宽度的 RGB 条带
+            writer.add_band(band)
+        dzi_path = writer.close()
+    """
+
+    def __init__(self, output_dir, size, name='dieline', tile_size=TILE_SIZE, overlap=TILE_OVERLAP,
+                 tile_format=TILE_FORMAT, quality=TILE_QUALITY):
+        self.output_dir = Path.Path(output_dir)
+        self.size = tuple(size)
+        self.name = name
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.tile_format = tile_format
+        self.quality = quality
+        self.files_dir = self.output_dir / f"{name}_files"
+        self.max_level = max(0, math.ceil(math.log2(max(self.size))))
+        self.levels = [
+            _PyramidLevel(self, level, (math.ceil(self.size[0] / 2 ** (self.max_level - level)),
+                                        math.ceil(self.size[1] / 2 ** (self.max_level - level))))
+            for level in range(self.max_level + 1)
+        ]
+        self.tile_count = 0
+
+    def save_tile(self, tile, path):
+        if self.tile_format == 'jpg':
+            tile.save(path, 'JPEG', quality=self.quality)
+        else:
+            tile.save(path, 'PNG')
+        self.tile_count += 1
+
+    def add_band(self, band):
+        self.levels[self.max_level].feed(band)
+
+    def close(self):
+        """写出剩余的行和 .dzi 描述文件，返回 .dzi 文件路径"""
+        for level in reversed(self.levels):
+            level.flush()
+        dzi_path = self.output_dir / f"{self.name}.dzi"
+        dzi_path.write_text(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" TileSize="{self.tile_size}" '
+            f'Overlap="{self.overlap}" Format="{self.tile_format}">'
+            f'<Size Width="{self.size[0]}" Height="{self.size[1]}"/></Image>\n', encoding='utf-8')
+        return dzi_path
+
+
+def write_deep_zoom(canvas, output_dir, name='dieline', tile_size=TILE_SIZE, **options):
+    """
+    把画布（任意颜色模式）按条带写成 DZI 瓦片金字塔，返回 .dzi 文件路径
+    每次只把 tile_size 行转换为 RGB，不生成整张画布的副本
+    """
+    writer = DeepZoomWriter(output_dir, canvas.size, name=name, tile_size=tile_size, **options)
+    width, height = canvas.size
+    for top in range(0, height, tile_size):
+        band = canvas.crop((0, top, width, min(top + tile_size, height)))
+        writer.add_band(band if band.mode == 'RGB' else band.convert('RGB'))
+    return writer.close()
+
+
+def prune_tile_sets(root, keep):
+    """只保留 root 下最近写入的 keep 个瓦片目录（每个目录一套金字塔），删除其余的"""
+    root = Path.Path(root)
+    if not root.is_dir():
+        return
+    tile_sets = sorted((path for path in root.iterdir() if path.is_dir()), key=lambda path: path.stat().st_mtime,
+                       reverse=True)
+    for path in tile_sets[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def viewer_html(dzi_url, height=700):
+    """
+    返回查看 DZI 的 HTML 页面（不依赖外部脚本）：按当前缩放选择级别，只下载可见范围的瓦片，
+    新级别的瓦片加载完成前先显示低一级的瓦片；拖动平移，滚轮缩放，双击复位
+    """
+    return _VIEWER_TEMPLATE.replace('__DZI_URL__', json.dumps(dzi_url)).replace('__HEIGHT__', str(int(height)))
+
+
+_VIEWER_TEMPLATE = """
+<div id="dz" style="position:relative;width:100%;height:__HEIGHT__px;background:#f0f0f0;cursor:grab;overflow:hidden">
+  <canvas id="dz-canvas" style="width:100%;height:100%;display:block"></canvas>
+  <div id="dz-info" style="position:absolute;right:8px;bottom:6px;font:12px sans-serif;color:#555"></div>
+</div>
+<script>
+(function () {
+  const dziUrl = __DZI_URL__;
+  const filesUrl = dziUrl.replace(/\\.dzi$/, '_files/');
+  const box = document.getElementById('dz'), canvas = document.getElementById('dz-canvas');
+  const info = document.getElementById('dz-info'), ctx = canvas.getContext('2d');
+  const tiles = new Map();
+  let meta = null, scale = 1, offsetX = 0, offsetY = 0, drawQueued = false;
+
+  function resize() {
+    canvas.width = box.clientWidth * devicePixelRatio;
+    canvas.height = box.clientHeight * devicePixelRatio;
+    requestDraw();
+  }
+  function fit() {
+    scale = Math.min(canvas.width / meta.width, canvas.height / meta.height);
+    offsetX = (canvas.width - meta.width * scale) / 2;
+    offsetY = (canvas.height - meta.height * scale) / 2;
+    requestDraw();
+  }
+  function requestDraw() {
+    if (!drawQueued && meta) { drawQueued = true; requestAnimationFrame(draw); }
+  }
+  function tile(level, col, row) {
+    const key = level + '/' + col + '_' + row;
+    let image = tiles.get(key);
+    if (!image) {
+      image = new Image();
+      image.onload = requestDraw;
+      image.src = filesUrl + key + '.' + meta.format;
+      tiles.set(key, image);
+    }
+    return image;
+  }
+  function drawLevel(level, load) {
+    const factor = Math.pow(2, meta.maxLevel - level);
+    const levelW = Math.ceil(meta.width / factor), levelH = Math.ceil(meta.height / factor);
+    const s = scale * factor, size = meta.tileSize, overlap = meta.overlap;
+    const col0 = Math.max(0, Math.floor(-offsetX / s / size)), row0 = Math.max(0, Math.floor(-offsetY / s / size));
+    const col1 = Math.min(Math.ceil(levelW / size) - 1, Math.floor((canvas.width - offsetX) / s / size));
+    const row1 = Math.min(Math.ceil(levelH / size) - 1, Math.floor((canvas.height - offsetY) / s / size));
+    let complete = true;
+    for (let row = row0; row <= row1; row++) {
+      for (let col = col0; col <= col1; col++) {
+        const key = level + '/' + col + '_' + row;
+        const image = load ? tile(level, col, row) : tiles.get(key);
+        if (!image || !image.complete || !image.naturalWidth) { complete = false; continue; }
+        const x = col * size - (col ? overlap : 0), y = row * size - (row ? overlap : 0);
+        ctx.drawImage(image, offsetX + x * s, offsetY + y * s, image.naturalWidth * s, image.naturalHeight * s);
+      }
+    }
+    return complete;
+  }
+  function draw() {
+    drawQueued = false;
+    ctx.fillStyle = '#f0f0f0';
+    ctx.fillRect(0, 0, canvas.width, canvas.height);
+    const level = Math.max(0, Math.min(meta.maxLevel, meta.maxLevel + Math.ceil(Math.log2(scale))));
+    // 目标级别的瓦片加载完成前，先用已下载的低级别瓦片垫底
+    for (let fallback = Math.max(0, level - 4); fallback < level; fallback++) drawLevel(fallback, false);
+    drawLevel(level, true);
+    info.textContent = Math.round(scale * 1000) / 10 + '%';
+  }
+
+  fetch(dziUrl).then(r => r.text()).then(text => {
+    const xml = new DOMParser().parseFromString(text, 'application/xml');
+    const image = xml.documentElement, size = xml.getElementsByTagName('Size')[0];
+    meta = {
+      tileSize: +image.getAttribute('TileSize'), overlap: +image.getAttribute('Overlap'),
+      format: image.getAttribute('Format'),
+      width: +size.getAttribute('Width'), height: +size.getAttribute('Height'),
+    };
+    meta.maxLevel = Math.ceil(Math.log2(Math.max(meta.width, meta.height)));
+    resize();
+    fit();
+  });
+
+  let drag = null;
+  canvas.addEventListener('mousedown', e => { drag = [e.clientX, e.clientY]; box.style.cursor = 'grabbing'; });
+  window.addEventListener('mouseup', () => { drag = null; box.style.cursor = 'grab'; });
+  window.addEventListener('mousemove', e => {
+    if (!drag) return;
+    offsetX += (e.clientX - drag[0]) * devicePixelRatio;
+    offsetY += (e.clientY - drag[1]) * devicePixelRatio;
+    drag = [e.clientX, e.clientY];
+    requestDraw();
+  });
+  canvas.addEventListener('wheel', e => {
+    e.preventDefault();
+    const rect = canvas.getBoundingClientRect();
+    const x = (e.clientX - rect.left) * devicePixelRatio, y = (e.clientY - rect.top) * devicePixelRatio;
+    const factor = Math.exp(-e.deltaY * 0.0015);
+    const newScale = Math.min(4, Math.max(scale * factor, 0.5 * Math.min(canvas.width / meta.width, canvas.height / meta.height)));
+    offsetX = x - (x - offsetX) * newScale / scale;
+    offsetY = y - (y - offsetY) * newScale / scale;
+    scale = newScale;
+    requestDraw();
+  }, {passive: false});
+  canvas.addEventListener('dblclick', fit);
+  window.addEventListener('resize', resize);
+})();
+</script>
+"""
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+绘制记录（display list）- 把箱唛的排版结果记录为与分辨率无关的绘制操作，再由各输出后端回放
+排版（布局、文字自适应字号、资源缩放尺寸）只计算一次，预览、印刷栅格、PDF 各自只需要回放：
+- 所有坐标和尺寸的单位都是 cm，回放时按目标分辨率换算为像素
+- 声明式样式（style_spec）的面板记录为文字、图片、矩形、条码、虚线等操作，任意分辨率回放都是清晰的
+- Python 样式类的面板按生成时的分辨率记录为一张图片，只能按不高于记录分辨率的 ppi 回放（缩小时重采样），
+  按更高的 ppi 回放会抛出 ValueError，需要用目标分辨率重新记录
+- 同一个面板粘贴到多个区域时共用同一份记录，回放时只绘制一次
+
+用法:
+    display_list = generator.record_display_list(sku_config)   # 每个 SKU 排版一次
+    preview = display_list.rasterize(40)                       # 预览
+    display_list.write_pdf('print.pdf', 300)                   # 印刷 PDF
+"""
+import functools
+from PIL import Image, ImageDraw, ImageFont
+
+from style_base import DerivedImageCache
+from asset_preprocessing import PreparedAsset, paste_asset
+from pdf_writer import StreamingPDFWriter
+import general_functions
+import shape_primitives
+
+
+# 换算为像素后保留的小数位数：消除 cm 往返换算的浮点误差，与原分辨率回放时坐标与直接绘制完全相同
+PIXEL_DIGITS = 4
+
+_prepared = DerivedImageCache()
+
+
+def _px(value, dpi):
+    """cm -> 像素（浮点，保留 PIXEL_DIGITS 位小数）"""
+    return round(value * dpi, PIXEL_DIGITS)
+
+
+def _ipx(value, dpi):
+    """cm -> 整数像素"""
+    return int(round(value * dpi))
+
+
+@functools.lru_cache(maxsize=64)
+def _font(path, size):
+    return ImageFont.truetype(path, size=size)
+
+
+class PanelRecording:
+    """
+    一个面板的绘制记录：size 为面板尺寸 (宽, 高) cm，background 为背景色，items 为按顺序的绘制操作
+    操作为 dict（坐标单位 cm，颜色为 RGB 元组）：
+        image        image（原图）, xy（旋转后左上角）, size（旋转前的尺寸）, rotate, pixels（记录时缩放好的图片，可选）,
+                     items（先绘制在缩放后的图片上再一起粘贴的操作，坐标相对图片，可选）
+        text         text, font_path, size（字号）, xy（绘制原点，同 ImageDraw.text）, fill, rotate
+        rect         box [x0, y0, x1, y1], fill, radius
+        barcode      code, box [x, y, 宽, 高]
+        dashed_line  x_start, x_end, y, dash_cm, gap_cm, width_cm, fill, dotted
+        stripes      height_cm, bottom_margin_cm, stripe_width, fill, background（面板底部的斜纹条块）
+    max_ppi 为可以回放的最高分辨率：整幅图片记录的面板为记录时的分辨率，绘制操作记录的面板为 None（不限）
+    """
+
+    def __init__(self, size, background, items=None, max_ppi=None):
+        self.size = tuple(size)
+        self.background = tuple(background)
+        self.items = list(items or [])
+        self.max_ppi = max_ppi
+
+    @classmethod
+    def from_image(cls, image, dpi):
+        """把已经绘制好的面板图片记录为一个整幅的图片操作"""
+        size = (image.width / dpi, image.height / dpi)
+        return cls(size, (255, 255, 255), [
+            {'type': 'image', 'image': image, 'xy': (0, 0), 'size': size, 'rotate': 0, 'pixels': image}],
+            max_ppi=round(dpi * 2.54, PIXEL_DIGITS))
+
+    def check_ppi(self, ppi):
+        """整幅图片记录的面板不能按高于记录分辨率的 ppi 回放（只会把图片放大插值，而不是更清晰）"""
+        if self.max_ppi is not None and ppi > self.max_ppi:
+            raise ValueError(f"面板按 {self.max_ppi:g} PPI 记录为图片，不能按 {ppi:g} PPI 回放，"
+                             f"请用目标分辨率重新记录（record_display_list）")
+
+    def rasterize(self, ppi):
+        """按 ppi 回放为 RGB 图片"""
+        self.check_ppi(ppi)
+        dpi = ppi / 2.54
+        canvas = Image.new('RGB', (_ipx(self.size[0], dpi), _ipx(self.size[1], dpi)), self.background)
+        return _draw_items(canvas, self.items, dpi)
+
+
+def _draw_items(canvas, items, dpi):
+    """把绘制操作依次回放到 canvas 上，返回 canvas"""
+    draw = ImageDraw.Draw(canvas)
+    for item in items:
+        kind = item['type']
+        if kind == 'image':
+            _draw_image(canvas, item, dpi)
+        elif kind == 'text':
+            _draw_text(canvas, draw, item, dpi)
+        elif kind == 'rect':
+            box = [_px(value, dpi) for value in item['box']]
+            fill = item.get('fill', (0, 0, 0))
+            if item.get('radius', 0) > 0:
+                shape_primitives.fill_rounded_rectangle(canvas, box, _px(item['radius'], dpi), fill)
+            else:
+                draw.rectangle(box, fill=fill)
+        elif kind == 'barcode':
+            x, y, width, height = (_ipx(value, dpi) for value in item['box'])
+            barcode_image = general_functions.generate_barcode_image(str(item['code']), width, height)
+            canvas.paste(barcode_image, (x, y), mask=barcode_image)
+        elif kind == 'dashed_line':
+            options = {key: item[key] for key in ('dash_cm', 'gap_cm', 'width_cm', 'fill', 'dotted') if key in item}
+            general_functions.draw_dashed_hline(canvas, _px(item['x_start'], dpi), _px(item['x_end'], dpi),
+                                                _px(item['y'], dpi), dpi, **options)
+        elif kind == 'stripes':
+            general_functions.draw_diagonal_stripes_tiled(
+                canvas, item['height_cm'], dpi, bottom_margin_cm=item['bottom_margin_cm'],
+                stripe_width_px=_ipx(item['stripe_width'], dpi), stripe_color=item['fill'],
+                bg_color=item['background'])
+    return canvas
+
+
+def _draw_image(canvas, item, dpi):
+    """图片操作：记录时的缩放结果尺寸相同则直接使用，否则从原图重新缩放"""
+    size = (_ipx(item['size'][0], dpi), _ipx(item['size'][1], dpi))
+    pixels = item.get('pixels')
+    if pixels is None or pixels.size != size:
+        image = item['image']
+        if image.mode == 'RGBA':
+            pixels = _prepared.get_or_create(image, PreparedAsset).resize(size)
+        else:
+            pixels = image.resize(size, Image.Resampling.LANCZOS)
+    if item.get('items'):
+        # 缩放结果是共享对象，复制一份再绘制
+        pixels = _draw_items(pixels.copy(), item['items'], dpi)
+    if item['rotate']:
+        pixels = pixels.rotate(item['rotate'], expand=True)
+    xy = (_ipx(item['xy'][0], dpi), _ipx(item['xy'][1], dpi))
+    if pixels.mode == 'RGBA':
+        paste_asset(canvas, pixels, xy)
+    else:
+        canvas.paste(pixels, xy)
+
+
+def _draw_text(canvas, draw, item, dpi):
+    """文字操作：字号按分辨率换算，位置为记录的绘制原点"""
+    font = _font(item['font_path'], max(1, _ipx(item['size'], dpi)))
+    xy = (_px(item['xy'][0], dpi), _px(item['xy'][1], dpi))
+    if not item['rotate']:
+        draw.text(xy, item['text'], font=font, fill=item['fill'])
+        return
+    left, top, right, bottom = draw.textbbox((0, 0), item['text'], font=font)
+    layer = Image.new('RGBA', (right - left, bottom - top), (0, 0, 0, 0))
+    ImageDraw.Draw(layer).text((-left, -top), item['text'], font=font, fill=item['fill'])
+    layer = layer.rotate(item['rotate'], expand=True)
+    canvas.paste(layer, (int(xy[0]), int(xy[1])), mask=layer)
+
+
+class DisplayList:
+    """
+    整张箱唛的绘制记录：size 为画布尺寸 (宽, 高) cm
+    placements 为 (面板记录, 区域名, 左上角 (x, y) cm, 旋转角度)，strokes 为区域边框 (x, y, 宽, 高) cm
+    """
+
+    # 区域边框线宽（像素，与 generate_layout_incremental 相同，不随分辨率缩放）
+    STROKE_WIDTH_PX = 3
+
+    def __init__(self, size, ppi):
+        self.size = tuple(size)
+        self.ppi = ppi  # 记录时的分辨率（Python 样式面板图片的分辨率）
+        self.placements = []
+        self.strokes = []
+
+    def place(self, panel, region_name, xy, rotate=0):
+        self.placements.append((panel, region_name, tuple(xy), rotate))
+
+    def stroke(self, box):
+        self.strokes.append(tuple(box))
+
+    def panels(self):
+        """去重后的面板记录（按对象）"""
+        return list({id(panel): panel for panel, _, _, _ in self.placements}.values())
+
+    def rasterize(self, ppi=None):
+        """按 ppi（默认记录时的分辨率）回放为完整的 RGB 画布；含整幅图片记录的面板时 ppi 不能高于记录分辨率"""
+        ppi = ppi or self.ppi
+        for panel in self.panels():
+            panel.check_ppi(ppi)
+        dpi = ppi / 2.54
+        canvas = Image.new('RGB', (_ipx(self.size[0], dpi), _ipx(self.size[1], dpi)), (255, 255, 255))
+        rendered = {}
+        for panel, _, xy, rotate in self.placements:
+            key = (id(panel), rotate)
+            if key not in rendered:
+                image = rendered.get((id(panel), 0))
+                if image is None:
+                    image = panel.rasterize(ppi)
+                rendered[key] = image.rotate(rotate, expand=True) if rotate else image
+            canvas.paste(rendered[key], (_ipx(xy[0], dpi), _ipx(xy[1], dpi)))
+        draw = ImageDraw.Draw(canvas)
+        for x, y, w, h in self.strokes:
+            box = [_ipx(x, dpi), _ipx(y, dpi), _ipx(x + w, dpi), _ipx(y + h, dpi)]
+            draw.rectangle(box, outline=(0, 0, 0), width=self.STROKE_WIDTH_PX)
+        return canvas
+
+    def write_pdf(self, output, ppi=None, compression='dct'):
+        """按 ppi 回放并写成单页 PDF（output 为路径或文件对象）"""
+        ppi = ppi or self.ppi
+        with StreamingPDFWriter(output) as writer:
+            writer.add_page(self.rasterize(ppi), ppi, compression=compression)
@@ -1,5 +1,7 @@
 from PIL import Image, ImageDraw, ImageFont
 import numpy as np  
+import functools
+import shape_primitives
 import pathlib as Path
 import barcode
 from barcode.writer import ImageWriter
@@ -635,3 +637,302 @@ def draw_diagonal_stripes(canvas, stripe_height_cm, dpi, bottom_margin_cm=0, str
         draw.polygon(points, fill=stripe_color)
     
     return canvas
+
+
+# ============================================================================
+# 静态/动态图层拆分版本的底框函数
+# 静态部分（黑色异形底框、公司信息、箱号图标）只依赖箱子尺寸，可作为模板缓存；
+# 动态部分只绘制 SKU 文字。两者依次调用的效果与 draw_dynamic_bottom_bg 相同
+# ============================================================================
+
+def scaled_width_by_height(image, target_height):
+    """计算 scale_by_height 缩放后的宽度（只计算，不缩放）"""
+    w, h = image.size
+    return int(w * (target_height / h))
+
+
+def draw_dynamic_bottom_bg_static(canvas, sku_config, icon_company, icon_box_number):
+    """正唛底框的静态图层：异形黑色底框 + 公司信息 Logo + 左下角箱号图标"""
+    draw = ImageDraw.Draw(canvas)
+    canvas_w, canvas_h = canvas.size
+    bottom_bg_h = int(sku_config.bottom_gb_h * sku_config.dpi)
+    # --- 1. 计算基础尺寸 ---
+    h_right = int( 10 * sku_config.dpi)  # 10 cm 高的黑色底框
+    h_left = int( 0.5 * h_right)  # 左侧底框高度为右侧的50%    
+    margin_1cm = int( 1 * sku_config.dpi)
+    margin_4cm = int( 4 * sku_config.dpi)
+    margin_10cm = int( 10 * sku_config.dpi)  
+    
+    # --- 2. 处理公司信息 Logo 并确定左侧宽度 ---
+    icon_h = int(1.6 * sku_config.dpi) 
+    icon_company_res = scale_by_height(icon_company, icon_h)
+    icon_company_w, _ = icon_company_res.size
+    left_section_w = margin_1cm + icon_company_w + margin_4cm
+    
+    # --- 3. 绘制异形底框 (黑色) ---
+    x3, y3 = left_section_w - margin_10cm, canvas_h - h_left
+    x4, y4 = left_section_w , canvas_h - h_right
+    draw.rectangle([0, canvas_h - h_left, x3, canvas_h], fill=(0, 0, 0))
+    draw.rectangle([x4, canvas_h - h_right, canvas_w, canvas_h], fill=(0, 0, 0))
+
+    # S 形弧线连接两段黑块（smoothstep 曲线，按像素覆盖率抗锯齿）
+    shape_primitives.fill_below_smoothstep(canvas, (x3, y3), (x4, y4), canvas_h, (0, 0, 0))
+    
+    # B. 粘贴公司信息 Logo
+    icon_x = margin_1cm
+    icon_y = canvas_h - bottom_bg_h
+    canvas.paste(icon_company_res, (icon_x, icon_y), mask=icon_company_res)
+    
+    # C. 粘贴左下角箱号信息
+    icon_box_h = int( h_right * 1/4)  # 高度为底框高度的25%
+    icon_box_res = scale_by_height(icon_box_number, icon_box_h)
+    icon_box_w, icon_box_h = icon_box_res.size
+    icon_box_x = margin_1cm
+    icon_box_y = int(canvas_h - h_left + (h_left - icon_box_h) // 2)  # 垂直居中
+    canvas.paste(icon_box_res, (icon_box_x, icon_box_y), mask=icon_box_res)
+    return canvas
+
+
+def _fit_bottom_sku_font(draw, sku_config, font_paths, max_sku_w, max_sku_h):
+    """底框 SKU 文字的自动缩放：从最大高度的1.2倍开始每次减5，直到宽高都满足要求"""
+    current_sku_size = int(max_sku_h * 1.2)
+    min_sku_size = int(max_sku_h * 0.15)
+    while current_sku_size > min_sku_size:
+        test_font = ImageFont.truetype(font_paths['calibri_bold'], size=current_sku_size)
+        bbox = draw.textbbox((0, 0), sku_config.sku_name, font=test_font)
+        sw = bbox[2] - bbox[0]
+        sh = bbox[3] - bbox[1]
+        if sw <= max_sku_w and sh <= max_sku_h:
+            return test_font
+        current_sku_size -= 5
+    return ImageFont.truetype(font_paths['calibri_bold'], size=min_sku_size)
+
+
+def draw_dynamic_bottom_sku(canvas, sku_config, icon_company, font_paths):
+    """正唛底框的动态图层：在右侧黑色底框中居中绘制自动缩放的 SKU 文字"""
+    draw = ImageDraw.Draw(canvas)
+    canvas_w, canvas_h = canvas.size
+    h_right = int( 10 * sku_config.dpi)
+    margin_1cm = int( 1 * sku_config.dpi)
+    margin_3cm = int( 3 * sku_config.dpi)
+    margin_8cm = int( 8 * sku_config.dpi)
+    icon_company_w = scaled_width_by_height(icon_company, int(1.6 * sku_config.dpi))
+    
+    max_sku_w = canvas_w - (margin_1cm + icon_company_w) - margin_3cm
+    max_sku_h = margin_8cm  # 文字高度不超过 8cm
+    sku_font = _fit_bottom_sku_font(draw, sku_config, font_paths, max_sku_w, max_sku_h)
+
+    sku_area_left = margin_1cm + icon_company_w + margin_3cm
+    sku_area_right = canvas_w - margin_3cm
+    sku_center_x = (sku_area_left + sku_area_right) // 2
+    offset_y = int(0.3 * sku_config.dpi)  # 向下偏移 0.3cm
+    sku_center_y = canvas_h - h_right // 2 + offset_y
+    draw.text((sku_center_x, sku_center_y), sku_config.sku_name, font=sku_font, fill=(161, 142, 102), anchor="mm")
+    return canvas
+
+
+def _side_bottom_left_section_w(canvas_w, sku_config, icon_company):
+    """侧唛底框左侧高块的宽度（与正唛弧头设计对齐，并限制不超过侧唛宽度）"""
+    margin_1cm = int( 1 * sku_config.dpi)
+    margin_4cm = int( 4 * sku_config.dpi)
+    margin_10cm = int( 10 * sku_config.dpi)
+    icon_company_w = scaled_width_by_height(icon_company, int(1.6 * sku_config.dpi))
+    left_section_w = sku_config.l_px - (margin_1cm + icon_company_w + margin_4cm)
+    max_left_section_w = canvas_w - margin_10cm - margin_4cm
+    return min(left_section_w, max_left_section_w), left_section_w > max_left_section_w
+
+
+def draw_side_dynamic_bottom_bg_static(canvas, sku_config, icon_company):
+    """侧唛底框的静态图层：异形黑色底框（左高右矮）"""
+    draw = ImageDraw.Draw(canvas)
+    canvas_w, canvas_h = canvas.size
+    h_left = int( sku_config.dpi * sku_config.bottom_gb_h)
+    h_right =  int( h_left * 0.5)
+    margin_1cm = int( 1 * sku_config.dpi)
+    margin_10cm = int( 10 * sku_config.dpi)  
+    
+    left_section_w, clipped = _side_bottom_left_section_w(canvas_w, sku_config, icon_company)
+    if clipped:
+        print(f"警告：正唛宽度过大，侧唛SKU黑框已自动调整为 {left_section_w / sku_config.dpi:.1f}cm")
+    
+    x3, y3 = left_section_w, canvas_h - h_left
+    x4, y4 = min(left_section_w + margin_10cm, canvas_w - margin_1cm), canvas_h - h_right
+    draw.rectangle([0, canvas_h - h_left, x3, canvas_h], fill=(0, 0, 0))
+    draw.rectangle([x4, canvas_h - h_right, canvas_w, canvas_h], fill=(0, 0, 0))
+
+    # S 形弧线连接两段黑块（smoothstep 曲线，按像素覆盖率抗锯齿）
+    shape_primitives.fill_below_smoothstep(canvas, (x3, y3), (x4, y4), canvas_h, (0, 0, 0))
+    return canvas
+
+
+def draw_side_dynamic_bottom_sku(canvas, sku_config, icon_company, font_paths):
+    """侧唛底框的动态图层：在左侧黑色高块中居中绘制自动缩放的 SKU 文字"""
+    draw = ImageDraw.Draw(canvas)
+    canvas_w, canvas_h = canvas.size
+    h_left = int( sku_config.dpi * sku_config.bottom_gb_h)
+    margin_3cm = int( 3 * sku_config.dpi)
+    margin_8cm = int( 8 * sku_config.dpi)
+    left_section_w, _ = _side_bottom_left_section_w(canvas_w, sku_config, icon_company)
+    
+    sku_font = _fit_bottom_sku_font(draw, sku_config, font_paths, left_section_w, margin_8cm)
+
+    sku_center_x = (margin_3cm + left_section_w) // 2
+    offset_y = int(0.3 * sku_config.dpi)  # 向下偏移 0.3cm
+    sku_center_y = canvas_h - h_left // 2 + offset_y
+    draw.text((sku_center_x, sku_center_y), sku_config.sku_name, font=sku_font, fill=(161, 142, 102), anchor="mm")
+    return canvas
+
+
+
+# ============================================================================
+# 预渲染斜纹图块版本的斜纹条块
+# 斜纹在水平方向上以 stripe_offset 为周期重复：按 (条纹高度, 斜纹宽度, 颜色, 颜色模式) 只渲染一个周期图块并缓存，
+# 再横向依次粘贴到整个宽度，每次粘贴只是逐行内存复制
+# ============================================================================
+
+STRIPE_TILE_MIN_WIDTH_PX = 1024  # 图块宽度取斜纹周期的整数倍，且不小于该值
+STRIPE_TILE_SUPERSAMPLE = 4      # 抗锯齿：按 4 倍分辨率绘制后按面积平均缩小
+
+
+@functools.lru_cache(maxsize=32)
+def _diagonal_stripe_tile(mode, stripe_h_px, stripe_width_px, stripe_color, bg_color, supersample):
+    """
+    渲染一个斜纹周期图块（多个面板共享，只能用于粘贴），斜纹位置与 draw_diagonal_stripes 相同
+    条块高度与原函数相同：多边形包含上下两条边所在的行，共 stripe_h_px + 1 行
+    supersample 为 1 时与原函数逐像素一致；大于 1 时把这 stripe_h_px + 1 行按像素边界放大绘制，按面积覆盖计算抗锯齿
+    """
+    stripe_offset = int(stripe_width_px * 1.5)
+    tile_w = stripe_offset * -(-STRIPE_TILE_MIN_WIDTH_PX // stripe_offset)
+    s = supersample
+    rows = stripe_h_px + 1
+    if s == 1:
+        bottom, slant = stripe_h_px, stripe_h_px  # 顶点在上下两行的像素中心
+    else:
+        bottom, slant = rows * s, rows            # 顶点在条块的上下边界
+    tile = Image.new(mode, (tile_w * s, rows * s), bg_color)
+    draw = ImageDraw.Draw(tile)
+
+    num_stripes = (tile_w + rows) // stripe_offset + 2
+    for i in range(num_stripes):
+        start_x = i * stripe_offset - stripe_h_px
+        points = [
+            (start_x * s, bottom),                                     # 左下
+            ((start_x + stripe_width_px) * s, bottom),                 # 右下
+            ((start_x + stripe_width_px + slant) * s, 0),              # 右上
+            ((start_x + slant) * s, 0),                                # 左上
+        ]
+        draw.polygon(points, fill=stripe_color)
+    if s > 1:
+        tile = tile.reduce(s)
+    return tile
+
+
+def draw_diagonal_stripes_tiled(canvas, stripe_height_cm, dpi, bottom_margin_cm=0, stripe_width_px=30,
+                                stripe_color=(0, 0, 0), bg_color=(255, 255, 255), antialias=True):
+    """
+    在画布底部绘制黑白斜纹条块 —— draw_diagonal_stripes 的图块平铺版本，参数和斜纹位置相同
+    
+    额外参数：
+        antialias: 斜纹边缘抗锯齿（默认开启）；False 时与 draw_diagonal_stripes 逐像素一致
+    
+    返回：
+        修改后的canvas
+    """
+    canvas_w, canvas_h = canvas.size
+    stripe_h_px = int(stripe_height_cm * dpi)
+    bottom_margin_px = int(bottom_margin_cm * dpi)
+    stripe_y_start = canvas_h - stripe_h_px - bottom_margin_px
+    if stripe_h_px <= 0:
+        return canvas
+
+    supersample = STRIPE_TILE_SUPERSAMPLE if antialias else 1
+    tile = _diagonal_stripe_tile(canvas.mode, stripe_h_px, stripe_width_px,
+                                 tuple(stripe_color), tuple(bg_color), supersample)
+    # 图块宽度是周期的整数倍，依次粘贴即可无缝衔接（最后一块超出画布的部分自动裁掉）
+    for x in range(0, canvas_w, tile.width):
+        canvas.paste(tile, (x, stripe_y_start))
+    return canvas
+
+
+# ============================================================================
+# 解析抗锯齿版本的图形函数（见 shape_primitives）
+# ============================================================================
+
+def draw_rounded_bg_for_text_smooth(draw, canvas, bbox, sku_config, color_xy,
+                                    bg_color=(0, 0, 0), padding_cm=(0.8, 0.3), radius=15):
+    """
+    draw_rounded_bg_for_text 的抗锯齿版本：黑框尺寸和位置完全相同，圆角边缘按像素覆盖率平滑
+    需要额外传入 draw 所绘制的 canvas
+    """
+    text_w = bbox[2] - bbox[0]
+    text_h = bbox[3] - bbox[1]
+    
+    px_padding_x = int(padding_cm[0] * sku_config.dpi)
+    px_padding_y = int(padding_cm[1] * sku_config.dpi)
+    px_padding_y_top = int(px_padding_y * 0.7 )
+    px_padding_y_bottom = int(px_padding_y * 1.4 )
+    
+    color_x, color_y = color_xy
+    rect_x0 = color_x - px_padding_x
+    rect_y0 = color_y - px_padding_y_top
+    rect_x1 = color_x + text_w + px_padding_x
+    rect_y1 = color_y + text_h + px_padding_y_bottom
+    
+    shape_primitives.fill_rounded_rectangle(canvas, [rect_x0, rect_y0, rect_x1, rect_y1], radius, bg_color)
+    return draw
+
+
+def draw_smooth_ellipse_analytic(draw, canvas, box, fill=(0, 0, 0)):
+    """
+    draw_smooth_ellipse 的解析抗锯齿版本：位置和尺寸相同，不再创建放大 4 倍的临时图层和重采样
+    """
+    x0, y0, x1, y1 = box
+    left, top = int(x0), int(y0)
+    shape_primitives.fill_ellipse(canvas, (left, top, left + int(x1 - x0), top + int(y1 - y0)), fill)
+    return draw
+
+
+# ============================================================================
+# 虚线 / 点线（尺寸以厘米给出，随分辨率缩放）
+# 一个周期（线段 + 间隙）渲染为蒙版，用 numpy 平铺到整条线的长度后一次粘贴，不再逐段调用 draw.line
+# ============================================================================
+
+def _dash_period_mask(dash_px, gap_px, width_px, dotted):
+    """一个周期的蒙版（'L' 灰度数组，形状 width_px x (dash_px + gap_px)）；点线的每个点为抗锯齿圆点"""
+    period = np.zeros((width_px, dash_px + gap_px), dtype=np.uint8)
+    if not dotted:
+        period[:, :dash_px] = 255
+        return period
+    radius = width_px / 2
+    xs = np.arange(dash_px + gap_px, dtype=np.float32)[np.newaxis, :] + 0.5
+    ys = np.arange(width_px, dtype=np.float32)[:, np.newaxis] + 0.5
+    distance = np.hypot(xs - radius, ys - radius) - radius
+    period[:] = (np.clip(0.5 - distance, 0.0, 1.0) * 255 + 0.5).astype(np.uint8)
+    return period
+
+
+def draw_dashed_hline(canvas, x_start, x_end, y, dpi, dash_cm=0.17, gap_cm=0.13, width_cm=0.025,
+                      fill=(0, 0, 0), dotted=False):
+    """
+    绘制水平虚线（从 x_start 到 x_end，线宽以 y 为中心），最后一段在 x_end 处截断
+    
+    参数：
+        dash_cm / gap_cm: 每段线段和间隙的长度（厘米），300 PPI 下默认值约为 20 / 15 像素
+        width_cm: 线宽（厘米），300 PPI 下默认值约为 3 像素
+        dotted: True 时画点线，每个点是直径等于线宽的圆点，点距为 gap_cm（dash_cm 不使用）
+    
+    返回：
+        修改后的canvas
+    """
+    width_px = max(1, round(width_cm * dpi))
+    gap_px = max(1, round(gap_cm * dpi))
+    dash_px = width_px if dotted else max(1, round(dash_cm * dpi))
+    length = int(x_end) - int(x_start)
+    if length <= 0:
+        return canvas
+    period = _dash_period_mask(dash_px, gap_px, width_px, dotted)
+    repeats = -(-length // period.shape[1])
+    mask = np.tile(period, (1, repeats))[:, :length]
+    top = int(y) - width_px // 2
+    canvas.paste(fill, (int(x_start), top, int(x_start) + length, top + width_px), Image.fromarray(mask, 'L'))
+    return canvas
@@ -4,26 +4,155 @@
 """
 from PIL import Image, ImageDraw
 import pathlib as Path
-from style_base import StyleRegistry
+import hashlib
+import io
+import json
+from style_base import StyleRegistry, PanelCache, TemplateCache
+from pdf_writer import StreamingPDFWriter
+from palette_mode import StylePalette, downscale_to_rgb
+from color_management import CMYKConverter, DEFAULT_CMYK_PROFILE
+from display_list import DisplayList
+from svg_writer import display_list_to_svg
+from deep_zoom import write_deep_zoom
 
 # 导入所有样式模块以自动注册
 import style_mcombo_standard
 import style_barberpub_topandbottom
 import style_barberpub_doubleopening
 import style_barberpub_fulloverlap
+# 声明式样式（style_specs/*.json）也在这里注册：Streamlit 页面、HTTP 接口和 spawn 启动的渲染进程看到的样式列表一致
+import style_simple
 # 未来在这里导入更多样式:
-# import style_simple
 # import style_premium
 # import style_custom_a
 # etc.
 
 
-class SKUConfig:
-    """SKU 配置类 - 保持不变"""
-    
-    def __init__(self, sku_name, length_cm, width_cm, height_cm, 
-                 style_name="mcombo_standard", 
-                 bottom_gb_h_cm=10, ppi=300, **style_params):
+def _restore_record(cls, state):
+    """pickle 反序列化辅助函数：绕过只读的 __setattr__，直接写回 slots"""
+    obj = cls.__new__(cls)
+    for name, value in zip(cls._fields, state):
+        object.__setattr__(obj, name, value)
+    return obj
+
+
+class FrozenRecord:
+    """
+    不可变记录基类 - 基于 __slots__，可哈希、可 pickle
+    同时保留 record['key'] / record.get('key') 的字典式访问，兼容旧的样式代码
+    """
+    __slots__ = ()
+    _fields = ()
+    _defaults = {}
+
+    def __init__(self, **fields):
+        unknown = set(fields) - set(self._fields)
+        if unknown:
+            raise TypeError(f"{type(self).__name__} 不支持的字段: {sorted(unknown)}，可用字段: {list(self._fields)}")
+        for name in self._fields:
+            if name in fields:
+                value = fields[name]
+            elif name in self._defaults:
+                value = self._defaults[name]
+            else:
+                raise TypeError(f"{type(self).__name__} 缺少必需字段: {name}")
+            object.__setattr__(self, name, value)
+
+    @classmethod
+    def coerce(cls, value):
+        """把 dict（旧接口）或同类记录统一转换为记录对象，None 原样返回"""
+        if value is None or isinstance(value, cls):
+            return value
+        return cls(**dict(value))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} 是只读对象，请使用 replace() 生成新对象")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} 是只读对象")
+
+    def _values(self):
+        return tuple(getattr(self, name) for name in self._fields)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __hash__(self):
+        return hash((type(self).__name__,) + self._values())
+
+    def __reduce__(self):
+        return (_restore_record, (type(self), self._values()))
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({fields})"
+
+    # --- 字典式访问（兼容 sku_config.side_text['sn_code'] 这类旧写法）---
+    def __getitem__(self, key):
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self._fields
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in self._fields else None
+        return default if value is None else value
+
+    def keys(self):
+        return self._fields
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self._fields}
+
+    def replace(self, **changes):
+        """返回修改了部分字段的新记录"""
+        return type(self)(**{**self.as_dict(), **changes})
+
+
+class SideText(FrozenRecord):
+    """侧唛文字信息（重量、SN码、产地）"""
+    __slots__ = ('gw_value', 'nw_value', 'sn_code', 'origin_text', 'dimention_text')
+    _fields = __slots__
+    _defaults = {'origin_text': 'MADE IN CHINA', 'dimention_text': None}
+
+
+class BoxNumber(FrozenRecord):
+    """箱号信息（总箱数 / 当前箱号）"""
+    __slots__ = ('total_boxes', 'current_box')
+    _fields = __slots__
+
+    def __init__(self, total_boxes, current_box):
+        super().__init__(total_boxes=int(total_boxes), current_box=int(current_box))
+
+
+class SKUConfig(FrozenRecord):
+    """
+    SKU 配置类 - 不可变、基于 __slots__
+    - 可哈希，可作为缓存键；fingerprint() 返回稳定的配置指纹（跨进程一致）
+    - pickle 时只传输原始字段，派生的像素尺寸按需计算
+    - 修改配置请使用 replace(**changes) 生成新对象
+    """
+    __slots__ = ('sku_name', 'l_cm', 'w_cm', 'h_cm', 'style_name', 'bottom_gb_h', 'ppi',
+                 'color_mode', 'background_color', 'pdf_compression',
+                 'color', 'product', 'size', 'side_text', 'box_number', 'sponge_verified',
+                 '_fingerprint')
+    _fields = __slots__[:-1]
+
+    COLOR_MODES = ('RGB', 'P', 'CMYK')
+
+    # 构造参数名与属性名不一致的字段
+    _init_names = {'l_cm': 'length_cm', 'w_cm': 'width_cm', 'h_cm': 'height_cm', 'bottom_gb_h': 'bottom_gb_h_cm'}
+
+    def __init__(self, sku_name, length_cm, width_cm, height_cm,
+                 style_name="mcombo_standard",
+                 bottom_gb_h_cm=10, ppi=300, *,
+                 color=None, product=None, size=None,
+                 side_text=None, box_number=None, sponge_verified=False,
+                 color_mode='RGB', background_color=(161, 142, 102), pdf_compression='dct'):
         """
         Args:
             sku_name: SKU 名称
@@ -31,81 +160,448 @@ class SKUConfig:
             style_name: 样式名称，默认 "mcombo_standard"
             bottom_gb_h_cm: 底部黑色底框高度（厘米）
             ppi: 分辨率
-            **style_params: 样式特定参数，如 color, product, size, side_text, box_number, sponge_verified 等
-        """
-        self.sku_name = sku_name
-        self.l_cm = length_cm
-        self.w_cm = width_cm
-        self.h_cm = height_cm
-        self.l_in = length_cm / 2.54
-        self.w_in = width_cm / 2.54
-        self.h_in = height_cm / 2.54
-        self.bottom_gb_h = bottom_gb_h_cm
-        self.style_name = style_name
-        self.dpi = ppi / 2.54
-        self.ppi = ppi
-        self.color_mode = 'RGB'  # 默认颜色模式
-        self.background_color = (161, 142, 102)  # 默认RGB背景色
+            color, product, size: 样式文字参数（颜色、产品名、尺寸标注）
+            side_text: 侧唛信息，dict 或 SideText（gw_value, nw_value, sn_code, origin_text）
+            box_number: 箱号信息，dict 或 BoxNumber（total_boxes, current_box）
+            sponge_verified: 是否通过海绵测试, 有些样式会用到
+            color_mode: 画布颜色模式，见 COLOR_MODES，默认 'RGB'
+                        'P' 为调色板模式（8 位索引色画布，内存约为 RGB 的 1/3，
+                        面板仍按 RGB 绘制后映射到样式调色板，输出时再展开），见 palette_mode
+                        'CMYK' 为印刷模式（面板按 ICC 配置文件转换为 CMYK 后合成，PDF 直接写入 CMYK），见 color_management
+            background_color: 背景色，默认RGB (161, 142, 102)
+            pdf_compression: PDF 中画布图像的压缩方式，默认 'dct'（JPEG）；
+                             平涂图稿可选 'indexed'（无损，不超过 256 色时为索引色）或 'bilevel'（黑色内容单独为 1 位 G4 图层，
+                             接近黑色的像素变为纯黑），见 StreamingPDFWriter
+        """
         # self.background_color = (0, 12, 37, 37)  # 默认CMYK背景色，颜色设置还有问题
-        
-        # 预计算像素值
-        self.l_px = int(length_cm * self.dpi)
-        self.w_px = int(width_cm * self.dpi)
-        self.h_px = int(height_cm * self.dpi)
-        self.half_w_px = int(self.w_px / 2)
-        self.bottom_gb_h_px = int(self.bottom_gb_h * self.dpi)
-        
-        # 存储样式特定参数
-        for key, value in style_params.items():
-            setattr(self, key, value)
+        # CMYK 模式下背景色等仍使用 RGB 指定，由生成器的 CMYKConverter 统一换算
+        if pdf_compression not in StreamingPDFWriter.COMPRESSIONS:
+            raise ValueError(f"不支持的 PDF 压缩方式: {pdf_compression}，可选: {', '.join(StreamingPDFWriter.COMPRESSIONS)}")
+        if color_mode not in self.COLOR_MODES:
+            raise ValueError(f"不支持的画布颜色模式: {color_mode}，可选: {', '.join(self.COLOR_MODES)}")
+        if color_mode == 'CMYK' and pdf_compression in ('indexed', 'bilevel'):
+            raise ValueError(f"CMYK 画布不支持 {pdf_compression} 压缩，请使用 dct 或 flate")
+        super().__init__(
+            sku_name=sku_name,
+            l_cm=length_cm,
+            w_cm=width_cm,
+            h_cm=height_cm,
+            style_name=style_name,
+            bottom_gb_h=bottom_gb_h_cm,
+            ppi=ppi,
+            color_mode=color_mode,
+            background_color=tuple(background_color),
+            pdf_compression=pdf_compression,
+            color=color,
+            product=product,
+            size=size,
+            side_text=SideText.coerce(side_text),
+            box_number=BoxNumber.coerce(box_number),
+            sponge_verified=bool(sponge_verified),
+        )
+        object.__setattr__(self, '_fingerprint', None)
+
+    # --- 派生尺寸（按需计算，不占用实例内存）---
+    @property
+    def dpi(self):
+        return self.ppi / 2.54
+
+    @property
+    def l_in(self):
+        return self.l_cm / 2.54
+
+    @property
+    def w_in(self):
+        return self.w_cm / 2.54
+
+    @property
+    def h_in(self):
+        return self.h_cm / 2.54
+
+    @property
+    def l_px(self):
+        return int(self.l_cm * self.dpi)
+
+    @property
+    def w_px(self):
+        return int(self.w_cm * self.dpi)
+
+    @property
+    def h_px(self):
+        return int(self.h_cm * self.dpi)
+
+    @property
+    def half_w_px(self):
+        return int(self.w_px / 2)
+
+    @property
+    def bottom_gb_h_px(self):
+        return int(self.bottom_gb_h * self.dpi)
+
+    def __reduce__(self):
+        return (_restore_sku_config, (self._values(),))
+
+    def as_kwargs(self):
+        """返回可直接传给 SKUConfig(...) 的构造参数"""
+        return {self._init_names.get(name, name): getattr(self, name) for name in self._fields}
+
+    def replace(self, **changes):
+        """返回修改了部分参数的新配置，参数名与构造函数一致，如 replace(ppi=72)"""
+        return SKUConfig(**{**self.as_kwargs(), **changes})
+
+    def to_dict(self):
+        """返回可 JSON 序列化的构造参数（嵌套记录展开为 dict，元组转为列表），可用 from_dict 还原"""
+        data = {}
+        for name, value in self.as_kwargs().items():
+            if isinstance(value, FrozenRecord):
+                value = value.as_dict()
+            elif isinstance(value, tuple):
+                value = list(value)
+            data[name] = value
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """从 to_dict() 的结果或外部 JSON 构造配置，字段名与构造函数一致；字段不合法时抛出 ValueError"""
+        if not isinstance(data, dict):
+            raise ValueError(f"SKU 配置必须是 JSON 对象，收到: {type(data).__name__}")
+        allowed = [cls._init_names.get(name, name) for name in cls._fields]
+        unknown = set(data) - set(allowed)
+        if unknown:
+            raise ValueError(f"SKUConfig 不支持的字段: {sorted(unknown)}，可用字段: {allowed}")
+        try:
+            return cls(**data)
+        except TypeError as e:
+            raise ValueError(f"SKU 配置不完整或格式错误: {e}") from e
+
+    @staticmethod
+    def _canonical(value):
+        """规范化字段值：数值统一为 float，嵌套记录展开为有序的 [字段, 值] 列表"""
+        if isinstance(value, FrozenRecord):
+            return [[name, SKUConfig._canonical(getattr(value, name))] for name in value._fields]
+        if isinstance(value, (tuple, list)):
+            return [SKUConfig._canonical(item) for item in value]
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+        return value
+
+    def fingerprint(self):
+        """
+        返回配置的规范指纹（sha1 十六进制字符串）
+        相同配置在不同进程、不同机器上指纹一致，可用作缓存键或去重键
+        """
+        if self._fingerprint is None:
+            payload = json.dumps(['SKUConfig/v1', self._canonical(self)], ensure_ascii=False, separators=(',', ':'))
+            object.__setattr__(self, '_fingerprint', hashlib.sha1(payload.encode('utf-8')).hexdigest())
+        return self._fingerprint
+
+
+def _restore_sku_config(state):
+    """SKUConfig 的 pickle 反序列化辅助函数"""
+    obj = _restore_record(SKUConfig, state)
+    object.__setattr__(obj, '_fingerprint', None)
+    return obj
 
 
 class BoxMarkGenerator:
     """箱唛生成器 - 使用样式系统"""
     
-    def __init__(self, base_dir, style_name="mcombo_standard", ppi=300):
+    def __init__(self, base_dir, style_name="mcombo_standard", ppi=300,
+                 panel_cache_entries=64, panel_cache_mb=512,
+                 template_cache_mb=256, template_dir=None, cmyk_profile=DEFAULT_CMYK_PROFILE):
         """
         Args:
             base_dir: 资源基础目录
             style_name: 使用的样式名称
             ppi: 分辨率
+            panel_cache_entries: 面板缓存的最大条目数
+            panel_cache_mb: 面板缓存的最大内存（MB），0 表示不缓存
+            template_cache_mb: 静态图层模板和缩放资源缓存的最大内存（MB）
+            template_dir: 静态图层模板的落盘目录，None 表示只缓存在内存中
+                          （更换资源图片后需要清空该目录）
+            cmyk_profile: CMYK 模式使用的 ICC 配置文件路径，None 表示使用 Pillow 的简单公式
+                          （默认取环境变量 BOXMARK_CMYK_PROFILE）
         """
         self.base_dir = base_dir
         self.style_name = style_name
         self.ppi = ppi
         self.style = StyleRegistry.get_style(style_name, base_dir, ppi)
+        # 面板按其声明的依赖字段缓存：同尺寸的批量箱唛只会重绘包含 SKU 文字/条码的面板
+        self.style.panel_cache = PanelCache(max_entries=panel_cache_entries,
+                                            max_bytes=panel_cache_mb * 1024 * 1024)
+        # 面板的静态图层（背景、Logo、斜纹、标签框）按尺寸渲染一次作为模板，换 SKU 时只重绘文字
+        self.style.template_cache = TemplateCache(max_bytes=template_cache_mb * 1024 * 1024,
+                                                  directory=template_dir)
+        self._palettes = {}  # 背景色 -> StylePalette（调色板模式）
+        self.cmyk_converter = CMYKConverter(cmyk_profile)
+    
+    def cache_info(self):
+        """返回面板缓存和静态图层模板缓存的命中统计"""
+        info = self.style.panel_cache.info()
+        info['templates'] = self.style.template_cache.info()
+        return info
+    
+    def style_palette(self, background_color):
+        """调色板模式使用的样式调色板：背景色 + 样式的固定颜色 + 抗锯齿渐变 + 资源图片颜色，按背景色生成一次"""
+        palette = self._palettes.get(background_color)
+        if palette is None:
+            resources = [image for image in self.style.resources.values() if isinstance(image, Image.Image)]
+            palette = StylePalette((background_color,) + tuple(self.style.palette_colors), resources)
+            palette = self._palettes.setdefault(background_color, palette)
+        return palette
+    
+    def canvas_converter(self, sku_config):
+        """
+        非 RGB 画布的面板转换器（StylePalette / CMYKConverter），RGB 画布返回 None
+        转换器提供 convert_panel(面板)、new_canvas(尺寸, RGB 底色) 和 ink(RGB 颜色)
+        """
+        if sku_config.color_mode == 'P':
+            return self.style_palette(sku_config.background_color)
+        if sku_config.color_mode == 'CMYK':
+            return self.cmyk_converter
+        return None
+    
+    def clear_cache(self):
+        """清空面板缓存和内存中的静态图层模板（磁盘上的模板保留）"""
+        self.style.panel_cache.clear()
+        self.style.template_cache.clear()
     
     def generate_complete_layout(self, sku_config):
         """生成完整的箱唛布局 - 动态适配不同样式的布局"""
+        return self.generate_layout_incremental(sku_config)['canvas']
+    
+    def generate_layout_incremental(self, sku_config, previous=None):
+        """
+        增量生成箱唛布局：只重新粘贴与上一次结果不同的面板
+        
+        Args:
+            sku_config: SKU 配置
+            previous: 上一次调用返回的结果字典，None 表示完整生成
+        
+        Returns:
+            dict: {
+                'canvas': 完整箱唛画布（新对象，不会修改 previous 中的画布）,
+                'layout': 布局配置,
+                'mapping': 区域 -> 面板类型映射,
+                'style_name': 样式名,
+                'panels': 本次使用的面板字典,
+                'changed': 本次重新粘贴的区域名列表,
+            }
+        
+        面板由样式按依赖字段缓存，字段未变化的面板会返回同一个对象；
+        样式、布局（箱子尺寸、分辨率）和区域 -> 面板映射都不变时，在上一次画布的副本上只粘贴对象发生变化的区域。
+        """
+        converter = self.canvas_converter(sku_config)
+        style_config = sku_config
+        if converter is not None:
+            # 调色板 / CMYK 模式：样式仍按 RGB 绘制面板（与 RGB 模式共享面板缓存），再转换为画布的颜色模式
+            style_config = sku_config.replace(color_mode='RGB')
+        
         # 1. 从样式获取布局配置
-        layout = self.style.get_layout_config(sku_config)
-        panels_mapping = self.style.get_panels_mapping(sku_config)
+        layout = self.style.get_layout_config(style_config)
+        panels_mapping = self.style.get_panels_mapping(style_config)
         
-        # 2. 计算画布总尺寸（根据布局的最大范围）
-        max_x = max(x + w for x, y, w, h in layout.values())
-        max_y = max(y + h for x, y, w, h in layout.values())
+        # 2. 让样式生成它需要的所有面板（动态适配不同样式，未变化的面板直接来自缓存）
+        panels_dict = self.style.generate_all_panels(style_config)
+        if converter is not None:
+            # 转换结果按 RGB 面板对象缓存：静态面板只转换一次，面板缓存命中时仍是同一个对象，增量粘贴照常跳过
+            panels_dict = {panel_type: converter.convert_panel(panel) if isinstance(panel, Image.Image) else panel
+                           for panel_type, panel in panels_dict.items()}
         
-        # 创建画布（白色背景，未填充的区域将显示为白色）
-   
-        canvas = Image.new(sku_config.color_mode, (int(max_x), int(max_y)), (255, 255, 255)) # RGB白色背景
-        # canvas = Image.new('CMYK', (int(max_x), int(max_y)), (0,0,0,0))  # CMYK透明背景（未填充区域为白色）
-        # 3. 让样式生成它需要的所有面板（动态适配不同样式）
-        panels_dict = self.style.generate_all_panels(sku_config)
+        # 不同样式的布局可能完全相同，但映射的面板（和没有映射、保持空白的区域）不同，样式和映射也必须一致
+        reusable = (
+            previous is not None
+            and previous.get('style_name') == self.style_name
+            and previous['layout'] == layout
+            and previous.get('mapping') == panels_mapping
+            and previous['canvas'].mode == sku_config.color_mode
+        )
+        if reusable:
+            canvas = previous['canvas'].copy()
+            old_panels = previous['panels']
+        else:
+            # 3. 计算画布总尺寸（根据布局的最大范围）
+            max_x = max(x + w for x, y, w, h in layout.values())
+            max_y = max(y + h for x, y, w, h in layout.values())
+            
+            # 创建画布（白色背景，未填充的区域将显示为白色）
+            if converter is not None:
+                canvas = converter.new_canvas((int(max_x), int(max_y)), (255, 255, 255))
+            else:
+                canvas = Image.new(sku_config.color_mode, (int(max_x), int(max_y)), (255, 255, 255)) # RGB白色背景
+            # canvas = Image.new('CMYK', (int(max_x), int(max_y)), (0,0,0,0))  # CMYK透明背景（未填充区域为白色）
+            old_panels = {}
         
-        # 4. 根据映射关系动态粘贴面板
+        # 4. 根据映射关系动态粘贴面板（增量模式下跳过未变化的面板）
+        changed = []
         for region_name, panel_type in panels_mapping.items():
             if region_name in layout and panel_type in panels_dict:
-                x, y, w, h = layout[region_name]
                 panel = panels_dict[panel_type]
+                if old_panels.get(panel_type) is panel:
+                    continue
+                x, y, w, h = layout[region_name]
                 canvas.paste(panel, (int(x), int(y)))
+                changed.append(region_name)
         
-        # 6. 画出所有格子的边框（用于调试和验证）
+        # 5. 画出所有格子的边框（用于调试和验证；重新粘贴的面板会覆盖相邻边框，所以每次都全部重画）
         draw = ImageDraw.Draw(canvas)
+        outline = converter.ink((0, 0, 0)) if converter is not None else (0,0,0)
         for name, (x, y, w, h) in layout.items():
             shape = [x, y, x + w, y + h]
-            draw.rectangle(shape, outline=(0,0,0), width=3)
+            draw.rectangle(shape, outline=outline, width=3)
         
-        return canvas
+        return {
+            'canvas': canvas,
+            'layout': layout,
+            'mapping': panels_mapping,
+            'style_name': self.style_name,
+            'panels': panels_dict,
+            'changed': changed,
+            'ppi': sku_config.ppi,
+        }
+    
+    def record_display_list(self, sku_config):
+        """
+        排版一次并记录为与分辨率无关的绘制记录（display_list.DisplayList，坐标单位 cm），
+        之后按任意分辨率回放为栅格画布或 PDF，不再重复运行样式代码
+        Python 样式的面板记录为当前分辨率的整幅图片，回放分辨率不能高于 sku_config.ppi
+        记录按 RGB 绘制，调色板 / CMYK 画布请用 generate_layout_incremental
+        """
+        style_config = sku_config if sku_config.color_mode == 'RGB' else sku_config.replace(color_mode='RGB')
+        layout = self.style.get_layout_config(style_config)
+        panels_mapping = self.style.get_panels_mapping(style_config)
+        recordings = self.style.record_panels(style_config)
+        dpi = sku_config.dpi
+        
+        max_x = max(x + w for x, y, w, h in layout.values())
+        max_y = max(y + h for x, y, w, h in layout.values())
+        display_list = DisplayList((int(max_x) / dpi, int(max_y) / dpi), sku_config.ppi)
+        for region_name, panel_type in panels_mapping.items():
+            if region_name in layout and panel_type in recordings:
+                x, y, w, h = layout[region_name]
+                panel, rotate = recordings[panel_type]
+                display_list.place(panel, region_name, (int(x) / dpi, int(y) / dpi), rotate)
+        for name, (x, y, w, h) in layout.items():
+            display_list.stroke((x / dpi, y / dpi, w / dpi, h / dpi))
+        return display_list
+    
+    def preview_ppi(self, sku_config, max_width=2000):
+        """
+        计算预览分辨率：使整张展开图的宽度不超过 max_width 像素
+        样式的所有几何尺寸都由 sku_config.dpi 推导，所以可以直接按这个分辨率渲染，而不是先渲染再缩小
+        """
+        layout = self.style.get_layout_config(sku_config)
+        full_width = max(x + w for x, y, w, h in layout.values())
+        if full_width <= max_width:
+            return sku_config.ppi
+        return max(1, int(sku_config.ppi * max_width / full_width))
+    
+    def generate_preview(self, sku_config, max_width=2000, previous=None):
+        """
+        按预览分辨率直接渲染箱唛（宽度不超过 max_width 像素），返回值同 generate_layout_incremental
+        注意：固定像素值（斜纹宽度、边框线宽等）不随分辨率缩放，预览只用于查看排版，印刷请用原分辨率
+        """
+        preview_config = sku_config.replace(ppi=self.preview_ppi(sku_config, max_width))
+        return self.generate_layout_incremental(preview_config, previous=previous)
+    
+    def render_pdf_bytes(self, sku_config):
+        """按 sku_config.ppi 渲染完整箱唛并编码为 PDF，返回 bytes"""
+        canvas = self.generate_complete_layout(sku_config)
+        pdf_buffer = io.BytesIO()
+        with StreamingPDFWriter(pdf_buffer) as writer:
+            writer.add_page(canvas, sku_config.ppi, compression=sku_config.pdf_compression)
+        return pdf_buffer.getvalue()
+    
+    def render_png_bytes(self, sku_config, max_width=None):
+        """渲染箱唛并编码为 PNG，返回 bytes；指定 max_width 时按预览分辨率渲染"""
+        if max_width:
+            render = self.generate_preview(sku_config, max_width=max_width)
+        else:
+            render = self.generate_layout_incremental(sku_config)
+        canvas = render['canvas']
+        if canvas.mode != 'P':
+            # 调色板模式的画布直接存为 8 位索引色 PNG
+            canvas = canvas.convert('RGB')
+        png_buffer = io.BytesIO()
+        canvas.save(png_buffer, "PNG", dpi=(render['ppi'], render['ppi']))
+        return png_buffer.getvalue()
+    
+    def render_svg_bytes(self, sku_config, max_width=None, asset_href=None):
+        """
+        渲染箱唛并编码为 SVG（UTF-8 bytes）：文字、条码、边框为矢量，字体和资源图片各引用一次，见 svg_writer
+        只支持声明式样式（style.vector_output），Python 样式抛出 ValueError
+        指定 max_width 时按预览分辨率排版记录
+        asset_href: 字体 / 资源图片文件路径 -> URL 的函数，不传时以 data: URI 内嵌
+        """
+        if not self.style.vector_output:
+            raise ValueError(f"样式 {self.style.get_style_name()} 不支持 SVG 输出，请使用 PDF 或 PNG")
+        if max_width:
+            sku_config = sku_config.replace(ppi=self.preview_ppi(sku_config, max_width))
+        display_list = self.record_display_list(sku_config)
+        return display_list_to_svg(display_list, asset_href=asset_href).encode('utf-8')
+    
+    def render_for_print(self, sku_config, preview_width=2000, cancel_event=None, tiles_dir=None):
+        """
+        按印刷分辨率渲染完整箱唛，返回 PDF 和由高清画布缩小得到的清晰预览图
+        适合在后台线程中运行：cancel_event（threading.Event）被设置后，在下一个阶段开始前放弃并返回 None
+        指定 tiles_dir 时同时把高清画布按条带写成深度缩放瓦片金字塔（见 deep_zoom），供可缩放的预览查看细节
+        
+        Returns:
+            dict: {'pdf_bytes': PDF 内容, 'preview': RGB 预览图, 'size': 高清画布尺寸, 'dzi': .dzi 路径或 None}
+                  或 None（已取消）
+        """
+        def cancelled():
+            return cancel_event is not None and cancel_event.is_set()
+        
+        if cancelled():
+            return None
+        canvas = self.generate_complete_layout(sku_config)
+        if cancelled():
+            return None
+        
+        # 按条带编码写入 PDF，不再复制一份完整的 RGB 画布
+        pdf_buffer = io.BytesIO()
+        with StreamingPDFWriter(pdf_buffer) as writer:
+            writer.add_page(canvas, sku_config.ppi, compression=sku_config.pdf_compression)
+        if cancelled():
+            return None
+        
+        dzi_path = None
+        if tiles_dir is not None:
+            dzi_path = write_deep_zoom(canvas, tiles_dir)
+            if cancelled():
+                return None
+        
+        if canvas.width > preview_width:
+            preview_size = (preview_width, int(canvas.height * preview_width / canvas.width))
+            if canvas.mode == 'P':
+                # 索引色画布不能直接高质量缩放，按条带展开为 RGB 后缩小，不生成整张 RGB 副本
+                preview_image = downscale_to_rgb(canvas, preview_size)
+            else:
+                preview_image = canvas.resize(preview_size, Image.Resampling.LANCZOS).convert('RGB')
+        else:
+            preview_image = canvas.convert('RGB')
+        return {
+            'pdf_bytes': pdf_buffer.getvalue(),
+            'preview': preview_image,
+            'size': canvas.size,
+            'dzi': dzi_path,
+        }
+    
+    def save_batch_pdf(self, sku_configs, output_path, quality=100):
+        """
+        把一批箱唛（同一样式）依次渲染为一个多页 PDF，每个箱唛一页
+        逐页编码并写入磁盘，内存只占用当前一页的画布，适合成千上万箱的订单
+        
+        Returns:
+            int: 写入的页数
+        """
+        with StreamingPDFWriter(output_path, quality=quality) as writer:
+            for sku_config in sku_configs:
+                canvas = self.generate_complete_layout(sku_config)
+                writer.add_page(canvas, sku_config.ppi, compression=sku_config.pdf_compression)
+                del canvas
+            return writer.page_count
     
     def save_as_pdf(self, canvas, output_path, sku_config):
         """保存为 PDF 格式（与旧版保持一致：先转CMYK再转回RGB）"""
@@ -115,7 +611,8 @@ class BoxMarkGenerator:
         # canvas_cmyk = canvas.convert('CMYK')
         # PDF需要RGB模式
         # canvas_rgb = canvas_cmyk.convert('RGB')
-        canvas.save(output_path, "PDF", resolution=sku_config.ppi, quality=100)
+        with StreamingPDFWriter(output_path) as writer:
+            writer.add_page(canvas, sku_config.ppi, compression=sku_config.pdf_compression)
         # canvas_rgb.save(output_path, "PDF", resolution=sku_config.ppi, quality=100)
         
         
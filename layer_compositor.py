@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+图层合成 - 收集一个面板要叠加的图层（图片、位置、不透明度），按顺序一次合成到画布上
+canvas.paste(icon, xy, mask=icon) 对整个图标范围逐像素混合，大图标（Logo、标语、网址条）大部分是全透明或全不透明的：
+- 图标按 ALPHA_TILE 大小分块，用 numpy 一次算出每块 alpha 的最小/最大值，分为 全透明 / 全不透明 / 边缘 三类
+- 同一行中相邻的同类块合并为一段：全透明段跳过，全不透明段直接复制（不混合），只有边缘段按 alpha 混合
+- 分段计划（含裁好的各段图片）按图标对象缓存，scaled_resource 返回的共享图标每次换 SKU 都直接复用
+
+计划的建立要读一遍 alpha 并复制非透明部分，代价比一次 paste 高，只对共享图标（shared=True）建立；
+每次新生成的图片（填好内容的标签、条码）仍按原方式直接粘贴
+"""
+import numpy as np
+from PIL import Image
+
+from style_base import DerivedImageCache
+from asset_preprocessing import asset_content_box, paste_asset
+
+
+# 分块大小（像素）
+ALPHA_TILE = 64
+
+_plans = DerivedImageCache()
+
+
+class LayerPlan:
+    """
+    RGBA 图层的分段计划：runs 为 (x, y, 图片, 是否需要混合)，坐标相对图层左上角
+    全透明的部分不在其中；全不透明段的图片直接复制，边缘段的图片按自身 alpha 混合
+    """
+
+    def __init__(self, image, tile=ALPHA_TILE):
+        self.size = image.size
+        self.runs = []
+        # 预处理过的资源只需要对有内容的范围分块
+        content_box = asset_content_box(image)
+        origin_x, origin_y = content_box[:2] if content_box else (0, 0)
+        if content_box:
+            image = image.crop(content_box)
+        alpha = np.asarray(image.getchannel('A'))
+        low, high = self._tile_extremes(alpha, tile)
+        kinds = np.where(high == 0, 0, np.where(low == 255, 2, 1))  # 0 全透明 / 1 边缘 / 2 全不透明
+        width, height = image.size
+        for row, row_kinds in enumerate(kinds):
+            top, bottom = row * tile, min((row + 1) * tile, height)
+            edges = np.flatnonzero(np.diff(row_kinds)) + 1
+            for start, end in zip(np.concatenate(([0], edges)), np.append(edges, len(row_kinds))):
+                kind = row_kinds[start]
+                if kind:
+                    left, right = int(start) * tile, min(int(end) * tile, width)
+                    self.runs.append((origin_x + left, origin_y + top, image.crop((left, top, right, bottom)),
+                                      kind == 1))
+
+    @staticmethod
+    def _tile_extremes(alpha, tile):
+        """每个分块内 alpha 的 (最小值, 最大值)，形状 (块行数, 块列数)"""
+        height, width = alpha.shape
+        rows, cols = -(-height // tile), -(-width // tile)
+
+        def reduce(op, pad_value):
+            full = (height // tile) * tile
+            by_rows = op(alpha[:full].reshape(height // tile, tile, width), axis=1)
+            if full < height:
+                by_rows = np.vstack([by_rows, op(alpha[full:], axis=0)[np.newaxis]])
+            padded = np.full((rows, cols * tile), pad_value, dtype=np.uint8)
+            padded[:, :width] = by_rows
+            return op(padded.reshape(rows, cols, tile), axis=2)
+
+        return reduce(np.min, 255), reduce(np.max, 0)
+
+    def composite(self, canvas, xy, opacity=1.0):
+        """把图层按计划叠加到画布的 xy 处"""
+        x, y = xy
+        for left, top, piece, blend in self.runs:
+            position = (x + left, y + top)
+            if opacity >= 1:
+                canvas.paste(piece, position, piece if blend else None)
+            else:
+                canvas.paste(piece, position, _scaled_alpha(piece, opacity))
+
+
+def layer_plan(image):
+    """返回 RGBA 图片的分段计划（按图片对象缓存）"""
+    return _plans.get_or_create(image, LayerPlan)
+
+
+def _scaled_alpha(image, opacity):
+    """图片（或蒙版）的 alpha 乘以不透明度后的 'L' 蒙版；没有 alpha 的图片视为全不透明"""
+    if image.mode == 'RGBA':
+        alpha = image.getchannel('A')
+    elif image.mode in ('L', '1'):
+        alpha = image.convert('L')
+    else:
+        return Image.new('L', image.size, round(255 * opacity))
+    return alpha.point(lambda value: round(value * opacity))
+
+
+class LayerCompositor:
+    """
+    一个面板的图层列表，按添加顺序合成（后添加的在上层）
+    用法:
+        compositor = LayerCompositor()
+        compositor.add(icon_web, (web_x, web_y), shared=True)
+        compositor.add(label_filled, (label_x, label_y))
+        compositor.composite(canvas)
+    """
+
+    def __init__(self):
+        self.layers = []
+
+    def add(self, image, xy, opacity=1.0, mask=None, shared=False):
+        """
+        添加图层
+        参数：
+            opacity: 不透明度（0-1），与图片自身的 alpha 相乘
+            mask: 单独的蒙版（如纯色填充图 + 图标形状），默认使用图片自身的 alpha
+            shared: 图片是共享对象（scaled_resource 的结果）时为 True，按对象缓存分段计划
+        """
+        self.layers.append((image, (int(xy[0]), int(xy[1])), opacity, mask, shared))
+        return self
+
+    def composite(self, canvas):
+        """把所有图层依次合成到画布上，返回画布"""
+        for image, xy, opacity, mask, shared in self.layers:
+            if opacity <= 0:
+                continue
+            if shared and mask is None and image.mode == 'RGBA':
+                layer_plan(image).composite(canvas, xy, opacity)
+                continue
+            if mask is None and image.mode == 'RGBA':
+                if opacity >= 1:
+                    paste_asset(canvas, image, xy)
+                    continue
+                mask = image
+            if opacity < 1:
+                mask = _scaled_alpha(image if mask is None else mask, opacity)
+            canvas.paste(image, xy, mask)
+        return canvas
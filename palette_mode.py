@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+调色板渲染 - 平涂箱唛的 8 位索引色（'P' 模式）画布
+箱唛展开图只有背景色、黑、白和少量 Logo 颜色，加上文字/线条边缘的抗锯齿过渡色：
+- 样式调色板 = 关键颜色 + 每两种关键颜色之间的抗锯齿渐变 + 资源图片中的主要颜色（最多 256 色）
+- 面板仍由样式按 RGB 绘制（透明资源的叠加需要 RGB），生成后按调色板映射为索引色并按对象缓存
+- 整张画布每像素 1 字节（RGB 为 3 字节），粘贴也只复制索引；输出时再按条带展开为 RGB / CMYK
+"""
+import numpy as np
+from PIL import Image
+
+from style_base import DerivedImageCache
+
+
+# 两种关键颜色之间的抗锯齿渐变级数（不含两端）
+RAMP_STEPS = 15
+# 映射为索引色时每批处理的像素数，限制临时数组的内存
+LOOKUP_BATCH_PIXELS = 1 << 20
+
+
+def pack_rgb(pixels):
+    """把 (..., 3) 的 uint8 像素打包为 24 位整数 (r << 16 | g << 8 | b)"""
+    channels = pixels.astype(np.uint32)
+    return (channels[..., 0] << 16) | (channels[..., 1] << 8) | channels[..., 2]
+
+
+class PaletteLookup:
+    """
+    颜色 -> 调色板索引的查表
+    调色板中的颜色按打包后的 24 位整数精确查表；Pillow 的 quantize 带有精度损失，只用于调色板外的颜色
+    """
+
+    def __init__(self, colors):
+        self.colors = [tuple(int(channel) for channel in color[:3]) for color in colors]
+        if not 0 < len(self.colors) <= 256:
+            raise ValueError(f"调色板颜色数必须在 1-256 之间，当前: {len(self.colors)}")
+        keys = np.array([(r << 16) | (g << 8) | b for r, g, b in self.colors], dtype=np.uint32)
+        self._order = np.argsort(keys, kind='stable')
+        self._sorted_keys = keys[self._order]
+        self.palette_image = Image.new('P', (1, 1))
+        self.palette_image.putpalette(self.flat_palette())
+
+    def flat_palette(self):
+        """返回 768 个值的扁平调色板（不足 256 色时用第一个颜色补齐）"""
+        flat = [channel for color in self.colors for channel in color]
+        return flat + flat[:3] * (256 - len(self.colors))
+
+    def indices(self, pixels):
+        """把 (..., 3) 的 uint8 像素映射为一维的 uint8 索引数组"""
+        packed = pack_rgb(pixels).ravel()
+        if packed.size == 0:
+            return np.zeros(0, dtype=np.uint8)
+        # 平涂图稿绝大部分是连续的同色像素：只对每段同色像素查一次表，再按段长展开
+        starts = np.flatnonzero(np.concatenate(([True], packed[1:] != packed[:-1])))
+        values = packed[starts]
+        position = np.minimum(np.searchsorted(self._sorted_keys, values), len(self._sorted_keys) - 1)
+        exact = self._sorted_keys[position] == values
+        value_indices = self._order[position].astype(np.uint8)
+        if not exact.all():
+            # 调色板外的颜色去重后按最近颜色映射
+            missing, inverse = np.unique(values[~exact], return_inverse=True)
+            missing_rgb = np.stack([missing >> 16, (missing >> 8) & 0xFF, missing & 0xFF], axis=-1).astype(np.uint8)
+            nearest = Image.fromarray(missing_rgb[np.newaxis]).quantize(palette=self.palette_image,
+                                                                        dither=Image.Dither.NONE)
+            value_indices[~exact] = np.asarray(nearest)[0][inverse.ravel()]
+        return np.repeat(value_indices, np.diff(np.append(starts, packed.size)))
+
+    def index(self, color):
+        """单个颜色的索引（不在调色板中时取最近的颜色）"""
+        return int(self.indices(np.array([color[:3]], dtype=np.uint8))[0])
+
+
+class StylePalette(PaletteLookup):
+    """
+    样式调色板：按 (样式, 背景色) 生成一次，面板映射结果按面板对象缓存
+    面板缓存命中时返回同一个 RGB 面板，这里也返回同一个索引色面板，增量生成据此跳过未变化的区域
+    """
+
+    def __init__(self, key_colors, resources=(), ramp_steps=RAMP_STEPS):
+        colors = []
+        for color in key_colors:
+            color = tuple(color[:3])
+            if color not in colors:
+                colors.append(color)
+        # 文字和线条边缘的抗锯齿像素落在两种颜色的连线上，为每对关键颜色预留渐变色
+        for i, start in enumerate(colors[:]):
+            for end in colors[i + 1:]:
+                for step in range(1, ramp_steps + 1):
+                    t = step / (ramp_steps + 1)
+                    ramp = tuple(round(a + (b - a) * t) for a, b in zip(start, end))
+                    if ramp not in colors:
+                        colors.append(ramp)
+        colors = colors[:256]
+        remaining = 256 - len(colors)
+        if remaining > 0 and resources:
+            colors += self._resource_colors(resources, colors[0], remaining, set(colors))
+        super().__init__(colors)
+        self._panels = DerivedImageCache()
+
+    @staticmethod
+    def _resource_colors(resources, background, count, existing):
+        """资源图片叠加在背景色上之后的主要颜色（缩小后取样，中位切分选出 count 种）"""
+        samples = []
+        for image in resources:
+            if not isinstance(image, Image.Image):
+                continue
+            scale = max(1, max(image.size) // 256)
+            sample = image.reduce(scale) if scale > 1 else image
+            if sample.mode == 'RGBA':
+                flattened = Image.new('RGB', sample.size, background)
+                flattened.paste(sample, mask=sample.getchannel('A'))
+                sample = flattened
+            samples.append(np.asarray(sample.convert('RGB')).reshape(-1, 3))
+        if not samples:
+            return []
+        pixels = np.concatenate(samples)[np.newaxis]
+        quantized = Image.fromarray(pixels).quantize(count, method=Image.Quantize.MEDIANCUT).convert('RGB')
+        counted = sorted(quantized.getcolors(count) or [], reverse=True)
+        return [color for _, color in counted if color not in existing]
+
+    def quantize(self, image):
+        """把 RGB / RGBA 图像映射为使用本调色板的 'P' 图像（按行分批，临时内存有上限）"""
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        width, height = image.size
+        result = np.empty((height, width), dtype=np.uint8)
+        rows = max(1, LOOKUP_BATCH_PIXELS // max(1, width))
+        for top in range(0, height, rows):
+            band = np.asarray(image.crop((0, top, width, min(top + rows, height))))
+            result[top:top + band.shape[0]] = self.indices(band).reshape(band.shape[:2])
+        indexed = Image.fromarray(result, 'P')
+        indexed.putpalette(self.flat_palette())
+        return indexed
+
+    def convert_panel(self, panel):
+        """映射面板并按对象缓存：同一个 RGB 面板（来自面板缓存）总是得到同一个索引色面板"""
+        return self._panels.get_or_create(panel, self.quantize)
+
+    def ink(self, color):
+        """在画布上绘制该颜色时使用的值（索引）"""
+        return self.index(color)
+
+    def new_canvas(self, size, color):
+        """创建使用本调色板的空白 'P' 画布"""
+        canvas = Image.new('P', size, self.index(color))
+        canvas.putpalette(self.flat_palette())
+        return canvas
+
+
+def downscale_to_rgb(image, size, band_pixels=LOOKUP_BATCH_PIXELS * 4):
+    """
+    把 'P' 等模式的大画布缩小为 RGB 图像：按目标行分带，每条带单独展开为 RGB 后按面积平均缩小
+    'P' 图像直接 resize 只能用最近邻；整张先转 RGB 又会生成 3 倍大小的副本
+    band_pixels 限制每条带的源像素数
+    """
+    width, height = image.size
+    target_w, target_h = size
+    scale_y = height / target_h
+    band_rows = max(1, int(band_pixels / (width * scale_y)))
+    result = Image.new('RGB', size)
+    for dest_top in range(0, target_h, band_rows):
+        dest_bottom = min(dest_top + band_rows, target_h)
+        src_top = int(dest_top * scale_y)
+        src_bottom = min(height, int(np.ceil(dest_bottom * scale_y)))
+        band = image.crop((0, src_top, width, src_bottom)).convert('RGB')
+        box = (0, dest_top * scale_y - src_top, width, dest_bottom * scale_y - src_top)
+        result.paste(band.resize((target_w, dest_bottom - dest_top), Image.Resampling.BOX, box=box),
+                     (0, dest_top))
+    return result
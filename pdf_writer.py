@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+"""
+流式 PDF 写入器 - 每个箱唛一页，逐页编码并立即写入磁盘，最后写 xref 和 trailer
+成千上万个箱唛合并成一个 PDF 时，内存只占用当前这一页的画布
+页面图像按行条带编码（JPEG 或 Flate），直接写入文件句柄，编码开销只有一条带的大小
+
+用法:
+    with StreamingPDFWriter('batch.pdf') as writer:
+        for sku_config in configs:
+            canvas = generator.generate_complete_layout(sku_config)
+            writer.add_page(canvas, sku_config.ppi)
+"""
+import io
+import os
+import math
+import zlib
+
+import numpy as np
+from PIL import Image
+
+from palette_mode import PaletteLookup
+
+
+class StreamingPDFWriter:
+    """
+    流式多页 PDF 写入器
+    - 对象按生成顺序写入文件，记录每个对象的字节偏移，close() 时写出页面树、xref 和 trailer
+    - 流对象的 /Length 使用间接对象，在流写完后再写长度，编码器可以直接写文件句柄而不需要先缓冲
+    - 页面尺寸按 图像像素 / PPI 换算为点（1/72 英寸），与 Pillow 保存 PDF 时一致
+    """
+    CATALOG_ID = 1
+    PAGES_ID = 2
+
+    # 颜色模式 -> (PDF 颜色空间, 通道数, DCT 编码时的附加参数)
+    # Pillow 写出的 CMYK JPEG 带 Adobe 标记（反相存储），需要 /Decode 翻转
+    COLOR_SPACES = {
+        'L': ('/DeviceGray', 1, ''),
+        'RGB': ('/DeviceRGB', 3, ''),
+        'CMYK': ('/DeviceCMYK', 4, ' /Decode [1 0 1 0 1 0 1 0]'),
+    }
+
+    COMPRESSIONS = ('dct', 'flate', 'indexed', 'bilevel')
+
+    def __init__(self, output, quality=100, flate_level=6, strip_bytes=4 * 1024 * 1024, black_threshold=64):
+        """
+        Args:
+            output: 输出路径或已打开的二进制文件对象（需要支持 tell()）
+            quality: 页面图像的 JPEG 质量（DCTDecode）
+            flate_level: 无损压缩（FlateDecode）的 zlib 压缩级别
+            strip_bytes: 每条带未压缩数据的目标大小，决定编码时的内存开销
+            black_threshold: bilevel 压缩时，各通道都不超过该值的像素归入黑色 1 位图层
+        """
+        if hasattr(output, 'write'):
+            self._file = output
+            self._owns_file = False
+        else:
+            self._path = output
+            self._file = open(output, 'wb')
+            self._owns_file = True
+        self.quality = quality
+        self.flate_level = flate_level
+        self.strip_bytes = strip_bytes
+        self.black_threshold = black_threshold
+        self._offsets = {}
+        self._next_id = self.PAGES_ID + 1
+        self._page_ids = []
+        self._closed = False
+        self._start = self._file.tell()
+        # 头部注释行包含高位字节，提示传输工具按二进制处理
+        self._file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 写入过程中出错时不写 xref / trailer（保留原异常），由本对象打开的文件不完整，直接删除
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    @property
+    def page_count(self):
+        return len(self._page_ids)
+
+    def _reserve(self):
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def _begin_object(self, obj_id):
+        self._offsets[obj_id] = self._file.tell() - self._start
+        self._file.write(f'{obj_id} 0 obj\n'.encode('ascii'))
+
+    def _write_object(self, obj_id, body):
+        self._begin_object(obj_id)
+        self._file.write(body.encode('ascii'))
+        self._file.write(b'\nendobj\n')
+
+    def _write_stream(self, obj_id, dictionary, write_data):
+        """写一个流对象：write_data(file) 负责直接向文件写入编码后的数据，长度事后以间接对象给出"""
+        length_id = self._reserve()
+        self._begin_object(obj_id)
+        self._file.write(f'<< {dictionary} /Length {length_id} 0 R >>\nstream\n'.encode('ascii'))
+        data_start = self._file.tell()
+        write_data(self._file)
+        length = self._file.tell() - data_start
+        self._file.write(b'\nendstream\nendobj\n')
+        self._write_object(length_id, str(length))
+
+    def strip_rows(self, width, mode):
+        """按 strip_bytes 计算每条带的行数，取 16 的倍数（与 JPEG 4:2:0 的 MCU 高度对齐）"""
+        channels = self.COLOR_SPACES[mode][1]
+        rows = self.strip_bytes // max(1, width * channels)
+        return max(16, rows - rows % 16)
+
+    def add_page(self, image, ppi, compression='dct', palette=None):
+        """
+        追加一页：把图像切成行条带，逐条转换颜色模式、编码并写入文件，返回页码（从 1 开始）
+        内存开销只有一条带（默认约 4MB），与画布大小无关
+        Args:
+            image: PIL 图像（RGB / L / CMYK 原样写入，其他模式逐条带转为 RGB；
+                   'P' 图像用 indexed / bilevel 压缩时直接写入自身的调色板和索引）
+            ppi: 图像分辨率，决定页面物理尺寸
+            compression: 见 COMPRESSIONS
+                'dct'（JPEG，有损，体积小）/ 'flate'（无损）/
+                'indexed'（索引色 + Flate，无损，适合平涂图稿；超过 256 色时底图为 RGB Flate）/
+                'bilevel'（索引色底图 + 黑色内容的 1 位 CCITT G4 图层，接近黑色的像素变为纯黑）
+            palette: indexed / bilevel 使用的调色板 [(r, g, b), ...]（第一个颜色为底色，调色板外的颜色映射为最近的颜色），
+                     None 表示自动检测
+        """
+        if compression not in self.COMPRESSIONS:
+            raise ValueError(f"不支持的压缩方式: {compression}，可选: {', '.join(self.COMPRESSIONS)}")
+        if compression in ('indexed', 'bilevel'):
+            return self._add_flat_page(image, ppi, palette, bilevel=(compression == 'bilevel'))
+        mode = image.mode if image.mode in self.COLOR_SPACES else 'RGB'
+        width, height = image.size
+        rows = self.strip_rows(width, mode)
+
+        def bands():
+            for top in range(0, height, rows):
+                band = image.crop((0, top, width, min(top + rows, height)))
+                yield band if band.mode == mode else band.convert(mode)
+
+        return self.add_page_from_bands(image.size, ppi, bands(), mode=mode, compression=compression)
+
+    def add_page_from_bands(self, size, ppi, bands, mode='RGB', compression='dct'):
+        """
+        从自上而下的条带序列追加一页，可直接接分带渲染器的输出，不需要完整画布
+        - flate: 整页一个图像对象，条带依次送入同一个压缩流
+        - dct:   每条带一个 JPEG 图像对象，在页面上按偏移拼接
+        Args:
+            size: 整页像素尺寸 (width, height)
+            bands: 可迭代的 PIL 图像，宽度等于整页宽度，高度之和等于整页高度
+            mode: 条带的颜色模式（L / RGB / CMYK）
+        """
+        if self._closed:
+            raise ValueError("PDF 已关闭，不能继续添加页面")
+        if compression not in ('dct', 'flate'):
+            raise ValueError(f"条带输入不支持的压缩方式: {compression}，可选: dct, flate")
+        color_space, channels, dct_extra = self.COLOR_SPACES[mode]
+        width, height = size
+
+        placements = []  # [(图像对象号, 距顶部的行数, 行数), ...]
+        if compression == 'flate':
+            image_id = self._reserve()
+
+            def write_flate(f):
+                compressor = zlib.compressobj(self.flate_level)
+                written_rows = 0
+                for band in bands:
+                    f.write(compressor.compress(band.tobytes()))
+                    written_rows += band.height
+                f.write(compressor.flush())
+                if written_rows != height:
+                    raise ValueError(f"条带总高度 {written_rows} 与页面高度 {height} 不一致")
+
+            self._write_stream(
+                image_id,
+                f'/Type /XObject /Subtype /Image /Width {width} /Height {height} '
+                f'/ColorSpace {color_space} /BitsPerComponent 8 /Filter /FlateDecode',
+                write_flate,
+            )
+            placements.append((image_id, 0, height))
+        else:
+            top = 0
+            for band in bands:
+                image_id = self._reserve()
+                self._write_stream(
+                    image_id,
+                    f'/Type /XObject /Subtype /Image /Width {band.width} /Height {band.height} '
+                    f'/ColorSpace {color_space} /BitsPerComponent 8 /Filter /DCTDecode{dct_extra}',
+                    lambda f, band=band: band.save(f, 'JPEG', quality=self.quality),
+                )
+                placements.append((image_id, top, band.height))
+                top += band.height
+            if top != height:
+                raise ValueError(f"条带总高度 {top} 与页面高度 {height} 不一致")
+
+        return self._finish_page(size, ppi, placements)
+
+    def build_palette(self, image, palette=None):
+        """
+        返回 (PaletteLookup, 出现最多的颜色)
+        指定 palette 时调色板外的颜色映射为最近的颜色；自动检测时使用图像中的全部颜色（无损），
+        超过 256 色（索引色无法无损表示）时返回 (None, 缩小 8 倍的图像中出现最多的颜色)
+        """
+        if palette is not None:
+            lookup = PaletteLookup([tuple(color) for color in palette])
+            return lookup, lookup.colors[0]
+        counted = image.getcolors(256)
+        if counted is None:
+            sample = image.reduce(8) if min(image.size) >= 64 else image
+            return None, max(sample.getcolors(sample.width * sample.height))[1]
+        counted.sort(reverse=True)
+        lookup = PaletteLookup([color for _, color in counted])
+        return lookup, lookup.colors[0]
+
+    @staticmethod
+    def _ccitt_g4(mask):
+        """把 '1' 模式图像编码为 CCITT G4 数据（借助 libtiff 写单条带 TIFF，再按标签取出条带）"""
+        buffer = io.BytesIO()
+        mask.save(buffer, 'TIFF', compression='group4', strip_size=math.ceil(mask.width / 8) * mask.height)
+        buffer.seek(0)
+        with Image.open(buffer) as tiff:
+            offset = tiff.tag_v2[273][0]
+            length = tiff.tag_v2[279][0]
+        return buffer.getvalue()[offset:offset + length]
+
+    def _add_flat_page(self, image, ppi, palette, bilevel):
+        """
+        平涂图稿的页面
+        - 底图：按调色板映射为索引色，逐条带送入同一个 Flate 流；
+          没有指定调色板且图像超过 256 色时，索引色会丢失颜色，底图改为 RGB Flate（仍然无损，只是更大）
+        - bilevel：接近黑色的像素（各通道都不超过 black_threshold）另存为 1 位蒙版，
+          按条带以 CCITT G4 编码，用纯黑填充叠加在底图上；底图中这些像素改为最常见的颜色，压缩更好且边缘锐利
+          （接近黑色的深灰像素会变为纯黑，因此 bilevel 不是无损的）
+        """
+        if self._closed:
+            raise ValueError("PDF 已关闭，不能继续添加页面")
+        if image.mode == 'CMYK':
+            raise ValueError("indexed / bilevel 压缩只支持 RGB / 'P' 画布")
+        width, height = image.size
+        rows = self.strip_rows(width, 'RGB')
+        if image.mode == 'P' and palette is None:
+            # 调色板模式渲染的画布：直接使用画布自身的调色板和索引，不需要重新查表
+            histogram = image.histogram()
+            used = [index for index, count in enumerate(histogram) if count]
+            flat = image.getpalette()
+            colors = [tuple(flat[i * 3:i * 3 + 3]) for i in range(used[-1] + 1)]
+            fill_index = max(used, key=histogram.__getitem__)
+            is_black = np.array([max(color) <= self.black_threshold for color in colors] + [False] * (256 - len(colors)))
+
+            def band_indices(top):
+                indices = np.asarray(image.crop((0, top, width, min(top + rows, height))))
+                black = is_black[indices] if bilevel else None
+                return indices, black, fill_index
+        else:
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            lookup, most_common = self.build_palette(image, palette)
+            colors = lookup.colors if lookup is not None else None
+
+            def band_indices(top):
+                pixels = np.asarray(image.crop((0, top, width, min(top + rows, height))))
+                black = None
+                if bilevel:
+                    black = (pixels[..., 0] <= self.black_threshold) & (pixels[..., 1] <= self.black_threshold) \
+                        & (pixels[..., 2] <= self.black_threshold)
+                    if black.any():
+                        # 黑色像素在底图中改为最常见的颜色，压缩更好
+                        pixels = pixels.copy()
+                        pixels[black] = most_common
+                if lookup is None:
+                    return pixels, black, None
+                return lookup.indices(pixels).reshape(pixels.shape[:2]), black, None
+
+        encoded_masks = []  # [(距顶部的行数, 行数, G4 数据), ...]，压缩后很小，底图写完后再写出
+
+        def write_indexed(f):
+            compressor = zlib.compressobj(self.flate_level)
+            for top in range(0, height, rows):
+                indices, black, fill = band_indices(top)
+                if black is not None and black.any():
+                    # '1' 模式中 0 为黑：需要用黑色填充的像素取 0（ImageMask 默认 /Decode [0 1]，样本 0 表示绘制）
+                    encoded_masks.append((top, indices.shape[0], self._ccitt_g4(Image.fromarray(~black))))
+                    if fill is not None:
+                        indices = np.where(black, np.uint8(fill), indices)
+                f.write(compressor.compress(indices.tobytes()))
+            f.write(compressor.flush())
+
+        if colors is None:
+            color_space = '/DeviceRGB'
+        else:
+            lookup_hex = bytes(channel for color in colors for channel in color).hex()
+            color_space = f'[/Indexed /DeviceRGB {len(colors) - 1} <{lookup_hex}>]'
+        image_id = self._reserve()
+        self._write_stream(
+            image_id,
+            f'/Type /XObject /Subtype /Image /Width {width} /Height {height} '
+            f'/ColorSpace {color_space} /BitsPerComponent 8 /Filter /FlateDecode',
+            write_indexed,
+        )
+
+        masks = []
+        for top, band_h, data in encoded_masks:
+            mask_id = self._reserve()
+            self._write_stream(
+                mask_id,
+                f'/Type /XObject /Subtype /Image /Width {width} /Height {band_h} /ImageMask true '
+                f'/BitsPerComponent 1 /Filter /CCITTFaxDecode '
+                f'/DecodeParms << /K -1 /BlackIs1 true /Columns {width} /Rows {band_h} >>',
+                lambda f, data=data: f.write(data),
+            )
+            masks.append((mask_id, top, band_h))
+        return self._finish_page(image.size, ppi, [(image_id, 0, height)], masks)
+
+    def _finish_page(self, size, ppi, placements, masks=()):
+        """
+        写出页面内容流和页面对象
+        placements / masks: [(图像对象号, 距顶部的行数, 行数), ...]，蒙版在图像之上用黑色填充
+        """
+        width, height = size
+        scale = 72.0 / ppi
+        page_w = width * scale
+        page_h = height * scale
+
+        # PDF 坐标原点在左下角：第 i 条带放在 y = 页面高度 - (top + 行数)
+        operations = []
+        names = []
+        for prefix, items in (('Im', placements), ('Mk', masks)):
+            if prefix == 'Mk' and items:
+                operations.append('0 g')
+            for index, (obj_id, top, rows) in enumerate(items):
+                band_h = rows * scale
+                band_y = (height - top - rows) * scale
+                operations.append(f'q {page_w:.4f} 0 0 {band_h:.4f} 0 {band_y:.4f} cm /{prefix}{index} Do Q')
+                names.append(f'/{prefix}{index} {obj_id} 0 R')
+        content = '\n'.join(operations).encode('ascii')
+        content_id = self._reserve()
+        self._write_stream(content_id, '', lambda f: f.write(content))
+
+        xobjects = ' '.join(names)
+        page_id = self._reserve()
+        self._write_object(
+            page_id,
+            f'<< /Type /Page /Parent {self.PAGES_ID} 0 R /MediaBox [0 0 {page_w:.4f} {page_h:.4f}] '
+            f'/Resources << /XObject << {xobjects} >> >> /Contents {content_id} 0 R >>',
+        )
+        self._page_ids.append(page_id)
+        self._file.flush()
+        return len(self._page_ids)
+
+    def abort(self):
+        """放弃写入：不写 xref / trailer；由本对象打开的文件关闭并删除，传入的文件对象保持原样（内容不完整）"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._owns_file:
+            self._file.close()
+            os.remove(self._path)
+
+    def close(self):
+        """写出页面树、目录、xref 和 trailer；由本对象打开的文件会一并关闭"""
+        if self._closed:
+            return
+        self._closed = True
+        kids = ' '.join(f'{page_id} 0 R' for page_id in self._page_ids)
+        self._write_object(self.PAGES_ID, f'<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>')
+        self._write_object(self.CATALOG_ID, f'<< /Type /Catalog /Pages {self.PAGES_ID} 0 R >>')
+
+        xref_offset = self._file.tell() - self._start
+        size = self._next_id
+        lines = [f'xref\n0 {size}\n', '0000000000 65535 f \n']
+        for obj_id in range(1, size):
+            if obj_id in self._offsets:
+                lines.append(f'{self._offsets[obj_id]:010d} 00000 n \n')
+            else:
+                # 已分配编号但没有写出的对象（添加页面时出错被调用方捕获）记为空闲条目
+                lines.append('0000000000 00001 f \n')
+        self._file.write(''.join(lines).encode('ascii'))
+        self._file.write(f'trailer\n<< /Size {size} /Root {self.CATALOG_ID} 0 R >>\n'
+                         f'startxref\n{xref_offset}\n%%EOF\n'.encode('ascii'))
+        self._file.flush()
+        if self._owns_file:
+            self._file.close()
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+进程内渲染服务 - 有界任务队列 + 按 CPU 核数设置的工作线程 + 全局内存预算
+相同配置（指纹相同）的在途请求会合并为一个任务，只渲染一次，结果共享
+"""
+import os
+import threading
+import pathlib as Path
+from collections import deque
+
+from generation_core_v2 import BoxMarkGenerator
+from deep_zoom import prune_tile_sets
+from render_worker import estimate_render_bytes
+
+
+class RenderJob:
+    """
+    一个印刷分辨率渲染任务
+    状态: 'queued' -> 'running' -> 'done' / 'failed' / 'cancelled'
+    """
+
+    def __init__(self, service, sku_config, preview_width):
+        self.service = service
+        self.sku_config = sku_config
+        self.fingerprint = sku_config.fingerprint()
+        self.preview_width = preview_width
+        self.key = (self.fingerprint, preview_width)  # 合并键：配置和预览宽度都相同的请求才共享结果
+        # 设置了 tiles_root 时，高清画布的深度缩放瓦片写到 tiles_root/<指纹>/
+        self.tiles_dir = service.tiles_root / self.fingerprint if service.tiles_root is not None else None
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.subscribers = 1  # 合并到该任务的请求数，全部取消后任务才真正取消
+        self.estimated_bytes = service.estimate_bytes(sku_config)
+        self.cancel_event = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def position(self):
+        """排队位置（1 表示下一个开始），不在队列中时为 0"""
+        return self.service.queue_position(self)
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """等待任务结束，返回是否已结束"""
+        return self._done.wait(timeout)
+
+    def cancel(self):
+        """取消当前请求；合并的请求全部取消后，排队中的任务出队，运行中的任务在下一阶段前退出"""
+        self.service.cancel(self)
+
+    def _finish(self, status, result=None, error=None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self._done.set()
+
+    def __repr__(self):
+        return f"RenderJob({self.sku_config.sku_name!r}, status={self.status!r}, subscribers={self.subscribers})"
+
+
+class RenderService:
+    """
+    进程内渲染服务
+    - max_queue: 排队任务上限，队列满时 submit 抛出 RuntimeError
+    - max_workers: 工作线程数，默认等于 CPU 核数
+    - memory_budget_mb: 同时运行的任务预估内存之和的上限；单个任务超出预算时只在没有其他任务运行时执行
+    - generator_factory: (style_name, ppi) -> BoxMarkGenerator，默认按 (样式, PPI) 在服务内缓存
+    - tiles_root: 深度缩放瓦片的输出目录，None 表示不生成瓦片；只保留最近的 max_tile_sets 套
+    """
+
+    def __init__(self, base_dir, max_workers=None, max_queue=32, memory_budget_mb=2048,
+                 generator_factory=None, tiles_root=None, max_tile_sets=20):
+        self.base_dir = base_dir
+        self.tiles_root = Path.Path(tiles_root) if tiles_root is not None else None
+        self.max_tile_sets = max_tile_sets
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.generator_factory = generator_factory or self._default_generator
+        self._generators = {}
+        self._pending = deque()
+        self._inflight = {}  # (fingerprint, preview_width) -> RenderJob（排队中或运行中）
+        self._running = 0
+        self._reserved_bytes = 0
+        self._cond = threading.Condition()
+        self._workers = []
+        for i in range(self.max_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f'boxmark-render-{i}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _default_generator(self, style_name, ppi):
+        key = (style_name, ppi)
+        with self._cond:
+            generator = self._generators.get(key)
+        if generator is None:
+            generator = BoxMarkGenerator(base_dir=self.base_dir, style_name=style_name, ppi=ppi)
+            with self._cond:
+                generator = self._generators.setdefault(key, generator)
+        return generator
+
+    def estimate_bytes(self, sku_config):
+        """预估一个任务的峰值内存（见 render_worker.estimate_render_bytes）"""
+        return estimate_render_bytes(sku_config)
+
+    def submit(self, sku_config, preview_width=2000):
+        """
+        提交渲染请求；已有相同指纹、相同预览宽度的在途任务时直接合并并返回该任务
+        在途任务已被取消（正在运行、将在下一阶段前退出）时不合并，另外提交一个新任务
+        """
+        key = (sku_config.fingerprint(), preview_width)
+        with self._cond:
+            job = self._inflight.get(key)
+            if job is not None and not job.cancel_event.is_set():
+                job.subscribers += 1
+                return job
+            if len(self._pending) >= self.max_queue:
+                raise RuntimeError(f"渲染队列已满（{self.max_queue} 个任务），请稍后重试")
+            job = RenderJob(self, sku_config, preview_width)
+            self._inflight[key] = job
+            self._pending.append(job)
+            self._cond.notify_all()
+            return job
+
+    def cancel(self, job):
+        with self._cond:
+            if job.done():
+                return
+            job.subscribers -= 1
+            if job.subscribers > 0:
+                return
+            job.cancel_event.set()
+            if job.status == 'queued':
+                self._pending.remove(job)
+                self._release_key(job)
+                job._finish('cancelled')
+                self._cond.notify_all()
+
+    def _release_key(self, job):
+        # 已取消的任务运行期间，相同配置的新任务可能已经占用了合并键，不能把它移除
+        if self._inflight.get(job.key) is job:
+            del self._inflight[job.key]
+
+    def queue_position(self, job):
+        with self._cond:
+            try:
+                return self._pending.index(job) + 1
+            except ValueError:
+                return 0
+
+    def info(self):
+        """返回服务状态统计"""
+        with self._cond:
+            return {
+                'workers': self.max_workers,
+                'running': self._running,
+                'queued': len(self._pending),
+                'reserved_mb': self._reserved_bytes / (1024 * 1024),
+                'memory_budget_mb': self.memory_budget / (1024 * 1024),
+            }
+
+    def _fits_budget(self, job):
+        if self._running == 0:
+            return True
+        return self._reserved_bytes + job.estimated_bytes <= self.memory_budget
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                # 按队列顺序执行；队首任务超出内存预算时等待正在运行的任务释放内存
+                while not (self._pending and self._fits_budget(self._pending[0])):
+                    self._cond.wait()
+                job = self._pending.popleft()
+                job.status = 'running'
+                self._running += 1
+                self._reserved_bytes += job.estimated_bytes
+            status, result, error = 'failed', None, None
+            try:
+                generator = self.generator_factory(job.sku_config.style_name, job.sku_config.ppi)
+                result = generator.render_for_print(job.sku_config, job.preview_width, job.cancel_event,
+                                                    tiles_dir=job.tiles_dir)
+                if job.tiles_dir is not None:
+                    prune_tile_sets(self.tiles_root, self.max_tile_sets)
+                status = 'cancelled' if result is None else 'done'
+            except Exception as e:
+                error = e
+            finally:
+                # 先释放占用的内存预算和指纹，再通知等待方，避免结束后立即提交的相同请求合并到已完成的任务上
+                with self._cond:
+                    self._running -= 1
+                    self._reserved_bytes -= job.estimated_bytes
+                    self._release_key(job)
+                    job._finish(status, result=result, error=error)
+                    self._cond.notify_all()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+渲染工作进程 - HTTP 接口（api_server）和批量渲染（bulk_render）共用的进程池函数
+- init_render_worker: 进程池初始化，记录目录、设置缓存上限并预热常用的 (样式, PPI) 生成器
+- render_to_file: 在工作进程中渲染一个请求，结果写入临时文件（只在进程间传递文件路径）
+- estimate_render_bytes: 一个渲染任务的峰值内存预估，用于按内存预算限制并发
+"""
+import os
+import tempfile
+import time
+import pathlib as Path
+from urllib.parse import quote
+
+from generation_core_v2 import SKUConfig, BoxMarkGenerator
+
+
+ASSET_URL_PREFIX = '/assets/'
+
+_worker_generators = {}
+_worker_state = {}
+
+
+def estimate_render_bytes(sku_config):
+    """
+    预估一个任务的峰值内存：完整画布 + RGB 副本 + PDF 缓冲，各按画布像素数计算
+    展开图的宽高上限按 (2*长 + 2*宽) x (宽 + 高) 估算，对所有样式都偏保守
+    """
+    width_px = 2 * (sku_config.l_px + sku_config.w_px)
+    height_px = sku_config.w_px + sku_config.h_px
+    channels = len(sku_config.color_mode)
+    return width_px * height_px * channels * 3
+
+
+def _worker_generator(style_name, ppi):
+    """工作进程内按 (样式, PPI) 缓存的生成器，首次使用时创建"""
+    key = (style_name, ppi)
+    generator = _worker_generators.get(key)
+    if generator is None:
+        generator = BoxMarkGenerator(base_dir=_worker_state['base_dir'], style_name=style_name, ppi=ppi,
+                                     template_dir=_worker_state['template_dir'],
+                                     panel_cache_mb=_worker_state['panel_cache_mb'],
+                                     template_cache_mb=_worker_state['template_cache_mb'])
+        _worker_generators[key] = generator
+    return generator
+
+
+def init_render_worker(base_dir, template_dir, spool_dir, warm, panel_cache_mb=512, template_cache_mb=256):
+    """
+    进程池初始化：记录目录并预热常用的 (样式, PPI) 生成器
+    panel_cache_mb / template_cache_mb 为每个生成器的缓存上限（每个进程每种 (样式, PPI) 各一份）
+    """
+    _worker_state.update(base_dir=base_dir, template_dir=template_dir, spool_dir=spool_dir,
+                         panel_cache_mb=panel_cache_mb, template_cache_mb=template_cache_mb)
+    for style_name, ppi in warm:
+        _worker_generator(style_name, ppi)
+
+
+def asset_url(path):
+    """assets 目录下的文件路径 -> 本服务的 /assets/... URL，其他路径返回 None（SVG 中改为内嵌）"""
+    assets_dir = Path.Path(_worker_state['base_dir']).resolve() / 'assets'
+    path = Path.Path(path).resolve()
+    if not path.is_relative_to(assets_dir):
+        return None
+    return ASSET_URL_PREFIX + quote(path.relative_to(assets_dir).as_posix())
+
+
+def render_to_file(config_data, output_format, max_width):
+    """
+    在工作进程中渲染一个请求，结果写入临时文件
+    Returns:
+        tuple: (临时文件路径, 字节数, 渲染耗时秒数)
+    """
+    start = time.perf_counter()
+    sku_config = SKUConfig.from_dict(config_data)
+    generator = _worker_generator(sku_config.style_name, sku_config.ppi)
+    if output_format == 'png':
+        data = generator.render_png_bytes(sku_config, max_width=max_width)
+    elif output_format == 'svg':
+        data = generator.render_svg_bytes(sku_config, max_width=max_width, asset_href=asset_url)
+    else:
+        data = generator.render_pdf_bytes(sku_config)
+    fd, path = tempfile.mkstemp(suffix=f'.{output_format}', dir=_worker_state['spool_dir'])
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    return path, len(data), time.perf_counter() - start
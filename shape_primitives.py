@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+解析抗锯齿图形 - 直接在目标分辨率上按像素中心到图形边缘的距离计算覆盖率（0-1），作为蒙版把填充色贴到画布上
+不需要放大 4 倍绘制再缩小（16 倍像素的临时图层 + 重采样），也不会像 ImageDraw 那样边缘锯齿
+- 距离按行分批计算，临时数组的内存有上限
+- 坐标约定：box 为连续坐标 [x0, y0, x1, y1)，像素 (i, j) 覆盖 [i, i+1) x [j, j+1)，其中心为 (i+0.5, j+0.5)
+
+覆盖率 = clip(0.5 - 有符号距离, 0, 1)（图形内部距离为负），对直线边缘等于像素被覆盖的面积
+"""
+import math
+import numpy as np
+from PIL import Image
+
+
+# 每批计算的像素数，限制 float32 临时数组的内存
+COVERAGE_BATCH_PIXELS = 1 << 20
+
+
+def _integer_box(box, canvas_size):
+    """把连续坐标的 box 扩展为覆盖它的整数像素范围，并裁剪到画布内；完全在画布外时返回 None"""
+    x0, y0, x1, y1 = box
+    left = max(0, math.floor(x0))
+    top = max(0, math.floor(y0))
+    right = min(canvas_size[0], math.ceil(x1))
+    bottom = min(canvas_size[1], math.ceil(y1))
+    if right <= left or bottom <= top:
+        return None
+    return left, top, right, bottom
+
+
+def fill_coverage(canvas, box, distance, fill):
+    """
+    按有符号距离函数填充：distance(xs, ys) 接收像素中心坐标（xs 形状 (1, w)，ys 形状 (h, 1)），
+    返回 (h, w) 的距离数组；box 为需要计算的像素范围 (left, top, right, bottom)
+    """
+    left, top, right, bottom = box
+    width = right - left
+    xs = (np.arange(left, right, dtype=np.float32) + 0.5)[np.newaxis, :]
+    rows = max(1, COVERAGE_BATCH_PIXELS // width)
+    for band_top in range(top, bottom, rows):
+        band_bottom = min(band_top + rows, bottom)
+        ys = (np.arange(band_top, band_bottom, dtype=np.float32) + 0.5)[:, np.newaxis]
+        coverage = np.clip(0.5 - distance(xs, ys), 0.0, 1.0)
+        mask = Image.fromarray((coverage * 255 + 0.5).astype(np.uint8), 'L')
+        canvas.paste(fill, (left, band_top, right, band_bottom), mask)
+    return canvas
+
+
+def fill_rounded_rectangle(canvas, box, radius, fill):
+    """
+    抗锯齿圆角矩形（精确的有符号距离）
+    box 使用 ImageDraw.rounded_rectangle 的约定 [x0, y0, x1, y1]（右下角像素包含在内），可直接替换
+    """
+    x0, y0, x1, y1 = box
+    x1 += 1
+    y1 += 1
+    radius = max(0.0, min(radius, (x1 - x0) / 2, (y1 - y0) / 2))
+    center_x, center_y = (x0 + x1) / 2, (y0 + y1) / 2
+    inner_w, inner_h = (x1 - x0) / 2 - radius, (y1 - y0) / 2 - radius
+
+    def distance(xs, ys):
+        qx = np.abs(xs - center_x) - inner_w
+        qy = np.abs(ys - center_y) - inner_h
+        outside = np.hypot(np.maximum(qx, 0), np.maximum(qy, 0))
+        inside = np.minimum(np.maximum(qx, qy), 0)
+        return outside + inside - radius
+
+    pixel_box = _integer_box((x0, y0, x1, y1), canvas.size)
+    if pixel_box is not None:
+        fill_coverage(canvas, pixel_box, distance, fill)
+    return canvas
+
+
+def fill_ellipse(canvas, box, fill):
+    """
+    抗锯齿椭圆，内切于连续坐标 box [x0, y0, x1, y1)
+    距离取隐函数值除以梯度长度的一阶近似，对细长的装饰线也足够准确
+    """
+    x0, y0, x1, y1 = box
+    a, b = (x1 - x0) / 2, (y1 - y0) / 2
+    if a <= 0 or b <= 0:
+        return canvas
+    center_x, center_y = (x0 + x1) / 2, (y0 + y1) / 2
+
+    def distance(xs, ys):
+        u = (xs - center_x) / a
+        v = (ys - center_y) / b
+        g = np.hypot(u, v)
+        gradient = np.hypot(u / a, v / b)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            d = g * (g - 1) / gradient
+        # 椭圆中心处梯度为 0，距离取到边缘的最短半轴
+        return np.where(gradient > 0, d, -min(a, b))
+
+    pixel_box = _integer_box(box, canvas.size)
+    if pixel_box is not None:
+        fill_coverage(canvas, pixel_box, distance, fill)
+    return canvas
+
+
+def fill_below_smoothstep(canvas, start, end, bottom, fill):
+    """
+    抗锯齿的 S 形过渡：填充曲线 y = y3 + (y4 - y3) * smoothstep(t) 下方直到 bottom 的区域（x 在 x3 到 x4 之间）
+    用于底框左右两段高度不同的黑块之间的弧形连接，两端切线水平，可与两侧的矩形无缝拼接
+    距离取像素中心到曲线的竖直距离按斜率换算为法向距离
+    """
+    (x3, y3), (x4, y4) = start, end
+    if x4 < x3:
+        (x3, y3), (x4, y4) = (x4, y4), (x3, y3)
+    span = x4 - x3
+    if span <= 0:
+        return canvas
+    curve_top, curve_bottom = min(y3, y4), max(y3, y4)
+
+    def distance(xs, ys):
+        t = np.clip((xs - x3) / span, 0.0, 1.0)
+        curve_y = y3 + (y4 - y3) * t * t * (3 - 2 * t)
+        slope = (y4 - y3) * 6 * t * (1 - t) / span
+        return (curve_y - ys) / np.sqrt(1 + slope * slope)
+
+    pixel_box = _integer_box((x3, curve_top, x4, min(curve_bottom, bottom)), canvas.size)
+    if pixel_box is not None:
+        fill_coverage(canvas, pixel_box, distance, fill)
+        # 曲线最低点以下的部分完全被覆盖，直接填充
+        left, _, right, solid_top = pixel_box
+        if solid_top < min(bottom, canvas.height):
+            canvas.paste(fill, (left, solid_top, right, min(math.ceil(bottom), canvas.height)))
+    return canvas
@@ -3,8 +3,9 @@
 Barberpub 对开盖样式 - 将原有的 BoxMarkEngine 转换为样式类
 """
 from PIL import Image, ImageDraw, ImageFont
-import pathlib as Path
-from style_base import BoxMarkStyle, StyleRegistry
+from style_base import BoxMarkStyle, StyleRegistry, panel_depends_on, static_layer
+from layer_compositor import LayerCompositor
+from asset_preprocessing import paste_asset, open_asset, asset_file
 import general_functions
 
 
@@ -80,7 +81,7 @@ class BarberpubDoubleOpeningStyle(BoxMarkStyle):
         canvas_side = self.generate_barberpub_side_panel(sku_config)
         canvas_left_up, canvas_left_down = self.generate_barberpub_left_panel(sku_config)
         canvas_right_up, canvas_right_down = self.generate_barberpub_right_panel(sku_config)
-        canvas_blank = Image.new(sku_config.color_mode, (sku_config.w_px, sku_config.half_w_px), sku_config.background_color)
+        canvas_blank = self.generate_blank_panel(sku_config)
 
 
         return {
@@ -99,29 +100,35 @@ class BarberpubDoubleOpeningStyle(BoxMarkStyle):
         res_base = self.base_dir / 'assets' / 'Barberpub' / '对开盖' / '矢量文件'
         
         self.resources = {
-            'icon_logo': Image.open(res_base / '正唛logo.png').convert('RGBA'),
-            'icon_top_logo': Image.open(res_base / '顶盖logo信息.png').convert('RGBA'),
-            'icon_attention_info': Image.open(res_base / '对开盖开箱注意事项.png').convert('RGBA'),
-            'icon_company': Image.open(res_base / '正唛公司信息.png').convert('RGBA'),
-            'icon_webside': Image.open(res_base / '侧唛网址.png').convert('RGBA'),
-            'icon_side_label_wide': Image.open(res_base / '侧唛标签_宽.png').convert('RGBA'),
-            'icon_side_label_narrow': Image.open(res_base / '侧唛标签_窄.png').convert('RGBA'),
-            'icon_slogan': Image.open(res_base / '正唛宣传语.png').convert('RGBA'),
-            'icon_box_info': Image.open(res_base / '正唛多箱选择框.png').convert('RGBA'),
-            'img_line_drawing': Image.open(res_base / '侧唛线描图.png').convert('RGBA'),
+            'icon_logo': open_asset(res_base / '正唛logo.png'),
+            'icon_top_logo': open_asset(res_base / '顶盖logo信息.png'),
+            'icon_attention_info': open_asset(res_base / '对开盖开箱注意事项.png'),
+            'icon_company': open_asset(res_base / '正唛公司信息.png'),
+            'icon_webside': open_asset(res_base / '侧唛网址.png'),
+            'icon_side_label_wide': open_asset(res_base / '侧唛标签_宽.png'),
+            'icon_side_label_narrow': open_asset(res_base / '侧唛标签_窄.png'),
+            'icon_slogan': open_asset(res_base / '正唛宣传语.png'),
+            'icon_box_info': open_asset(res_base / '正唛多箱选择框.png'),
+            'img_line_drawing': open_asset(res_base / '侧唛线描图.png'),
         }
     
     def _load_fonts(self):
         """加载字体路径"""
         font_base = self.base_dir / 'assets' / 'Barberpub' / '对开盖' / '箱唛字体'
         self.font_paths = {
-            'CentSchbook BT': str(font_base / '111.ttf'),
-            'Droid Sans Bold': str(font_base / 'CENSBKBI.ttf'),
-            'Calibri Bold': str(font_base / 'calibri_blod.TTF'),
+            'CentSchbook BT': asset_file(font_base / '111.ttf'),
+            'Droid Sans Bold': asset_file(font_base / 'CENSBKBI.ttf'),
+            'Calibri Bold': asset_file(font_base / 'calibri_blod.TTF'),
 
         }
 
     
+    @panel_depends_on('w_px', 'half_w_px')
+    def generate_blank_panel(self, sku_config):
+        """生成侧面顶/底盖的空白面板（只有背景色）"""
+        return Image.new(sku_config.color_mode, (sku_config.w_px, sku_config.half_w_px), sku_config.background_color)
+    
+    @panel_depends_on('l_px', 'half_w_px')
     def generate_barberpub_left_panel(self, sku_config):
         """生成 Barberpub 对开盖样式的左侧面板"""
         canvas = Image.new(sku_config.color_mode, (sku_config.l_px, sku_config.half_w_px), sku_config.background_color)
@@ -138,6 +145,7 @@ class BarberpubDoubleOpeningStyle(BoxMarkStyle):
         
         return canvas_left_up, canvas_left_down
         
+    @panel_depends_on('l_px', 'half_w_px')
     def generate_barberpub_right_panel(self, sku_config):
         """生成 Barberpub 对开盖样式的右侧面板"""
         canvas = Image.new(sku_config.color_mode, (sku_config.l_px, sku_config.half_w_px), sku_config.background_color)
@@ -154,35 +162,59 @@ class BarberpubDoubleOpeningStyle(BoxMarkStyle):
         
         return canvas_right_up, canvas_right_down
     
-    def generate_barberpub_front_panel(self, sku_config):
+    @static_layer('l_px', 'h_px')
+    def _front_panel_static(self, sku_config):
+        """正面面板的静态图层：背景、左上角 Logo、右上角公司信息和底部斜纹"""
         canvas = Image.new(sku_config.color_mode, (sku_config.l_px, sku_config.h_px), sku_config.background_color)
-        draw = ImageDraw.Draw(canvas)
         
         canvas_w, canvas_h = canvas.size
         
-        # 加载字体路径
-        font_path_centschbook = self.font_paths['CentSchbook BT']
-        font_path_droid = self.font_paths['Droid Sans Bold']
-        
         # --- 区域 A: 左上角 Logo ---
         margin_top_px = int(3 * sku_config.dpi)  # 顶部边距3cm
         margin_left_px = int(3 * sku_config.dpi)  # 左边距3cm
         margin_right_px = int(2.7 * sku_config.dpi)  # 右边距2.7cm
         
-        icon_logo = self.resources['icon_logo']
         icon_logo_h_px = int(canvas_h * 0.14)  # Logo高度约为画布高度的14%
-        icon_logo_resized = general_functions.scale_by_height(icon_logo, icon_logo_h_px)
+        icon_logo_resized = self.scaled_resource('icon_logo', height=icon_logo_h_px)
         icon_logo_x = margin_left_px
         icon_logo_y = margin_top_px
-        canvas.paste(icon_logo_resized, (icon_logo_x, icon_logo_y), mask=icon_logo_resized)
+        paste_asset(canvas, icon_logo_resized, (icon_logo_x, icon_logo_y))
         
         # --- 区域 B: 右上角公司信息 ---
-        icon_company = self.resources['icon_company']
         icon_company_h_px = int(canvas_h * 0.06)  # 公司信息高度约为画布高度的6%
-        icon_company_resized = general_functions.scale_by_height(icon_company, icon_company_h_px)
+        icon_company_resized = self.scaled_resource('icon_company', height=icon_company_h_px)
         icon_company_x = canvas_w - icon_company_resized.width - margin_right_px
         icon_company_y = margin_top_px
-        canvas.paste(icon_company_resized, (icon_company_x, icon_company_y), mask=icon_company_resized)
+        paste_asset(canvas, icon_company_resized, (icon_company_x, icon_company_y))
+        
+        # --- 区域 G: 底部斜纹条块 ---
+        stripe_height_cm = 1.2
+        bottom_margin_cm = 0.6
+        canvas = general_functions.draw_diagonal_stripes_tiled(
+            canvas, 
+            stripe_height_cm=stripe_height_cm,
+            dpi=sku_config.dpi,
+            bottom_margin_cm=bottom_margin_cm,
+            stripe_width_px=150,
+            stripe_color=(0, 0, 0),
+            bg_color=sku_config.background_color
+        )
+        return canvas
+    
+    @panel_depends_on('l_px', 'h_px', 'sku_name', 'color', 'product', 'box_number')
+    def generate_barberpub_front_panel(self, sku_config):
+        """生成 Barberpub 对开盖样式的正面面板（在静态图层上绘制产品名、标语、SKU、颜色和箱号）"""
+        canvas = self._front_panel_static(sku_config)
+        draw = ImageDraw.Draw(canvas)
+        
+        canvas_w, canvas_h = canvas.size
+        
+        # 加载字体路径
+        font_path_centschbook = self.font_paths['CentSchbook BT']
+        font_path_droid = self.font_paths['Droid Sans Bold']
+        
+        margin_left_px = int(3 * sku_config.dpi)  # 左边距3cm
+        margin_right_px = int(2.7 * sku_config.dpi)  # 右边距2.7cm
         
         # --- 区域 C: 中间 Product 名称和标语作为整体居中（稍微缩小）---
         product_text = sku_config.product
@@ -200,9 +232,8 @@ class BarberpubDoubleOpeningStyle(BoxMarkStyle):
         product_h = bbox[3] - bbox[1]
         
         # --- 区域 D: 标语（小字，斜体）---
-        icon_slogan = self.resources['icon_slogan']
         icon_slogan_h_px = int(canvas_h * 0.05)  # 稍微缩小到5%
-        icon_slogan_resized = general_functions.scale_by_height(icon_slogan, icon_slogan_h_px)
+        icon_slogan_resized = self.scaled_resource('icon_slogan', height=icon_slogan_h_px)
         
         # 计算Product和Slogan的整体高度
         vertical_gap = int(1.3 * sku_config.dpi)  # Product和Slogan之间间距1.3cm
@@ -219,25 +250,7 @@ class BarberpubDoubleOpeningStyle(BoxMarkStyle):
         # 粘贴Slogan（居中）
         icon_slogan_x = (canvas_w - icon_slogan_resized.width) // 2
         icon_slogan_y = product_y + product_h + vertical_gap
-        canvas.paste(icon_slogan_resized, (icon_slogan_x, icon_slogan_y), mask=icon_slogan_resized)
-        
-        # --- 区域 G: 底部斜纹条块（先绘制，避免遮盖文字）---
-        stripe_height_cm = 1.2
-        bottom_margin_cm = 0.6
-        stripe_y_start = canvas_h - int(stripe_height_cm * sku_config.dpi) - int(bottom_margin_cm * sku_config.dpi)
-        stripe_y_end = canvas_h - int(bottom_margin_cm * sku_config.dpi)
-
-        
-        canvas = general_functions.draw_diagonal_stripes(
-            canvas, 
-            stripe_height_cm=stripe_height_cm,
-            dpi=sku_config.dpi,
-            bottom_margin_cm=bottom_margin_cm,
-            stripe_width_px=150,
-            stripe_color=(0, 0, 0),
-            bg_color=sku_config.background_color
-        )
-        draw = ImageDraw.Draw(canvas)  # 重新创建draw对象，因为canvas被更新了
+        LayerCompositor().add(icon_slogan_resized, (icon_slogan_x, icon_slogan_y), shared=True).composite(canvas)
         
         # --- 区域 E: 左下角颜色和SKU代码 ---
         margin_bottom_px = int(3.2 * sku_config.dpi)  # 底部边距3.2cm（增大，确保文字在斜纹上方）
@@ -292,8 +305,8 @@ class BarberpubDoubleOpeningStyle(BoxMarkStyle):
         box_text_pos = (bbox_text_x, bbox_text_y)
         
         # 绘制黑框背景
-        draw = general_functions.draw_rounded_bg_for_text(
-            draw, bbox_box_text, sku_config, box_text_pos,
+        draw = general_functions.draw_rounded_bg_for_text_smooth(
+            draw, canvas, bbox_box_text, sku_config, box_text_pos,
             bg_color=(0, 0, 0), padding_cm=(0.5, 0.7), radius=12
         )
         
@@ -303,40 +316,34 @@ class BarberpubDoubleOpeningStyle(BoxMarkStyle):
         canvas_front = canvas
         return canvas_front
     
-    def generate_barberpub_side_panel(self, sku_config):
+    @static_layer('w_px', 'h_px', 'l_cm', 'w_cm', 'h_cm')
+    def _side_panel_static(self, sku_config):
         """
-        生成 Barberpub 对开盖样式的侧面板
-        在这里分成了两种情况：宽侧唛和窄侧唛，根据箱子宽度决定使用哪种侧唛
-            
+        侧面板的静态图层：网址和线描图，宽侧唛还包括底部斜纹条块；
+        窄侧唛的斜纹条块要盖在 SKU 文字之上，和下方标签一起在动态图层中绘制
         """
         canvas = Image.new(sku_config.color_mode, (sku_config.w_px, sku_config.h_px), sku_config.background_color)
-        draw = ImageDraw.Draw(canvas)
-        
+
         canvas_w, canvas_h = canvas.size
-        
+
         # 加载字体路径
         font_path_centschbook = self.font_paths['CentSchbook BT']
-        
+
         # --- 区域 A: 侧唛网址 ---
         """ 两种情况下都放置侧唛网址，位置和大小相同 """
-        icon_webside = self.resources['icon_webside']
         icon_webside_w_px = int(canvas_w * 0.5)  # 宽度为画布宽度的50%
-        icon_webside_resized = general_functions.scale_by_width(icon_webside, icon_webside_w_px)
+        icon_webside_resized = self.scaled_resource('icon_webside', width=icon_webside_w_px)
         icon_webside_x = (canvas_w - icon_webside_resized.width) // 2
         icon_webside_y = int(3 * sku_config.dpi)  # 顶部边距3cm
-        canvas.paste(icon_webside_resized, (icon_webside_x, icon_webside_y), mask=icon_webside_resized)
+        paste_asset(canvas, icon_webside_resized, (icon_webside_x, icon_webside_y))
 
         if sku_config.w_cm > sku_config.h_cm :
-            """
-            【宽侧唛的设计标准】对开盖侧唛分为两种：当侧唛的高小于等于宽10cm时，侧唛为左右结构，即分割条在底部。
-            """
-            
             # --- 区域 A: 底部斜纹条块（先绘制，避免遮盖文字）---
             stripe_height_cm = 1.2
             bottom_margin_cm = 0.6
-            
-            canvas = general_functions.draw_diagonal_stripes(
-                canvas, 
+
+            canvas = general_functions.draw_diagonal_stripes_tiled(
+                canvas,
                 stripe_height_cm=stripe_height_cm,
                 dpi=sku_config.dpi,
                 bottom_margin_cm=bottom_margin_cm,
@@ -344,17 +351,89 @@ class BarberpubDoubleOpeningStyle(BoxMarkStyle):
                 stripe_color=(0, 0, 0),
                 bg_color=sku_config.background_color
             )
-            draw = ImageDraw.Draw(canvas)  # 重新创建draw对象，因为canvas被更新了
-            
+
             # --- 区域 B: 线描图 (居左，高度为侧唛 2/3) ---
-            img_line_drawing = self.resources['img_line_drawing']
             line_h = int(canvas_h * 0.66) # 侧唛的三分之二
-            img_line_resized = general_functions.scale_by_height(img_line_drawing, line_h)
+            img_line_resized = self.scaled_resource('img_line_drawing', height=line_h)
             # 居左粘贴，留出 margin
             img_line_drawing_x = int(5 * sku_config.dpi)  # 左边距5cm
             img_line_drawing_y = (canvas_h - line_h) // 2 + int( 0.05 * sku_config.h_px) # 纵向微调，稍微下移0.05倍高度
-            canvas.paste(img_line_resized, (img_line_drawing_x, img_line_drawing_y), mask=img_line_resized)
-            
+            paste_asset(canvas, img_line_resized, (img_line_drawing_x, img_line_drawing_y))
+            return canvas
+
+        # --- 区域 B: 线描图（在网址下方间隔3cm，高度为canvas_h的46%）---
+        line_h = int(canvas_h * 0.46)  # 高度为画布高度的46%
+        img_line_resized = self.scaled_resource('img_line_drawing', height=line_h)
+
+        # 线描图位置（网址下方间隔3cm，水平居中）
+        img_line_x = (canvas_w - img_line_resized.width) // 2
+        img_line_y = icon_webside_y + icon_webside_resized.height + int(3 * sku_config.dpi)  # 间隔3cm
+        paste_asset(canvas, img_line_resized, (img_line_x, img_line_y))
+
+        return canvas
+
+    def _side_narrow_info_layout(self, sku_config, draw):
+        """窄侧唛底部 G.W./N.W. 信息区的字体和位置"""
+        canvas_w, canvas_h = sku_config.w_px, sku_config.h_px
+        font_path_centschbook = self.font_paths['CentSchbook BT']
+        bottom_margin_px = int(canvas_h * 0.21)
+
+        # 设置左侧信息区域的起始位置
+        info_start_x = int(canvas_w * 0.0987)  # 从canvas_w的9.87%处开始
+        info_center_y = canvas_h - int(bottom_margin_px // 2)  # 斜纹条下方区域的垂直中心
+
+        # --- 统一字体设置 ---
+        label_font_size = int(canvas_h * 0.028)  # 标签文字字号（G.W./N.W. 和 BOX SIZE）
+        value_font_size = int(canvas_h * 0.024)  # 值文字字号（比标签文字小一点）
+        label_font = ImageFont.truetype(font_path_centschbook, label_font_size)
+        value_font = ImageFont.truetype(font_path_centschbook, value_font_size)
+
+        # 上下间隔2cm
+        vertical_gap = int(2.6 * sku_config.dpi)
+
+        # 计算G.W./N.W.标签的边界框
+        bbox_gw_label = draw.textbbox((0, 0), "G.W./N.W.", font=label_font)
+        gw_label_w = bbox_gw_label[2] - bbox_gw_label[0]
+        gw_label_h = bbox_gw_label[3] - bbox_gw_label[1]
+
+        # G.W./N.W.标签位置（上方，文字底部距虚线 vertical_gap // 2）
+        gw_label_x = info_start_x
+        gw_label_y = info_center_y - vertical_gap // 2 - gw_label_h * 1.3 # 上移1.3倍高度以增加间距
+
+        return {
+            'info_start_x': info_start_x,
+            'info_center_y': info_center_y,
+            'vertical_gap': vertical_gap,
+            'label_font': label_font,
+            'value_font': value_font,
+            'bbox_gw_label': bbox_gw_label,
+            'gw_label_pos': (gw_label_x, gw_label_y),
+            'gw_label_center_y': gw_label_y + gw_label_h // 2,
+            # G.W./N.W.值位置（标签右边间隔2cm）
+            'gw_value_x': gw_label_x + gw_label_w + int(2 * sku_config.dpi),
+        }
+
+    @panel_depends_on('w_px', 'h_px', 'l_cm', 'w_cm', 'h_cm', 'sku_name', 'color', 'box_number', 'side_text')
+    def generate_barberpub_side_panel(self, sku_config):
+        """
+        生成 Barberpub 对开盖样式的侧面板
+        在这里分成了两种情况：宽侧唛和窄侧唛，根据箱子宽度决定使用哪种侧唛
+        网址、线描图（以及宽侧唛的斜纹）来自静态图层，其余内容按原有顺序在这里绘制
+
+        """
+        canvas = self._side_panel_static(sku_config)
+        draw = ImageDraw.Draw(canvas)
+
+        canvas_w, canvas_h = canvas.size
+
+        # 加载字体路径
+        font_path_centschbook = self.font_paths['CentSchbook BT']
+
+        if sku_config.w_cm > sku_config.h_cm :
+            """
+            【宽侧唛的设计标准】对开盖侧唛分为两种：当侧唛的高小于等于宽10cm时，侧唛为左右结构，即分割条在底部。
+            """
+
             # --- 区域 C: 右侧 SKU 文字 ---
             sku_text = sku_config.sku_name
             # 放在右侧中间偏上
@@ -369,7 +448,7 @@ class BarberpubDoubleOpeningStyle(BoxMarkStyle):
             bbox_sku_x = int(canvas_w * 0.38) # 右侧偏左一些
             bbox_sku_y = int(canvas_h * 0.38) # 纵向偏上一些
             draw.text((bbox_sku_x, bbox_sku_y), sku_text, font=sku_font, fill=(0,0,0))
-            
+
             # --- 区域 D: 中间右侧颜色信息 ---
             color_text = f"{sku_config.color.upper()}"
             # 放在右侧中间,在箱号信息的后边
@@ -381,7 +460,7 @@ class BarberpubDoubleOpeningStyle(BoxMarkStyle):
             bbox_color_x = bbox_sku_x + bbox_sku_w - bbox_color_w - int(0.3 * sku_config.dpi) # 王回收1cm
             bbox_color_y = bbox_sku_y + bbox_sku_h + int(2.6 * sku_config.dpi) # 纵向间距2cm
             draw.text((bbox_color_x, bbox_color_y), color_text, font=color_font, fill=(0,0,0))
-            
+
             # --- 区域 E: 中间右侧箱号信息（黑框文字）---
             box_text = f"BOX {sku_config.box_number['current_box']} OF {sku_config.box_number['total_boxes']}"
             box_text_font_h = int(canvas_h * 0.038)  # 字体大小为画布高度的3.8%
@@ -389,86 +468,80 @@ class BarberpubDoubleOpeningStyle(BoxMarkStyle):
             box_text_font_size = general_functions.get_max_font_size(
                 box_text, font_path_centschbook, box_text_font_w, max_height=box_text_font_h)
             box_text_font = ImageFont.truetype(font_path_centschbook, box_text_font_size)
-            
+
             # 计算文字尺寸
             bbox_box_text = draw.textbbox((0, 0), box_text, font=box_text_font)
             bbox_box_text_w = bbox_box_text[2] - bbox_box_text[0]
             bbox_box_text_h = bbox_box_text[3] - bbox_box_text[1]
-            
+
             # 箱号位置（SKU代码的下方）
             bbox_text_x = bbox_color_x - bbox_box_text_w  - int( 1.5 * sku_config.dpi) # 左移2cm
             bbox_text_y = bbox_sku_y + bbox_sku_h + int(2.6 * sku_config.dpi)  + int( (bbox_color_h - bbox_box_text_h ) / 3) # 纵向间距3cm
             box_text_pos = (bbox_text_x, bbox_text_y)
-            
+
             # 绘制黑框背景
-            draw = general_functions.draw_rounded_bg_for_text(
-                draw, bbox_box_text, sku_config, box_text_pos,
+            draw = general_functions.draw_rounded_bg_for_text_smooth(
+                draw, canvas, bbox_box_text, sku_config, box_text_pos,
                 bg_color=(0, 0, 0), padding_cm=(0.5, 0.7), radius=12
             )
-            
+
             # 绘制白色文字
             draw.text(box_text_pos, box_text, font=box_text_font, fill=sku_config.background_color)
-            
+
             # --- 区域 F: 右下侧标签框---
             # 使用宽侧唛
             icon_side_label = self.resources['icon_side_label_wide']
-            
+
             # 调整标签大小
             label_w_target = int(bbox_sku_w * 0.93)  # 标签宽度为SKU文字的93%
-            
+
             # 填充标签内容
             icon_side_label_filled = self.fill_side_wide_label_barberpub_doubleopening(sku_config, icon_side_label, self.font_paths)
             icon_side_label_filled_resized = general_functions.scale_by_width(icon_side_label_filled, label_w_target)
-            
+
             # 标签位置（底部中央，斜纹条上方）
             label_x = bbox_sku_x + int(bbox_sku_w * 0.07)
-            label_y = bbox_text_y + bbox_box_text_h + int( canvas_h * 0.14)  
+            label_y = bbox_text_y + bbox_box_text_h + int( canvas_h * 0.14)
             canvas.paste(icon_side_label_filled_resized, (label_x, label_y), icon_side_label_filled_resized)
-            
+
 
         else:
             """
             【窄侧唛的设计标准】对开盖侧唛分为两种：当侧唛的高大于等于宽10cm，侧唛为上下结构，即分割条在尺寸重量标签之上，
             """
-            
-            # --- 区域 B: 线描图（在网址下方间隔3cm，高度为canvas_h的46%）---
-            img_line_drawing = self.resources['img_line_drawing']
-            line_h = int(canvas_h * 0.46)  # 高度为画布高度的46%
-            img_line_resized = general_functions.scale_by_height(img_line_drawing, line_h)
-            
-            # 线描图位置（网址下方间隔3cm，水平居中）
-            img_line_x = (canvas_w - img_line_resized.width) // 2
-            img_line_y = icon_webside_y + icon_webside_resized.height + int(3 * sku_config.dpi)  # 间隔3cm
-            canvas.paste(img_line_resized, (img_line_x, img_line_y), mask=img_line_resized)
-            
+
             # --- 区域 C: SKU文字（在线描图下方间隔3cm）---
             sku_text = sku_config.sku_name
-            
-            # SKU文字位置（线描图下方间隔3cm）
+
+            # SKU文字位置（网址下方间隔3cm的线描图，再往下间隔3cm）
+            icon_webside_resized = self.scaled_resource('icon_webside', width=int(canvas_w * 0.5))
+            img_line_resized = self.scaled_resource('img_line_drawing', height=int(canvas_h * 0.46))
+            icon_webside_y = int(3 * sku_config.dpi)  # 顶部边距3cm
+            img_line_y = icon_webside_y + icon_webside_resized.height + int(3 * sku_config.dpi)  # 间隔3cm
             sku_text_y = img_line_y + img_line_resized.height + int(3 * sku_config.dpi)  # 间隔3cm
-            
+
             # 最大字号：画布宽度的90%
             max_sku_w = int(canvas_w * 0.9)
             max_sku_h = int(canvas_h * 0.12)  # 限制高度为画布高度的12%
-            
+
             sku_font_size = general_functions.get_max_font_size(
                 sku_text, font_path_centschbook, max_sku_w, max_height=max_sku_h
             )
             sku_font = ImageFont.truetype(font_path_centschbook, sku_font_size)
-            
+
             # 计算SKU文字宽度并居中
             sku_text_w = draw.textlength(sku_text, font=sku_font)
             sku_text_x = (canvas_w - sku_text_w) // 2
             draw.text((sku_text_x, sku_text_y), sku_text, font=sku_font, fill=(0, 0, 0))
-            
+
             # --- 区域 D: 斜纹条块 ---
             stripe_height_cm = 1.2
             # 下边界距离canvas底是canvas_h的21%
             bottom_margin_px = int(canvas_h * 0.21)
             bottom_margin_cm = bottom_margin_px / sku_config.dpi
-            
-            canvas = general_functions.draw_diagonal_stripes(
-                canvas, 
+
+            canvas = general_functions.draw_diagonal_stripes_tiled(
+                canvas,
                 stripe_height_cm=stripe_height_cm,
                 dpi=sku_config.dpi,
                 bottom_margin_cm=bottom_margin_cm,
@@ -476,122 +549,90 @@ class BarberpubDoubleOpeningStyle(BoxMarkStyle):
                 stripe_color=(0, 0, 0),
                 bg_color=sku_config.background_color
             )
-            draw = ImageDraw.Draw(canvas)  # 重新创建draw对象
-            canvas_w, canvas_h = canvas.size  # 更新尺寸变量
-            
+            draw = ImageDraw.Draw(canvas)
+
             # --- 区域 E: 侧唛标签（右下方，斜纹条块下方）---
-            icon_side_label = self.resources['icon_side_label_narrow']
-            
+            bottom_margin_px = int(canvas_h * 0.21)
+
             # 调整标签大小（占画布宽度的85%）
             label_h_target = int(canvas_w * 0.15)
-            icon_side_label_resized = general_functions.scale_by_height(icon_side_label, label_h_target)
-            
+            # 填充标签会直接在图上绘制，所以复制缓存的缩放结果
+            icon_side_label_resized = self.scaled_resource('icon_side_label_narrow', height=label_h_target).copy()
+
             # 填充标签内容
             icon_side_label_filled_resized = self.fill_side_narrow_label_barberpub_doubleopening(sku_config, icon_side_label_resized, self.font_paths)
-            
+
             # 标签位置（右下方，在斜纹条下方）
             label_x = canvas_w //2 + int( (canvas_w // 2 - icon_side_label_filled_resized.width) //2 )
             label_y = canvas_h - bottom_margin_px + int((bottom_margin_px - icon_side_label_filled_resized.height ) //2 )
             canvas.paste(icon_side_label_filled_resized, (label_x, label_y), icon_side_label_filled_resized)
-            
-            # --- 区域 F: 净重毛重信息（左下方，斜纹条块下方）---
-            
-            # 设置左侧信息区域的起始位置
-            info_start_x = int(canvas_w * 0.0987)  # 从canvas_w的9.87%处开始
-            info_center_y = canvas_h - int(bottom_margin_px // 2)  # 斜纹条下方区域的垂直中心
-            
-            # --- 统一字体设置 ---
-            label_font_size = int(canvas_h * 0.028)  # 标签文字字号（G.W./N.W. 和 BOX SIZE）
-            value_font_size = int(canvas_h * 0.024)  # 值文字字号（比标签文字小一点）
-            label_font = ImageFont.truetype(font_path_centschbook, label_font_size)
-            value_font = ImageFont.truetype(font_path_centschbook, value_font_size)
-            
-            # 上下间隔2cm
-            vertical_gap = int(2.6 * sku_config.dpi)
-            
-            # --- G.W./N.W. 标签和值 ---
-            gw_label_text = "G.W./N.W."
-            gw_value_text = f"{sku_config.side_text['gw_value']} / {sku_config.side_text['nw_value']} LBS"
-            
-            # 计算G.W./N.W.标签的边界框
-            bbox_gw_label = draw.textbbox((0, 0), gw_label_text, font=label_font)
-            gw_label_w = bbox_gw_label[2] - bbox_gw_label[0]
-            gw_label_h = bbox_gw_label[3] - bbox_gw_label[1]
-            
-            # G.W./N.W.标签位置（上方，文字底部距虚线 vertical_gap // 2）
-            gw_label_x = info_start_x 
-            gw_label_y = info_center_y - vertical_gap // 2 - gw_label_h * 1.3 # 上移1.3倍高度以增加间距
-            gw_label_pos = (gw_label_x, gw_label_y)
-            
-            # 绘制G.W./N.W.标签黑色圆角背景
-            draw = general_functions.draw_rounded_bg_for_text(
-                draw, bbox_gw_label, sku_config, gw_label_pos,
+
+            # --- 区域 F: 净重毛重和箱子尺寸的标签（左下方，斜纹条块下方）---
+            layout = self._side_narrow_info_layout(sku_config, draw)
+            label_font = layout['label_font']
+            value_font = layout['value_font']
+
+            # 绘制G.W./N.W.标签黑色圆角背景和文字
+            draw = general_functions.draw_rounded_bg_for_text_smooth(
+                draw, canvas, layout['bbox_gw_label'], sku_config, layout['gw_label_pos'],
                 bg_color=(0, 0, 0), padding_cm=(0.3, 0.7), radius=16
             )
-            
-            # 绘制G.W./N.W.标签文字
-            draw.text(gw_label_pos, gw_label_text, font=label_font, fill=sku_config.background_color)
-            
-            # G.W./N.W.值位置（标签右边间隔2cm，文字中心与G.W./N.W.文字中心对齐）
-            gw_value_x = gw_label_x + gw_label_w + int(2 * sku_config.dpi)
-            
+            draw.text(layout['gw_label_pos'], "G.W./N.W.", font=label_font, fill=sku_config.background_color)
+
+            # G.W./N.W.值（标签右边，文字中心与标签文字中心对齐）
+            gw_value_text = f"{sku_config.side_text['gw_value']} / {sku_config.side_text['nw_value']} LBS"
+
             # 计算G.W./N.W.值的边界框以获取高度
-            bbox_gw_value = draw.textbbox((0, 0), gw_value_text, font=value_font)
+            bbox_gw_value = draw.textbbox((0, 0), gw_value_text, font=layout['value_font'])
             gw_value_h = bbox_gw_value[3] - bbox_gw_value[1]
-            
+
             # 使值文字中心与标签文字中心在同一水平线上
-            gw_label_center_y = gw_label_y + gw_label_h // 2
-            gw_value_y = gw_label_center_y - gw_value_h // 2
-            draw.text((gw_value_x, gw_value_y), gw_value_text, font=value_font, fill=(0, 0, 0))
-            
+            gw_value_y = layout['gw_label_center_y'] - gw_value_h // 2
+            draw.text((layout['gw_value_x'], gw_value_y), gw_value_text, font=layout['value_font'], fill=(0, 0, 0))
+
             # --- BOX SIZE 标签和值 ---
             box_label_text = "BOX SIZE"
             box_value_text = f"{sku_config.l_cm:.1f}\" x {sku_config.w_cm:.1f}\" x {sku_config.h_cm:.1f}\""
-            
+
             # 计算BOX SIZE标签的边界框
             bbox_box_label = draw.textbbox((0, 0), box_label_text, font=label_font)
-            box_label_w = bbox_box_label[2] - bbox_box_label[0]
             box_label_h = bbox_box_label[3] - bbox_box_label[1]
-            
+
             # BOX SIZE标签位置（下方，文字顶部距虚线 vertical_gap // 2）
-            box_label_x = info_start_x
-            box_label_y = info_center_y + vertical_gap // 2
+            box_label_x = layout['info_start_x']
+            box_label_y = layout['info_center_y'] + layout['vertical_gap'] // 2
             box_label_pos = (box_label_x, box_label_y)
-            
+
             # 绘制BOX SIZE标签黑色圆角背景
-            draw = general_functions.draw_rounded_bg_for_text(
-                draw, bbox_box_label, sku_config, box_label_pos,
+            draw = general_functions.draw_rounded_bg_for_text_smooth(
+                draw, canvas, bbox_box_label, sku_config, box_label_pos,
                 bg_color=(0, 0, 0), padding_cm=(0.3, 0.7), radius=16
             )
             # 绘制BOX SIZE标签文字
             draw.text(box_label_pos, box_label_text, font=label_font, fill=sku_config.background_color)
-            
-            # BOX SIZE值位置（标签右边间隔2cm，文字中心与BOX SIZE文字中心对齐）
-            box_value_x = gw_value_x  # 与G.W./N.W.值对齐
-            
+
+            # BOX SIZE值位置（与G.W./N.W.值对齐，文字中心与BOX SIZE文字中心对齐）
+            box_value_x = layout['gw_value_x']
+
             # 计算BOX SIZE值的边界框以获取高度
             bbox_box_value = draw.textbbox((0, 0), box_value_text, font=value_font)
             box_value_h = bbox_box_value[3] - bbox_box_value[1]
-            
+
             # 使值文字中心与标签文字中心在同一水平线上
             box_label_center_y = box_label_y + box_label_h // 2
             box_value_y = box_label_center_y - box_value_h // 2
             draw.text((box_value_x, box_value_y), box_value_text, font=value_font, fill=(0, 0, 0))
-            
+
             # --- 绘制虚线（在G.W./N.W.和BOX SIZE之间）---
             dash_x_start = int(canvas_w * 0.101)  # 虚线起始位置
             dash_length = int(canvas_w * 0.44)  # 虚线长度约44%
-            dash_y = info_center_y  # 虚线Y坐标（两行文字中间）
-            
-            # 绘制虚线
-            dash_width = 10  # 每段虚线的宽度
-            dash_gap = 12  # 虚线间隔
-            current_x = dash_x_start
-            while current_x < dash_x_start + dash_length:
-                draw.line([(current_x, dash_y), (current_x + dash_width, dash_y)], fill=(0, 0, 0), width=3)
-                current_x += dash_width + dash_gap
-            
-        
+            dash_y = layout['info_center_y']  # 虚线Y坐标（两行文字中间）
+
+            # 绘制虚线（线段 0.09cm、间隙 0.1cm、线宽 0.025cm，300 PPI 下约为 11 / 12 / 3 像素）
+            general_functions.draw_dashed_hline(
+                canvas, dash_x_start, dash_x_start + dash_length, dash_y, sku_config.dpi,
+                dash_cm=0.09, gap_cm=0.1, width_cm=0.025, fill=(0, 0, 0))
+
         canvas_side = canvas
         return canvas_side
     
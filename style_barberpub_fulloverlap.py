@@ -3,8 +3,9 @@
 Barberpub 全搭盖样式 - 将原有的 BoxMarkEngine 转换为样式类
 """
 from PIL import Image, ImageDraw, ImageFont
-import pathlib as Path
-from style_base import BoxMarkStyle, StyleRegistry
+from style_base import BoxMarkStyle, StyleRegistry, panel_depends_on, static_layer
+from layer_compositor import LayerCompositor
+from asset_preprocessing import paste_asset, open_asset, asset_file
 import general_functions
 
 
@@ -79,7 +80,7 @@ class BarberpubFullOverlapStyle(BoxMarkStyle):
         canvas_front = self.generate_barberpub_front_panel(sku_config)
         canvas_side = self.generate_barberpub_side_panel(sku_config)
         canvas_left_up, canvas_left_down, canvas_right_up, canvas_right_down = self.generate_barberpub_left_panel(sku_config)
-        canvas_blank = Image.new(sku_config.color_mode, (sku_config.w_px, sku_config.w_px), sku_config.background_color)
+        canvas_blank = self.generate_blank_panel(sku_config)
 
 
         return {
@@ -98,27 +99,106 @@ class BarberpubFullOverlapStyle(BoxMarkStyle):
         res_base = self.base_dir / 'assets' / 'Barberpub' / '全搭盖' / '矢量文件'
         
         self.resources = {
-            'icon_logo': Image.open(res_base / '正唛logo.png').convert('RGBA'),
-            'icon_top_logo': Image.open(res_base / '顶盖logo信息.png').convert('RGBA'),
-            'icon_attention_info': Image.open(res_base / '全搭盖开箱注意事项.png').convert('RGBA'),
-            'icon_company': Image.open(res_base / '正唛公司信息.png').convert('RGBA'),
-            'icon_webside': Image.open(res_base / '侧唛网址.png').convert('RGBA'),
-            'icon_side_label': Image.open(res_base / '侧唛标签_窄.png').convert('RGBA'),
-            'icon_slogan': Image.open(res_base / '正唛宣传语.png').convert('RGBA'),
-            'icon_box_info': Image.open(res_base / '正唛多箱选择框.png').convert('RGBA'),
+            'icon_logo': open_asset(res_base / '正唛logo.png'),
+            'icon_top_logo': open_asset(res_base / '顶盖logo信息.png'),
+            'icon_attention_info': open_asset(res_base / '全搭盖开箱注意事项.png'),
+            'icon_company': open_asset(res_base / '正唛公司信息.png'),
+            'icon_webside': open_asset(res_base / '侧唛网址.png'),
+            'icon_side_label': open_asset(res_base / '侧唛标签_窄.png'),
+            'icon_slogan': open_asset(res_base / '正唛宣传语.png'),
+            'icon_box_info': open_asset(res_base / '正唛多箱选择框.png'),
         }
     
     def _load_fonts(self):
         """加载字体路径"""
         font_base = self.base_dir / 'assets' / 'Barberpub' / '全搭盖' / '箱唛字体'
         self.font_paths = {
-            'CentSchbook BT': str(font_base / '111.ttf'),
-            'Droid Sans Bold': str(font_base / 'CENSBKBI.ttf'),
-            'Calibri Bold': str(font_base / 'calibri_blod.TTF'),
+            'CentSchbook BT': asset_file(font_base / '111.ttf'),
+            'Droid Sans Bold': asset_file(font_base / 'CENSBKBI.ttf'),
+            'Calibri Bold': asset_file(font_base / 'calibri_blod.TTF'),
 
         }
 
     
+    @panel_depends_on('w_px')
+    def generate_blank_panel(self, sku_config):
+        """生成侧面顶/底盖的空白面板（只有背景色）"""
+        return Image.new(sku_config.color_mode, (sku_config.w_px, sku_config.w_px), sku_config.background_color)
+    
+    def _left_panel_attention(self, sku_config):
+        """顶部注意事项图标（宽度占画布95%，顶部边距为图标自身高度的50%），返回缩放后的图片和位置"""
+        icon_attention = self.resources.get('icon_attention_info')
+        if not icon_attention:
+            return None, None
+        canvas_w = sku_config.l_px
+        attention_w = int(canvas_w * 0.95)  # 图标宽度占画布95%
+        attention_resized = self.scaled_resource('icon_attention_info', width=attention_w)
+        attention_h = attention_resized.height
+        
+        # 设置顶部边距：图标自身高度的50%
+        attention_margin_top = int(attention_h * 0.50)
+        attention_x = (canvas_w - attention_w) // 2  # 水平居中
+        attention_y = attention_margin_top
+        return attention_resized, (attention_x, attention_y)
+    
+    def _left_panel_wide_layout(self, sku_config):
+        """上下结构：返回注意事项底部位置、缩放后的 Logo 和 Logo 的 y 坐标"""
+        canvas_h = sku_config.w_px
+        attention_resized, attention_pos = self._left_panel_attention(sku_config)
+        if attention_resized:
+            # 记录注意事项底部位置，用于后续元素定位
+            attention_bottom_y = attention_pos[1] + attention_resized.height
+        else:
+            attention_bottom_y = 0
+        
+        # 显示公司Logo，位于注意事项下方
+        icon_logo_h_px = int(canvas_h * 0.16)  # Logo高度为画布高度的16%
+        icon_logo_resized = self.scaled_resource('icon_logo', height=icon_logo_h_px)
+        logo_y = attention_bottom_y + int(3 * sku_config.dpi)  # 与注意事项间隔3cm
+        return attention_bottom_y, icon_logo_resized, logo_y
+    
+    def _left_panel_narrow_content_start_y(self, sku_config):
+        """左右结构：注意事项下方内容区域的起始 y 坐标"""
+        attention_resized, attention_pos = self._left_panel_attention(sku_config)
+        if attention_resized:
+            return attention_pos[1] + attention_resized.height + int(1.5 * sku_config.dpi)  # 与注意事项间隔1.5cm
+        return int(sku_config.w_px * 0.15)
+    
+    @static_layer('l_px', 'w_px', 'w_cm')
+    def _left_panel_static(self, sku_config):
+        """左上面板的静态图层：顶部注意事项和 Logo（两种布局的 Logo 位置不同）"""
+        canvas = Image.new(sku_config.color_mode, (sku_config.l_px, sku_config.w_px), sku_config.background_color)
+        canvas_w, canvas_h = canvas.size
+        
+        # --- 区域 A: 顶部注意事项信息 ---
+        attention_resized, attention_pos = self._left_panel_attention(sku_config)
+        if attention_resized:
+            paste_asset(canvas, attention_resized, attention_pos)
+        
+        if sku_config.w_cm > 30:
+            # --- 区域 B: Logo（与注意事项间隔3cm，水平居中）---
+            _, icon_logo_resized, logo_y = self._left_panel_wide_layout(sku_config)
+            logo_x = (canvas_w - icon_logo_resized.width) // 2  # 水平居中
+            paste_asset(canvas, icon_logo_resized, (logo_x, logo_y))
+        else:
+            # ========== 左侧区域：Logo ==========
+            content_start_y = self._left_panel_narrow_content_start_y(sku_config)
+            left_area_w = int(canvas_w * 0.25)  # 左侧Logo区域占25%
+            # 可用高度（去除顶部注意事项区域）
+            available_h = canvas_h - content_start_y
+            
+            # Logo高度为可用高度的40%
+            icon_logo_h = int(available_h * 0.40)
+            icon_logo_resized = self.scaled_resource('icon_logo', height=icon_logo_h)
+            
+            # Logo在左侧区域内居中（垂直方向在可用区域内居中）
+            logo_x = (left_area_w - icon_logo_resized.width) // 2
+            logo_y = content_start_y + (available_h - icon_logo_resized.height) // 2
+            paste_asset(canvas, icon_logo_resized, (logo_x, logo_y))
+        
+        return canvas
+    
+    @panel_depends_on('l_px', 'w_px', 'l_cm', 'w_cm', 'h_cm', 'sku_name', 'side_text.gw_value', 'side_text.nw_value')
     def generate_barberpub_left_panel(self, sku_config):
         """
         生成 Barberpub 全搭盖样式的左侧面板
@@ -127,15 +207,14 @@ class BarberpubFullOverlapStyle(BoxMarkStyle):
         - 宽度 > 30cm：使用上下结构（顶部注意事项、Logo、SKU、虚线、底部信息框）
         - 宽度 ≤ 30cm：使用简单结构（仅居中Logo）
         """
-        # 创建空白画布，尺寸为箱子的长×宽
+        # 静态图层：注意事项和 Logo，其余内容随 SKU 变化
         canvas = Image.new(sku_config.color_mode, (sku_config.l_px, sku_config.w_px), sku_config.background_color)
         canvas_w, canvas_h = canvas.size
         
         # 准备四个面板（左上、左下、右上、右下）
-        canvas_left_up = canvas.copy()
+        canvas_left_up = self._left_panel_static(sku_config)
         canvas_left_down = canvas.copy()
         canvas_right_up = canvas.copy()
-        icon_top_logo = self.resources['icon_top_logo']
         
         # 根据箱子宽度决定使用哪种布局结构
         if sku_config.w_cm > 30:
@@ -144,34 +223,8 @@ class BarberpubFullOverlapStyle(BoxMarkStyle):
             draw = ImageDraw.Draw(canvas_left_up)
             font_path_centschbook = self.font_paths['CentSchbook BT']
             
-            # --- 区域 A: 顶部注意事项信息 ---
-            # 显示开箱注意事项图标，位于顶部
-            icon_attention = self.resources.get('icon_attention_info')
-            if icon_attention:
-                attention_w = int(canvas_w * 0.95)  # 图标宽度占画布95%
-                attention_resized = general_functions.scale_by_width(icon_attention, attention_w)
-                attention_h = attention_resized.height
-                
-                # 设置顶部边距：图标自身高度的50%
-                attention_margin_top = int(attention_h * 0.50)
-                attention_x = (canvas_w - attention_w) // 2  # 水平居中
-                attention_y = attention_margin_top
-                canvas_left_up.paste(attention_resized, (attention_x, attention_y), mask=attention_resized)
-                
-                # 记录注意事项底部位置，用于后续元素定位
-                attention_bottom_y = attention_y + attention_h
-            else:
-                attention_bottom_y = 0
-            
-            # --- 区域 B: Logo（与注意事项间隔3cm）---
-            # 显示公司Logo，位于注意事项下方
-            icon_logo = self.resources['icon_logo']
-            icon_logo_h_px = int(canvas_h * 0.16)  # Logo高度为画布高度的16%
-            icon_logo_resized = general_functions.scale_by_height(icon_logo, icon_logo_h_px)
-            
-            logo_y = attention_bottom_y + int(3 * sku_config.dpi)  # 与注意事项间隔3cm
-            logo_x = (canvas_w - icon_logo_resized.width) // 2  # 水平居中
-            canvas_left_up.paste(icon_logo_resized, (logo_x, logo_y), mask=icon_logo_resized)
+            # --- 区域 A/B: 注意事项和 Logo 已在静态图层中，这里只计算位置 ---
+            attention_bottom_y, icon_logo_resized, logo_y = self._left_panel_wide_layout(sku_config)
             
             # 记录Logo底部位置
             logo_bottom_y = logo_y + icon_logo_resized.height
@@ -215,17 +268,10 @@ class BarberpubFullOverlapStyle(BoxMarkStyle):
             dashed_line_x_start = sku_x  # 与SKU文字左对齐
             dashed_line_x_end = sku_x + sku_w  # 与SKU文字右对齐
             
-            # 虚线样式参数
-            dash_length = 20  # 每段虚线长度（像素）
-            gap_length = 15   # 虚线间隙长度（像素）
-            line_width = 3    # 虚线粗细（像素）
-            
-            # 绘制虚线
-            current_x = dashed_line_x_start
-            while current_x < dashed_line_x_end:
-                next_x = min(current_x + dash_length, dashed_line_x_end)
-                draw.line([(current_x, dashed_line_y), (next_x, dashed_line_y)], fill=(0, 0, 0), width=line_width)
-                current_x = next_x + gap_length
+            # 绘制虚线（线段 0.17cm、间隙 0.13cm、线宽 0.025cm，300 PPI 下约为 20 / 15 / 3 像素）
+            general_functions.draw_dashed_hline(
+                canvas_left_up, dashed_line_x_start, dashed_line_x_end, dashed_line_y, sku_config.dpi,
+                dash_cm=0.17, gap_cm=0.13, width_cm=0.025, fill=(0, 0, 0))
             
             # --- 区域 F: 底部信息框 ---
             # 显示净毛重（G.W./N.W.）和箱子尺寸（BOX SIZE）
@@ -246,8 +292,8 @@ class BarberpubFullOverlapStyle(BoxMarkStyle):
             
             # 绘制黑色圆角背景框
             bbox_gw_pos = (left_box_x, left_box_y)
-            draw = general_functions.draw_rounded_bg_for_text(
-                draw, bbox_gw, sku_config, bbox_gw_pos,
+            draw = general_functions.draw_rounded_bg_for_text_smooth(
+                draw, canvas_left_up, bbox_gw, sku_config, bbox_gw_pos,
                 bg_color=(0, 0, 0), padding_cm=(0.7, 0.6), radius=16
             )
             # 在黑色背景上绘制白色标签文字
@@ -275,8 +321,8 @@ class BarberpubFullOverlapStyle(BoxMarkStyle):
             
             # 绘制黑色圆角背景框
             bbox_box_pos = (right_box_x, right_box_y)
-            draw = general_functions.draw_rounded_bg_for_text(
-                draw, bbox_box, sku_config, bbox_box_pos,
+            draw = general_functions.draw_rounded_bg_for_text_smooth(
+                draw, canvas_left_up, bbox_box, sku_config, bbox_box_pos,
                 bg_color=(0, 0, 0), padding_cm=(0.7, 0.6), radius=16
             )
             # 在黑色背景上绘制白色标签文字
@@ -294,23 +340,8 @@ class BarberpubFullOverlapStyle(BoxMarkStyle):
             draw = ImageDraw.Draw(canvas_left_up)
             font_path_centschbook = self.font_paths['CentSchbook BT']
             
-            # --- 区域 A: 顶部注意事项信息（与上下结构一致）---
-            icon_attention = self.resources.get('icon_attention_info')
-            if icon_attention:
-                attention_w = int(canvas_w * 0.95)  # 图标宽度占画布95%
-                attention_resized = general_functions.scale_by_width(icon_attention, attention_w)
-                attention_h = attention_resized.height
-                
-                # 设置顶部边距：图标自身高度的50%
-                attention_margin_top = int(attention_h * 0.50)
-                attention_x = (canvas_w - attention_w) // 2  # 水平居中
-                attention_y = attention_margin_top
-                canvas_left_up.paste(attention_resized, (attention_x, attention_y), mask=attention_resized)
-                
-                # 记录注意事项底部位置，用于后续元素定位
-                content_start_y = attention_y + attention_h + int(1.5 * sku_config.dpi)  # 与注意事项间隔1.5cm
-            else:
-                content_start_y = int(canvas_h * 0.15)
+            # --- 区域 A: 顶部注意事项信息（在静态图层中）---
+            content_start_y = self._left_panel_narrow_content_start_y(sku_config)
             
             # 定义左右区域分割比例（从content_start_y开始）
             left_area_ratio = 0.25  # 左侧Logo区域占25%
@@ -323,16 +354,7 @@ class BarberpubFullOverlapStyle(BoxMarkStyle):
             # 可用高度（去除顶部注意事项区域）
             available_h = canvas_h - content_start_y
             
-            # ========== 左侧区域：Logo ==========
-            icon_logo = self.resources['icon_logo']
-            # Logo高度为可用高度的40%
-            icon_logo_h = int(available_h * 0.40)
-            icon_logo_resized = general_functions.scale_by_height(icon_logo, icon_logo_h)
-            
-            # Logo在左侧区域内居中（垂直方向在可用区域内居中）
-            logo_x = (left_area_w - icon_logo_resized.width) // 2
-            logo_y = content_start_y + (available_h - icon_logo_resized.height) // 2
-            canvas_left_up.paste(icon_logo_resized, (logo_x, logo_y), mask=icon_logo_resized)
+            # ========== 左侧区域：Logo（在静态图层中）==========
             
             # ========== 右侧区域：内容 ==========
             # 计算字号（大幅缩小，基于画布宽度而非右侧区域宽度）
@@ -368,15 +390,9 @@ class BarberpubFullOverlapStyle(BoxMarkStyle):
             dashed_line_x_start = sku_x
             dashed_line_x_end = sku_x + sku_w
             
-            dash_length = 20
-            gap_length = 15
-            line_width = 3
-            
-            current_x = dashed_line_x_start
-            while current_x < dashed_line_x_end:
-                next_x = min(current_x + dash_length, dashed_line_x_end)
-                draw.line([(current_x, dashed_line_y), (next_x, dashed_line_y)], fill=(0, 0, 0), width=line_width)
-                current_x = next_x + gap_length
+            general_functions.draw_dashed_hline(
+                canvas_left_up, dashed_line_x_start, dashed_line_x_end, dashed_line_y, sku_config.dpi,
+                dash_cm=0.17, gap_cm=0.13, width_cm=0.025, fill=(0, 0, 0))
             
             # --- 底部信息框（紧挨虚线下方）---
             info_font_frame = ImageFont.truetype(font_path_centschbook, info_font_frame_size)
@@ -394,8 +410,8 @@ class BarberpubFullOverlapStyle(BoxMarkStyle):
             left_box_y = dashed_line_y + int(canvas_h * 0.07)  # 虚线下方7%（更近）
             
             bbox_gw_pos = (left_box_x, left_box_y)
-            draw = general_functions.draw_rounded_bg_for_text(
-                draw, bbox_gw, sku_config, bbox_gw_pos,
+            draw = general_functions.draw_rounded_bg_for_text_smooth(
+                draw, canvas_left_up, bbox_gw, sku_config, bbox_gw_pos,
                 bg_color=(0, 0, 0), padding_cm=(0.5, 0.8), radius=16
             )
             draw.text(bbox_gw_pos, gw_text, font=info_font_frame, fill=sku_config.background_color)
@@ -419,8 +435,8 @@ class BarberpubFullOverlapStyle(BoxMarkStyle):
             right_box_y = dashed_line_y + int(canvas_h * 0.07)  # 与净毛重同高（紧贴虚线）
             
             bbox_box_pos = (right_box_x, right_box_y)
-            draw = general_functions.draw_rounded_bg_for_text(
-                draw, bbox_box, sku_config, bbox_box_pos,
+            draw = general_functions.draw_rounded_bg_for_text_smooth(
+                draw, canvas_left_up, bbox_box, sku_config, bbox_box_pos,
                 bg_color=(0, 0, 0), padding_cm=(0.5, 0.8), radius=16
             )
             draw.text(bbox_box_pos, box_size_text, font=info_font_frame, fill=sku_config.background_color)
@@ -436,35 +452,59 @@ class BarberpubFullOverlapStyle(BoxMarkStyle):
         return canvas_left_up, canvas_left_down, canvas_right_up, canvas_right_down
         
     
-    def generate_barberpub_front_panel(self, sku_config):
+    @static_layer('l_px', 'h_px')
+    def _front_panel_static(self, sku_config):
+        """正面面板的静态图层：背景、左上角 Logo、右上角公司信息和底部斜纹"""
         canvas = Image.new(sku_config.color_mode, (sku_config.l_px, sku_config.h_px), sku_config.background_color)
-        draw = ImageDraw.Draw(canvas)
         
         canvas_w, canvas_h = canvas.size
         
-        # 加载字体路径
-        font_path_centschbook = self.font_paths['CentSchbook BT']
-        font_path_droid = self.font_paths['Droid Sans Bold']
-        
         # --- 区域 A: 左上角 Logo ---
         margin_top_px = int(3 * sku_config.dpi)  # 顶部边距3cm
         margin_left_px = int(3 * sku_config.dpi)  # 左边距3cm
         margin_right_px = int(2.7 * sku_config.dpi)  # 右边距2.7cm
         
-        icon_logo = self.resources['icon_logo']
         icon_logo_h_px = int(canvas_h * 0.11)  # Logo高度约为画布高度的11%（适当缩小）
-        icon_logo_resized = general_functions.scale_by_height(icon_logo, icon_logo_h_px)
+        icon_logo_resized = self.scaled_resource('icon_logo', height=icon_logo_h_px)
         icon_logo_x = margin_left_px
         icon_logo_y = margin_top_px
-        canvas.paste(icon_logo_resized, (icon_logo_x, icon_logo_y), mask=icon_logo_resized)
+        paste_asset(canvas, icon_logo_resized, (icon_logo_x, icon_logo_y))
         
         # --- 区域 B: 右上角公司信息 ---
-        icon_company = self.resources['icon_company']
         icon_company_h_px = int(canvas_h * 0.048)  # 公司信息高度约为画布高度的4.8%（适当缩小）
-        icon_company_resized = general_functions.scale_by_height(icon_company, icon_company_h_px)
+        icon_company_resized = self.scaled_resource('icon_company', height=icon_company_h_px)
         icon_company_x = canvas_w - icon_company_resized.width - margin_right_px
         icon_company_y = margin_top_px
-        canvas.paste(icon_company_resized, (icon_company_x, icon_company_y), mask=icon_company_resized)
+        paste_asset(canvas, icon_company_resized, (icon_company_x, icon_company_y))
+        
+        # --- 区域 G: 底部斜纹条块 ---
+        stripe_height_cm = 1.6
+        bottom_margin_cm = 1.2
+        canvas = general_functions.draw_diagonal_stripes_tiled(
+            canvas, 
+            stripe_height_cm=stripe_height_cm,
+            dpi=sku_config.dpi,
+            bottom_margin_cm=bottom_margin_cm,
+            stripe_width_px=150,
+            stripe_color=(0, 0, 0),
+            bg_color=sku_config.background_color
+        )
+        return canvas
+    
+    @panel_depends_on('l_px', 'h_px', 'sku_name', 'color', 'product', 'box_number')
+    def generate_barberpub_front_panel(self, sku_config):
+        """生成 Barberpub 全搭盖样式的正面面板（在静态图层上绘制产品名、标语、SKU、颜色和箱号）"""
+        canvas = self._front_panel_static(sku_config)
+        draw = ImageDraw.Draw(canvas)
+        
+        canvas_w, canvas_h = canvas.size
+        
+        # 加载字体路径
+        font_path_centschbook = self.font_paths['CentSchbook BT']
+        font_path_droid = self.font_paths['Droid Sans Bold']
+        
+        margin_left_px = int(3 * sku_config.dpi)  # 左边距3cm
+        margin_right_px = int(2.7 * sku_config.dpi)  # 右边距2.7cm
         
         # --- 区域 C: 中间 Product 名称和标语作为整体居中（稍微缩小）---
         product_text = sku_config.product
@@ -482,9 +522,8 @@ class BarberpubFullOverlapStyle(BoxMarkStyle):
         product_h = bbox[3] - bbox[1]
         
         # --- 区域 D: 标语（小字，斜体）---
-        icon_slogan = self.resources['icon_slogan']
         icon_slogan_w_px = int(canvas_w * 0.38)  # 缩小到38%宽度
-        icon_slogan_resized = general_functions.scale_by_width(icon_slogan, icon_slogan_w_px)
+        icon_slogan_resized = self.scaled_resource('icon_slogan', width=icon_slogan_w_px)
         
         # 计算Product和Slogan的整体高度
         vertical_gap = int(2 * sku_config.dpi)  # Product和Slogan之间间距2cm
@@ -501,25 +540,7 @@ class BarberpubFullOverlapStyle(BoxMarkStyle):
         # 粘贴Slogan（居中）
         icon_slogan_x = (canvas_w - icon_slogan_resized.width) // 2
         icon_slogan_y = product_y + product_h + vertical_gap
-        canvas.paste(icon_slogan_resized, (icon_slogan_x, icon_slogan_y), mask=icon_slogan_resized)
-        
-        # --- 区域 G: 底部斜纹条块（先绘制，避免遮盖文字）---
-        stripe_height_cm = 1.6
-        bottom_margin_cm = 1.2
-        stripe_y_start = canvas_h - int(stripe_height_cm * sku_config.dpi) - int(bottom_margin_cm * sku_config.dpi)
-        stripe_y_end = canvas_h - int(bottom_margin_cm * sku_config.dpi)
-
-        
-        canvas = general_functions.draw_diagonal_stripes(
-            canvas, 
-            stripe_height_cm=stripe_height_cm,
-            dpi=sku_config.dpi,
-            bottom_margin_cm=bottom_margin_cm,
-            stripe_width_px=150,
-            stripe_color=(0, 0, 0),
-            bg_color=sku_config.background_color
-        )
-        draw = ImageDraw.Draw(canvas)  # 重新创建draw对象，因为canvas被更新了
+        LayerCompositor().add(icon_slogan_resized, (icon_slogan_x, icon_slogan_y), shared=True).composite(canvas)
         
         # --- 区域 E: 左下角颜色和SKU代码 ---
         margin_bottom_px = int(5 * sku_config.dpi)  # 底部边距5cm（增大间距，确保文字在斜纹上方）
@@ -574,8 +595,8 @@ class BarberpubFullOverlapStyle(BoxMarkStyle):
         box_text_pos = (bbox_text_x, bbox_text_y)
         
         # 绘制黑框背景
-        draw = general_functions.draw_rounded_bg_for_text(
-            draw, bbox_box_text, sku_config, box_text_pos,
+        draw = general_functions.draw_rounded_bg_for_text_smooth(
+            draw, canvas, bbox_box_text, sku_config, box_text_pos,
             bg_color=(0, 0, 0), padding_cm=(0.5, 0.9), radius=16
         )
         
@@ -585,6 +606,7 @@ class BarberpubFullOverlapStyle(BoxMarkStyle):
         canvas_front = canvas
         return canvas_front
     
+    @panel_depends_on('w_px', 'h_px', 'sku_name', 'side_text.sn_code', 'side_text.origin_text')
     def generate_barberpub_side_panel(self, sku_config):
         """
         生成 Barberpub 全搭盖样式的侧面板
@@ -628,16 +650,13 @@ class BarberpubFullOverlapStyle(BoxMarkStyle):
         
         # ========== 区域 B: 底部图标资源 ==========
         # 加载网址图标和侧唛标签图标
-        img_web = self.resources['icon_webside']       # 网址搜索条（左侧）
-        img_label = self.resources['icon_side_label']  # 条形码标签（右侧）
-        
         # 设定图标尺寸（相对于画布宽度）
         icons_web_w_px = int(canvas_w * 0.57)    # 网址条宽度为画布的57%
         icons_label_w_px = int(canvas_w * 0.28)  # 标签宽度为画布的28%
         
-        # 按宽度等比缩放图标
-        img_web_resized = general_functions.scale_by_width(img_web, icons_web_w_px)
-        img_label_resized = general_functions.scale_by_width(img_label, icons_label_w_px)
+        # 按宽度等比缩放图标（缩放结果按尺寸缓存；标签要填写内容，所以复制一份）
+        img_web_resized = self.scaled_resource('icon_webside', width=icons_web_w_px)       # 网址搜索条（左侧）
+        img_label_resized = self.scaled_resource('icon_side_label', width=icons_label_w_px).copy()  # 条形码标签（右侧）
         
         # 填充标签内容（添加条形码、产地信息等）
         img_label_resized_filled = self.fill_side_label_barberpub_fulloverlap(sku_config, img_label_resized, self.font_paths)
@@ -661,17 +680,18 @@ class BarberpubFullOverlapStyle(BoxMarkStyle):
         sku_y = content_start_y               # 从计算的起始位置开始
         draw.text((sku_x, sku_y), sku_text, font=sku_font, fill=(0, 0, 0))
         
-        # 2. 粘贴网址图标（位于SKU下方，左侧）
+        # 2. 网址图标（位于SKU下方，左侧；共享的缩放资源，按缓存的分段计划合成）
         margin_side = int(3 * sku_config.dpi)  # 左右边距 3cm
         web_x = margin_side                    # 左对齐
         web_y = sku_y + sku_text_h + gap_sku_to_icons  # 位于SKU下方
-        canvas.paste(img_web_resized, (web_x, web_y), mask=img_web_resized)
+        icons = LayerCompositor().add(img_web_resized, (web_x, web_y), shared=True)
         
-        # 3. 粘贴标签图标（与网址图标同一水平线，右对齐）
+        # 3. 标签图标（与网址图标同一水平线，右对齐）
         label_x = canvas_w - img_label_resized_filled.width - margin_side  # 右对齐
         # 让两个图标的中心在同一水平线上（垂直居中对齐）
         label_y = web_y + (img_web_resized.height - img_label_resized_filled.height) // 2
-        canvas.paste(img_label_resized_filled, (label_x, label_y), mask=img_label_resized_filled)
+        icons.add(img_label_resized_filled, (label_x, label_y))
+        icons.composite(canvas)
         
         # ========== 旋转生成最终面板 ==========
         # 将横向画布旋转90度，变成竖长的侧面板
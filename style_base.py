@@ -3,22 +3,265 @@
 样式基类 - 所有箱唛样式的抽象基类
 """
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from PIL import Image
 import pathlib as Path
+import functools
+import hashlib
+import os
+import tempfile
+import threading
+import weakref
+
+
+# 所有面板都会用到的基础字段（画布分辨率、颜色模式、背景色），自动并入每个面板的缓存键
+PANEL_BASE_FIELDS = ('ppi', 'color_mode', 'background_color')
+
+
+def _resolve_field(sku_config, field):
+    """按 'box_number.total_boxes' 这样的点路径读取配置字段，中间值为 None 时返回 None"""
+    value = sku_config
+    for part in field.split('.'):
+        if value is None:
+            return None
+        value = getattr(value, part)
+    return value
+
+
+def _image_nbytes(value):
+    """估算缓存值（单张图片或图片元组）占用的内存字节数"""
+    if isinstance(value, Image.Image):
+        return value.width * value.height * len(value.getbands())
+    if isinstance(value, (tuple, list)):
+        return sum(_image_nbytes(item) for item in value)
+    return 0
+
+
+class PanelCache:
+    """
+    面板图片的 LRU 缓存 - 同时限制条目数和总内存
+    缓存中的图片会被多个箱唛共享，调用方只能读取（粘贴/旋转），不能就地修改
+    """
+
+    def __init__(self, max_entries=64, max_bytes=512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_create(self, key, factory):
+        """命中则返回缓存值，否则调用 factory() 生成并写入缓存"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+        value = factory()
+        nbytes = _image_nbytes(value)
+        with self._lock:
+            if key not in self._entries and nbytes <= self.max_bytes:
+                self._entries[key] = (value, nbytes)
+                self._bytes += nbytes
+                self._evict()
+        return value
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self._bytes -= nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def info(self):
+        """返回缓存统计信息"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+            }
+
+
+class TemplateCache(PanelCache):
+    """
+    静态图层模板缓存 - 在 PanelCache 的内存 LRU 之外，可选地把模板落盘到 directory
+    落盘文件以缓存键的 sha1 命名，进程重启或多个进程之间都能复用同一份模板
+    """
+
+    def __init__(self, max_entries=32, max_bytes=256 * 1024 * 1024, directory=None):
+        super().__init__(max_entries=max_entries, max_bytes=max_bytes)
+        self.directory = Path.Path(directory) if directory else None
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return self.directory / f"{key[0]}-{key[1]}-{digest}.tiff"
+
+    def get_or_create(self, key, factory, persist=True):
+        """依次查找内存、磁盘，都未命中才调用 factory() 渲染模板"""
+        if not (persist and self.directory):
+            return super().get_or_create(key, factory)
+
+        def load_or_render():
+            path = self._disk_path(key)
+            if path.exists():
+                with Image.open(path) as image:
+                    image.load()
+                    return image.copy()
+            image = factory()
+            if path.exists():
+                # 其他进程已经写好了同一份模板
+                return image
+            # 每个写入方使用自己的临时文件，写完后原子替换：多个进程同时写同一个键互不干扰，读取方不会看到写了一半的文件
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=path.stem + '-', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    image.save(f, format='TIFF', compression='tiff_deflate')
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            return image
+        return super().get_or_create(key, load_or_render)
+
+
+class DerivedImageCache:
+    """
+    按源图片对象缓存派生图片（面板的索引色版本、CMYK 版本等）
+    面板缓存命中时返回同一个源对象，这里也返回同一个派生对象，增量生成据此跳过未变化的区域；
+    源对象被面板缓存淘汰并释放后，对应的派生图片随之释放
+    """
+
+    def __init__(self):
+        self._entries = {}  # id(源图片) -> (弱引用, 派生图片)
+        self._lock = threading.Lock()
+
+    def get_or_create(self, source, factory):
+        """命中则返回缓存的派生图片，否则调用 factory(source) 生成"""
+        key = id(source)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0]() is source:
+                return entry[1]
+        derived = factory(source)
+        with self._lock:
+            self._entries[key] = (weakref.ref(source, lambda _, key=key: self._entries.pop(key, None)), derived)
+        return derived
+
+    def get(self, source):
+        """命中则返回缓存的派生图片，否则返回 None"""
+        with self._lock:
+            entry = self._entries.get(id(source))
+            return entry[1] if entry is not None and entry[0]() is source else None
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def panel_depends_on(*fields):
+    """
+    装饰器：声明面板生成函数读取的配置字段
+    引擎按 (函数名, 字段值) 缓存生成结果，字段值不变时直接复用已生成的面板
+    字段支持点路径，如 'box_number.total_boxes'、'side_text.sn_code'
+    注意：必须列全函数（及其调用的辅助函数）读取的所有字段，漏写会导致复用错误的面板
+    """
+    all_fields = PANEL_BASE_FIELDS + tuple(fields)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, sku_config):
+            key = (func.__name__,) + tuple(_resolve_field(sku_config, field) for field in all_fields)
+            return self.panel_cache.get_or_create(key, lambda: func(self, sku_config))
+        wrapper.panel_fields = all_fields
+        return wrapper
+    return decorator
+
+
+def static_layer(*fields):
+    """
+    装饰器：声明一个面板的静态图层（背景、Logo、公司信息、斜纹、标签框等与 SKU 无关的内容）
+    静态图层按 (样式, 函数名, 字段值) 渲染一次后作为模板缓存（内存或磁盘），
+    每次调用返回模板的副本，调用方在副本上只绘制动态图层（SKU 文字、颜色、重量、条码）
+    字段通常只包含尺寸相关字段，如 'l_px'、'h_px'
+    """
+    all_fields = PANEL_BASE_FIELDS + tuple(fields)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, sku_config):
+            key = (self.get_style_name(), func.__name__) + tuple(_resolve_field(sku_config, field) for field in all_fields)
+            return self.template_cache.get_or_create(key, lambda: func(self, sku_config)).copy()
+        wrapper.panel_fields = all_fields
+        return wrapper
+    return decorator
 
 
 class BoxMarkStyle(ABC):
     """箱唛样式抽象基类"""
     
+    # 样式直接绘制的固定颜色（背景色之外），调色板模式会为它们及其之间的抗锯齿渐变预留索引
+    palette_colors = ((0, 0, 0), (255, 255, 255))
+    # 面板能否记录为文字、图片等绘制操作（SVG 矢量输出）；Python 样式的面板只能记录为整幅图片
+    vector_output = False
+    
     def __init__(self, base_dir, ppi=300):
         self.base_dir = base_dir
         self.ppi = ppi
         self.dpi = ppi / 2.54  # cm to px
         self.resources = {}
         self.font_paths = {}
+        self._prepared_resources = {}
+        self.resource_peaks = {}  # 资源名 -> scaled_resource 缩放到的最大 (宽, 高)，asset_optimizer 据此决定可缩小的资源
+        self.panel_cache = PanelCache()
+        self.template_cache = TemplateCache()
         self._load_resources()
         self._load_fonts()
     
+    def scaled_resource(self, name, height=None, width=None):
+        """
+        返回按高度或宽度等比缩放后的资源图片，结果按 (资源名, 目标尺寸) 缓存
+        返回的是共享对象，只能用于粘贴；需要在上面绘制时请先 .copy()
+        """
+        key = (self.get_style_name(), 'scaled_resource', name, height, width)
+
+        def scale():
+            # 与 general_functions.scale_by_height / scale_by_width 的尺寸和结果相同，只重采样有内容的部分
+            asset = self.prepared_resource(name)
+            w, h = asset.nominal_size
+            size = (int(w * (height / h)), height) if height is not None else (width, int(h * (width / w)))
+            peak = self.resource_peaks.get(name, (0, 0))
+            self.resource_peaks[name] = (max(peak[0], size[0]), max(peak[1], size[1]))
+            return asset.resize(size)
+        return self.template_cache.get_or_create(key, scale, persist=False)
+
+    def prepared_resource(self, name):
+        """返回预处理（裁掉透明边距、预乘 alpha）后的资源，每个资源只处理一次"""
+        from asset_preprocessing import PreparedAsset
+        asset = self._prepared_resources.get(name)
+        if asset is None:
+            asset = self._prepared_resources.setdefault(name, PreparedAsset(self.resources[name]))
+        return asset
+
+    def record_panels(self, sku_config):
+        """
+        记录所有面板的绘制操作（display_list.PanelRecording），返回 {面板键名: (面板记录, 旋转角度)}
+        默认把 generate_all_panels 的结果按当前分辨率记录为整幅图片；声明式样式记录为文字、图片等操作
+        """
+        from display_list import PanelRecording
+        return {panel_type: (PanelRecording.from_image(panel, sku_config.dpi), 0)
+                for panel_type, panel in self.generate_all_panels(sku_config).items()}
+    
     @abstractmethod
     def _load_resources(self):
         """加载样式所需的图片资源"""
@@ -100,6 +343,8 @@ class BoxMarkStyle(ABC):
             "front": canvas_front,
             ...
         }
+        各面板生成函数应使用 @panel_depends_on(...) 声明所依赖的配置字段，
+        引擎据此缓存面板，只有依赖字段发生变化的面板才会重新生成
         """
         pass
 
@@ -108,14 +353,21 @@ class StyleRegistry:
     """样式注册表 - 管理所有可用的样式"""
     
     _styles = {}
+    _style_info = {}  # 注册时记录的样式元数据，避免每次查询都实例化样式、重新加载资源
     
     @classmethod
     def register(cls, style_class):
         """注册一个样式类"""
-        # 创建临时实例获取样式名称
+        # 创建临时实例获取样式名称和描述
         temp_instance = style_class(base_dir=Path.Path(__file__).parent, ppi=72)
         style_name = temp_instance.get_style_name()
         cls._styles[style_name] = style_class
+        cls._style_info[style_name] = {
+            'name': style_name,
+            'description': temp_instance.get_style_description(),
+            'required_params': list(temp_instance.get_required_params()),
+            'vector_output': style_class.vector_output
+        }
         return style_class
     
     @classmethod
@@ -127,17 +379,16 @@ class StyleRegistry:
     
     @classmethod
     def get_all_styles(cls):
-        """获取所有已注册的样式信息"""
-        styles_info = []
-        for style_name, style_class in cls._styles.items():
-            # 创建临时实例获取描述
-            temp_instance = style_class(base_dir=Path.Path(__file__).parent, ppi=72)
-            styles_info.append({
-                'name': style_name,
-                'description': temp_instance.get_style_description(),
-                'required_params': temp_instance.get_required_params()
-            })
-        return styles_info
+        """获取所有已注册的样式信息（来自注册时的缓存，不会加载资源）"""
+        return [
+            dict(info, required_params=list(info['required_params']))
+            for info in cls._style_info.values()
+        ]
+    
+    @classmethod
+    def supports_vector_output(cls, style_name):
+        """样式是否支持 SVG 矢量输出（声明式样式）"""
+        return style_name in cls._styles and cls._styles[style_name].vector_output
     
     @classmethod
     def list_styles(cls):
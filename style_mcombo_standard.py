@@ -3,8 +3,8 @@
 MCombo 标准样式 - 将原有的 BoxMarkEngine 转换为样式类
 """
 from PIL import Image, ImageDraw, ImageFont
-import pathlib as Path
-from style_base import BoxMarkStyle, StyleRegistry
+from style_base import BoxMarkStyle, StyleRegistry, panel_depends_on, static_layer
+from asset_preprocessing import paste_asset, open_asset, asset_file
 import general_functions
 
 
@@ -85,31 +85,31 @@ class MComboStandardStyle(BoxMarkStyle):
         """加载 MCombo 标准样式的图片资源"""
         res_base = self.base_dir / 'assets' / 'Mcombo' / '样式一' / '矢量文件'
         self.resources = {
-            'icon_left_2_panel': Image.open(res_base / '顶部-左-2箱.png').convert('RGBA'),
-            'icon_left_3_panel': Image.open(res_base / '顶部-左-3箱.png').convert('RGBA'),
-            'icon_right_2-1_panel': Image.open(res_base / '顶部-右-2-1.png').convert('RGBA'),
-            'icon_right_3-1_panel': Image.open(res_base / '顶部-右-3-1.png').convert('RGBA'),
-            'icon_trademark': Image.open(res_base / '正唛logo.png').convert('RGBA'),
-            'icon_company': Image.open(res_base / '正唛公司信息.png').convert('RGBA'),
-            'icon_box_number_1': Image.open(res_base / '正唛 Box 1.png').convert('RGBA'),
-            'icon_box_number_2': Image.open(res_base / '正唛 Box 2.png').convert('RGBA'),
-            'icon_box_number_3': Image.open(res_base / '正唛 Box 3.png').convert('RGBA'),
-            'icon_side_label_box': Image.open(res_base / '侧唛标签框.png').convert('RGBA'),
-            'icon_side_logo': Image.open(res_base / '侧唛logo.png').convert('RGBA'),
-            'icon_side_text_box': Image.open(res_base / '侧唛文本框.png').convert('RGBA'),
-            'icon_side_sponge': Image.open(res_base / '海绵认证.png').convert('RGBA')
+            'icon_left_2_panel': open_asset(res_base / '顶部-左-2箱.png'),
+            'icon_left_3_panel': open_asset(res_base / '顶部-左-3箱.png'),
+            'icon_right_2-1_panel': open_asset(res_base / '顶部-右-2-1.png'),
+            'icon_right_3-1_panel': open_asset(res_base / '顶部-右-3-1.png'),
+            'icon_trademark': open_asset(res_base / '正唛logo.png'),
+            'icon_company': open_asset(res_base / '正唛公司信息.png'),
+            'icon_box_number_1': open_asset(res_base / '正唛 Box 1.png'),
+            'icon_box_number_2': open_asset(res_base / '正唛 Box 2.png'),
+            'icon_box_number_3': open_asset(res_base / '正唛 Box 3.png'),
+            'icon_side_label_box': open_asset(res_base / '侧唛标签框.png'),
+            'icon_side_logo': open_asset(res_base / '侧唛logo.png'),
+            'icon_side_text_box': open_asset(res_base / '侧唛文本框.png'),
+            'icon_side_sponge': open_asset(res_base / '海绵认证.png')
         }
     
     def _load_fonts(self):
         """加载字体路径"""
         font_base = self.base_dir / 'assets' / 'MMcombo' / '样式一' / '箱唛字体'
         self.font_paths = {
-            'calibri_bold': str(font_base / 'calibri_blod.ttf'),
-            'itc_demi': str(font_base / 'ITC Avant Garde Gothic LT Demi.ttf'),
-            'courier': str(font_base / 'cour.ttf'),
-            'side_font_label': str(font_base / 'ITC Avant Garde Gothic LT Demi.ttf'),
-            'side_font_bold': str(font_base / 'calibri_blod.ttf'),
-            'side_font_barcode': str(font_base / 'calibri_blod.ttf')
+            'calibri_bold': asset_file(font_base / 'calibri_blod.ttf'),
+            'itc_demi': asset_file(font_base / 'ITC Avant Garde Gothic LT Demi.ttf'),
+            'courier': asset_file(font_base / 'cour.ttf'),
+            'side_font_label': asset_file(font_base / 'ITC Avant Garde Gothic LT Demi.ttf'),
+            'side_font_bold': asset_file(font_base / 'calibri_blod.ttf'),
+            'side_font_barcode': asset_file(font_base / 'calibri_blod.ttf')
         }
         
         # 字体大小相对比例
@@ -145,6 +145,7 @@ class MComboStandardStyle(BoxMarkStyle):
         }
         return fonts
     
+    @panel_depends_on('l_px', 'half_w_px', 'box_number.total_boxes')
     def generate_left_panel(self, sku_config):
         """生成左侧面板"""
         canvas_left_up = Image.new(sku_config.color_mode, (sku_config.l_px, sku_config.half_w_px), sku_config.background_color)
@@ -162,6 +163,7 @@ class MComboStandardStyle(BoxMarkStyle):
             canvas_left_down, icon_left_down_panel, height_cm=10, dpi=sku_config.dpi)
         return canvas_left_up, canvas_left_down
     
+    @panel_depends_on('l_px', 'half_w_px', 'box_number.total_boxes')
     def generate_right_panel(self, sku_config):
         """生成右侧面板"""
         canvas_right_up = Image.new(sku_config.color_mode, (sku_config.l_px, sku_config.half_w_px), sku_config.background_color)
@@ -179,29 +181,39 @@ class MComboStandardStyle(BoxMarkStyle):
             canvas_right_down, icon_right_panel_down, height_cm=9, dpi=sku_config.dpi)
         return canvas_right_up, canvas_right_down
     
-    def generate_front_panel(self, sku_config):
-        """生成正面面板"""
+    @static_layer('l_px', 'h_px', 'bottom_gb_h', 'box_number.current_box')
+    def _front_panel_static(self, sku_config):
+        """正面面板静态图层：背景、正唛标志、底部异形底框、公司信息、箱号图标"""
         canvas = Image.new(sku_config.color_mode, (sku_config.l_px, sku_config.h_px), sku_config.background_color)
-        icon_trademark = self.resources['icon_trademark']
-        
-        fonts = self._get_fonts(sku_config)
         
         # 粘贴正唛标志
         canvas_w, canvas_h = canvas.size
-        icon_trademark_target_h = canvas_h // 3
-        icon_trademark_resized = general_functions.scale_by_height(icon_trademark, icon_trademark_target_h)
+        icon_trademark_resized = self.scaled_resource('icon_trademark', height=canvas_h // 3)
         icon_trademark_target_w, icon_trademark_target_h = icon_trademark_resized.size
         paste_x = (canvas_w - icon_trademark_target_w) // 2
         paste_y = 0
-        canvas.paste(icon_trademark_resized, (paste_x, paste_y), mask=icon_trademark_resized)
+        paste_asset(canvas, icon_trademark_resized, (paste_x, paste_y))
+        
+        # 生成底部黑色底框
+        icon_company = self.resources['icon_company']
+        icon_box_number = self.resources[f"icon_box_number_{sku_config.box_number['current_box']}"]
+        general_functions.draw_dynamic_bottom_bg_static(canvas, sku_config, icon_company, icon_box_number)
+        return canvas
+    
+    @panel_depends_on('l_px', 'h_px', 'bottom_gb_h', 'sku_name', 'color', 'product', 'size', 'box_number.current_box')
+    def generate_front_panel(self, sku_config):
+        """生成正面面板（在静态模板上绘制 SKU、颜色、产品名称和尺寸）"""
+        canvas = self._front_panel_static(sku_config)
+        
+        fonts = self._get_fonts(sku_config)
+        canvas_w, canvas_h = canvas.size
+        icon_trademark_target_h = canvas_h // 3
         
         draw = ImageDraw.Draw(canvas)
         bottom_bg_h = int(sku_config.bottom_gb_h * sku_config.dpi)
         
-        # 生成底部黑色底框和动态SKU文本
-        icon_company = self.resources['icon_company']
-        icon_box_number = self.resources[f"icon_box_number_{sku_config.box_number['current_box']}"]
-        general_functions.draw_dynamic_bottom_bg(canvas, sku_config, icon_company, icon_box_number, self.font_paths)
+        # 底部黑色底框中的动态SKU文本
+        general_functions.draw_dynamic_bottom_sku(canvas, sku_config, self.resources['icon_company'], self.font_paths)
 
         # 写入右上角颜色信息
         color_font = fonts['color_font']
@@ -213,8 +225,8 @@ class MComboStandardStyle(BoxMarkStyle):
         color_y = int(4 * sku_config.dpi)
         color_xy = (color_x, color_y)
         
-        draw = general_functions.draw_rounded_bg_for_text(
-            draw, bbox, sku_config, color_xy,
+        draw = general_functions.draw_rounded_bg_for_text_smooth(
+            draw, canvas, bbox, sku_config, color_xy,
             bg_color=(0, 0, 0), padding_cm=(0.8, 0.4), radius=16)
         draw.text((color_x, color_y), color_text, font=color_font, fill=(161,142,102))
         
@@ -246,7 +258,7 @@ class MComboStandardStyle(BoxMarkStyle):
         line_x0 = (canvas_w - line_width) // 2
         line_x1 = line_x0 + line_width
         line_box = [line_x0, line_y_top, line_x1, line_y_top + line_height]
-        general_functions.draw_smooth_ellipse(draw, canvas, line_box, fill=(0, 0, 0))
+        general_functions.draw_smooth_ellipse_analytic(draw, canvas, line_box, fill=(0, 0, 0))
         
         # 绘制尺寸信息
         size_x = (canvas_w - size_w) // 2
@@ -255,28 +267,41 @@ class MComboStandardStyle(BoxMarkStyle):
         
         return canvas
     
-    def generate_side_panel(self, sku_config):
-        """生成侧面面板"""
+    @static_layer('l_px', 'w_px', 'h_px', 'bottom_gb_h', 'sponge_verified')
+    def _side_panel_static(self, sku_config):
+        """侧面面板静态图层：背景、底部异形底框、标签框、侧唛 logo、海绵认证图标"""
         canvas = Image.new(sku_config.color_mode, (sku_config.w_px, sku_config.h_px), sku_config.background_color)
         
-        general_functions.draw_side_dynamic_bottom_bg(
-            canvas, sku_config, self.resources['icon_company'], self.font_paths)
+        general_functions.draw_side_dynamic_bottom_bg_static(canvas, sku_config, self.resources['icon_company'])
         
         # 放置侧唛标签框
-        icon_side_label_box = self.resources['icon_side_label_box']
-        icon_side_label_box_resized = general_functions.scale_by_height(
-            icon_side_label_box, int(5 * sku_config.dpi))
+        icon_side_label_box_resized = self.scaled_resource('icon_side_label_box', height=int(5 * sku_config.dpi))
         icon_side_label_box_x, icon_side_label_box_y = int(3 * sku_config.dpi), int(4 * sku_config.dpi)
-        canvas.paste(icon_side_label_box_resized, (icon_side_label_box_x, icon_side_label_box_y), 
-                    mask=icon_side_label_box_resized)
+        paste_asset(canvas, icon_side_label_box_resized, (icon_side_label_box_x, icon_side_label_box_y))
         
         # 放置侧唛 logo
-        icon_side_logo = self.resources['icon_side_logo']
-        icon_side_logo_resized = general_functions.scale_by_height(icon_side_logo, int(5 * sku_config.dpi))
+        icon_side_logo_resized = self.scaled_resource('icon_side_logo', height=int(5 * sku_config.dpi))
         icon_side_logo_w, icon_side_logo_h = icon_side_logo_resized.size
         icon_side_logo_x = canvas.width - icon_side_logo_w - int(4 * sku_config.dpi)
         icon_side_logo_y = int(4 * sku_config.dpi)
-        canvas.paste(icon_side_logo_resized, (icon_side_logo_x, icon_side_logo_y), mask=icon_side_logo_resized)
+        paste_asset(canvas, icon_side_logo_resized, (icon_side_logo_x, icon_side_logo_y))
+        
+        # 放置海绵认证图标（位于文字信息框左侧）
+        if sku_config.sponge_verified:
+            table_height_px = int(8 * sku_config.dpi)
+            base_x = int(4 * sku_config.dpi)
+            base_y = canvas.height - sku_config.bottom_gb_h_px - int(3 * sku_config.dpi) - table_height_px
+            icon_side_sponge_resized = self.scaled_resource('icon_side_sponge', height=table_height_px)
+            paste_asset(canvas, icon_side_sponge_resized, (base_x, base_y))
+        return canvas
+    
+    @panel_depends_on('l_px', 'w_px', 'h_px', 'l_cm', 'w_cm', 'h_cm', 'bottom_gb_h', 'sku_name', 'sponge_verified', 'side_text')
+    def generate_side_panel(self, sku_config):
+        """生成侧面面板（在静态模板上绘制底框 SKU 和文字信息框）"""
+        canvas = self._side_panel_static(sku_config)
+        
+        general_functions.draw_side_dynamic_bottom_sku(
+            canvas, sku_config, self.resources['icon_company'], self.font_paths)
         
         # 放置侧唛文字信息框
         icon_side_text_box_spacing_left = int(4 * sku_config.dpi)
@@ -286,15 +311,13 @@ class MComboStandardStyle(BoxMarkStyle):
         base_x = icon_side_text_box_spacing_left
         base_y = canvas.height - sku_config.bottom_gb_h_px - icon_side_text_box_spacing_bottom - table_height_px
         
-        icon_side_text_box = self.resources['icon_side_text_box'].copy()
-        icon_side_text_box_resized = general_functions.scale_by_height(icon_side_text_box, table_height_px)
+        # 文字信息框每次都要填写动态内容，复制缓存的缩放结果后再绘制
+        icon_side_text_box_resized = self.scaled_resource('icon_side_text_box', height=table_height_px).copy()
         
         if sku_config.sponge_verified:
-            icon_side_sponge = self.resources['icon_side_sponge'].copy()
-            icon_side_sponge_resized = general_functions.scale_by_height(icon_side_sponge, table_height_px)
-            canvas.paste(icon_side_sponge_resized, (base_x, base_y), mask=icon_side_sponge_resized)
-            
-            base_x += icon_side_sponge_resized.size[0] + int(0.6 * sku_config.dpi)
+            # 海绵认证图标已在静态图层中绘制，这里只需要计算文字信息框的位置
+            sponge_w = general_functions.scaled_width_by_height(self.resources['icon_side_sponge'], table_height_px)
+            base_x += sponge_w + int(0.6 * sku_config.dpi)
             fill_image = general_functions.fill_sidepanel_text(
                 icon_side_text_box_resized, sku_config, self.font_paths)
             canvas.paste(fill_image, (base_x, base_y), mask=icon_side_text_box_resized)
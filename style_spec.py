@@ -0,0 +1,572 @@
+# -*- coding: utf-8 -*-
+"""
+声明式样式 - 用 JSON 文件描述样式的区域、面板、资源、文字（含自适应字号）、条码和旋转，不需要再写样式类
+样式描述按 (样式, 箱子尺寸, 分辨率) 编译为渲染计划并缓存，所有声明式样式共用同一个执行器：
+- 计划中只依赖尺寸的表达式在编译时算好，依赖 SKU 内容（文字、箱号）的表达式留到执行时计算
+- 面板按其表达式实际引用的 SKU 字段自动缓存，不需要手写 @panel_depends_on
+- dry_run 只计算每个元素的最终参数（位置、字号、文字）不绘图，可用于排版检查和矢量输出
+- 面板之间相互独立，render_panels 可交给线程池并行执行
+
+表达式是 Python 表达式的安全子集（算术、比较、条件、下标、属性和 int/min/max 等少数函数），
+可用的名称见 GEOMETRY_NAMES（尺寸）、CONTENT_NAMES（SKU 内容）以及面板的 w、h 和各元素的局部名称；
+JSON 中的数字直接作为常量，字符串都按表达式解析（文字常量需要再加一层引号，如 "'MADE IN CHINA'"）
+
+描述文件格式见 style_specs/simple.json：
+    {
+      "name": 样式名称, "description": 描述, "required_params": [...],
+      "fonts":  {字体名: assets 下的相对路径},
+      "assets": {资源名: assets 下的相对路径},
+      "regions": {区域名: {"box": [x, y, 宽, 高], "panel": 面板名}},
+      "panels":  {面板名: {"size": [宽, 高], "background": 颜色, "elements": [元素, ...]}
+                  或 {"from": 其他面板名, "rotate": 角度}}
+    }
+元素（都可以带 "when": 条件表达式，为假时跳过）：
+    text        text, font, size 或 fit {width, height, min_size, max_size}, x, y, fill, rotate, id,
+                background {fill, padding_cm [左右, 上下], radius}（文字后面的抗锯齿圆角底框）
+                x / y 中可用 text_w、text_h（旋转后的文字外框尺寸）和 text_len（文字的排版宽度）
+    asset       asset, height 或 width, x, y, rotate, id；x / y 中可用 asset_w、asset_h
+                elements: 先绘制在缩放后的资源图片上、再随图片一起粘贴的子元素（坐标相对图片，w / h 为图片尺寸）
+    rect        box [x0, y0, x1, y1], fill, radius（> 0 时为抗锯齿圆角矩形）
+    barcode     code, box [x, y, 宽, 高]
+    dashed_line x_start, x_end, y, dash_cm, gap_cm, width_cm, fill, dotted
+    stripes     height_cm, bottom_margin_cm, stripe_width（像素）, fill, background（面板底部的斜纹条块）
+带 id 的元素绘制后，之后的元素可以用 id.x、id.y、id.w、id.h 引用它的位置和尺寸（文字为绘制原点和外框尺寸）
+
+style_specs/barberpub_topandbottom.json 是完整样式的例子（自适应字号、圆角底框、斜纹、侧唛标签上的条码和旋转面板）
+"""
+import ast
+import collections
+import functools
+import json
+import pathlib as Path
+from PIL import Image, ImageDraw, ImageFont
+
+from style_base import BoxMarkStyle, StyleRegistry, PanelCache, PANEL_BASE_FIELDS, _resolve_field
+from asset_preprocessing import open_asset, asset_file
+from display_list import PanelRecording
+import general_functions
+
+
+# 只与箱子尺寸和分辨率有关的名称，引用它们的表达式在编译时计算
+GEOMETRY_NAMES = ('l_cm', 'w_cm', 'h_cm', 'bottom_gb_h', 'ppi',
+                  'dpi', 'l_px', 'w_px', 'h_px', 'half_w_px', 'bottom_gb_h_px', 'l_in', 'w_in', 'h_in')
+# 编译缓存键：其余尺寸名称都由它们推导
+GEOMETRY_KEY_FIELDS = ('l_cm', 'w_cm', 'h_cm', 'bottom_gb_h', 'ppi')
+# SKU 内容，引用它们的表达式在执行时计算，并进入面板的缓存键
+CONTENT_NAMES = ('sku_name', 'color', 'product', 'size', 'side_text', 'box_number', 'sponge_verified',
+                 'background_color')
+# 面板内可用的名称（面板宽高）
+PANEL_NAMES = ('w', 'h')
+# 元素内可用的局部名称
+LOCAL_NAMES = ('text_w', 'text_h', 'text_len', 'asset_w', 'asset_h')
+# 表达式中可调用的函数
+SAFE_FUNCTIONS = {
+    'int': int, 'float': float, 'round': round, 'min': min, 'max': max, 'abs': abs,
+    'str': str, 'len': len, 'upper': str.upper,
+}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.Constant, ast.Name, ast.Load, ast.Tuple, ast.List,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.UnaryOp, ast.USub, ast.UAdd, ast.Not,
+    ast.BoolOp, ast.And, ast.Or,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+    ast.IfExp, ast.Subscript, ast.Attribute, ast.Call,
+    ast.JoinedStr, ast.FormattedValue,
+)
+
+
+class StyleSpecError(ValueError):
+    """样式描述文件有误（格式错误、不允许的表达式、未知名称等）"""
+
+
+class Expression:
+    """
+    样式描述中的一个表达式：解析时检查语法只包含安全子集，编译为代码对象后可反复计算
+    names 为表达式引用的名称（不含函数名）
+    """
+
+    def __init__(self, source, where=''):
+        self.source = source
+        self.where = where
+        try:
+            tree = ast.parse(source, mode='eval')
+        except SyntaxError as exc:
+            raise StyleSpecError(f"{where}: 表达式语法错误 {source!r}: {exc.msg}") from None
+        names = set()
+        for node in ast.walk(tree):
+            if not isinstance(node, _ALLOWED_NODES):
+                raise StyleSpecError(f"{where}: 表达式 {source!r} 中不允许使用 {type(node).__name__}")
+            if isinstance(node, ast.Attribute) and node.attr.startswith('_'):
+                raise StyleSpecError(f"{where}: 表达式 {source!r} 不能访问下划线开头的属性")
+            if isinstance(node, ast.Call):
+                if not (isinstance(node.func, ast.Name) and node.func.id in SAFE_FUNCTIONS) or node.keywords:
+                    raise StyleSpecError(f"{where}: 表达式 {source!r} 只能调用 {', '.join(SAFE_FUNCTIONS)}")
+            elif isinstance(node, ast.Name):
+                names.add(node.id)
+        self.names = frozenset(names - set(SAFE_FUNCTIONS))
+        self.code = compile(tree, f'<{where}>', 'eval')
+
+    def evaluate(self, namespace):
+        missing = self.names - namespace.keys()
+        if missing:
+            raise StyleSpecError(f"{self.where}: 表达式 {self.source!r} 中的名称未定义: {', '.join(sorted(missing))}")
+        try:
+            return eval(self.code, {'__builtins__': {}, **SAFE_FUNCTIONS}, namespace)
+        except Exception as exc:
+            raise StyleSpecError(f"{self.where}: 计算表达式 {self.source!r} 出错: {exc}") from exc
+
+    def __repr__(self):
+        return f"Expression({self.source!r})"
+
+
+def _parse_value(value, where):
+    """把描述中的值转换为常量或 Expression：字符串为表达式，列表逐项转换，其余原样保留"""
+    if isinstance(value, str):
+        return Expression(value, where)
+    if isinstance(value, list):
+        return [_parse_value(item, f"{where}[{index}]") for index, item in enumerate(value)]
+    if isinstance(value, dict):
+        return {key: _parse_value(item, f"{where}.{key}") for key, item in value.items()}
+    return value
+
+
+def _value_names(value):
+    """值中所有表达式引用的名称"""
+    if isinstance(value, Expression):
+        return value.names
+    if isinstance(value, list):
+        return frozenset().union(*map(_value_names, value)) if value else frozenset()
+    if isinstance(value, dict):
+        return _value_names(list(value.values()))
+    return frozenset()
+
+
+def _bind(value, namespace, static_names=None):
+    """
+    计算值中的表达式；static_names 不为 None 时只计算引用名称都在其中的表达式（编译阶段），其余原样保留
+    """
+    if isinstance(value, Expression):
+        if static_names is None or value.names <= static_names:
+            return value.evaluate(namespace)
+        return value
+    if isinstance(value, list):
+        items = [_bind(item, namespace, static_names) for item in value]
+        # 颜色、坐标等全部算好的列表转为元组，可直接传给 Pillow
+        return items if any(isinstance(item, Expression) for item in items) else tuple(items)
+    if isinstance(value, dict):
+        return {key: _bind(item, namespace, static_names) for key, item in value.items()}
+    return value
+
+
+# 元素类型 -> 允许的字段（除 type 和 when 外）
+ELEMENT_FIELDS = {
+    'text': ('text', 'font', 'size', 'fit', 'x', 'y', 'fill', 'rotate', 'background', 'id'),
+    'asset': ('asset', 'height', 'width', 'x', 'y', 'rotate', 'id', 'elements'),
+    'rect': ('box', 'fill', 'radius'),
+    'barcode': ('code', 'box'),
+    'dashed_line': ('x_start', 'x_end', 'y', 'dash_cm', 'gap_cm', 'width_cm', 'fill', 'dotted'),
+    'stripes': ('height_cm', 'bottom_margin_cm', 'stripe_width', 'fill', 'background'),
+}
+# 不能用作元素 id 的名称
+RESERVED_NAMES = frozenset(GEOMETRY_NAMES + CONTENT_NAMES + PANEL_NAMES + LOCAL_NAMES) | set(SAFE_FUNCTIONS)
+
+
+def _compile_elements(elements, namespace, static_names):
+    """编译阶段计算元素中只依赖尺寸的表达式；资源图片的子元素中 w / h 指图片尺寸，留到执行时计算"""
+    compiled = []
+    for element in elements:
+        item = {key: _bind(value, namespace, static_names) for key, value in element.items() if key != 'elements'}
+        if 'elements' in element:
+            item['elements'] = _compile_elements(element['elements'], namespace, static_names - set(PANEL_NAMES))
+        compiled.append(item)
+    return compiled
+
+
+# 带 id 的元素的位置和尺寸（文字为绘制原点和外框尺寸），供之后的元素引用
+ElementBounds = collections.namedtuple('ElementBounds', 'x y w h')
+
+
+class StyleSpec:
+    """解析并检查过的样式描述（所有表达式已编译），与尺寸无关"""
+
+    def __init__(self, data, source='<spec>'):
+        self.source = source
+        try:
+            self.name = data['name']
+            self.description = data.get('description', '')
+            self.required_params = list(data.get('required_params', []))
+            self.fonts = dict(data.get('fonts', {}))
+            self.assets = dict(data.get('assets', {}))
+            self.palette_colors = tuple(tuple(color) for color in data.get('palette_colors', BoxMarkStyle.palette_colors))
+            regions = data['regions']
+            panels = data['panels']
+        except (KeyError, TypeError) as exc:
+            raise StyleSpecError(f"{source}: 样式描述缺少字段 {exc}") from None
+        self.regions = {}
+        for region_name, region in regions.items():
+            where = f"{source}: regions.{region_name}"
+            if region.get('panel') not in panels:
+                raise StyleSpecError(f"{where}: 未定义的面板 {region.get('panel')!r}")
+            self.regions[region_name] = (_parse_value(region['box'], f"{where}.box"), region['panel'])
+        self.panels = {}
+        for panel_name, panel in panels.items():
+            self.panels[panel_name] = self._parse_panel(panel_name, panel, panels)
+
+    def _parse_panel(self, panel_name, panel, panels):
+        where = f"{self.source}: panels.{panel_name}"
+        if 'from' in panel:
+            if panel['from'] not in panels or 'from' in panels[panel['from']]:
+                raise StyleSpecError(f"{where}: from 只能引用直接绘制的面板，{panel['from']!r} 不可用")
+            return {'from': panel['from'], 'rotate': panel.get('rotate', 0)}
+        elements = self._parse_elements(panel.get('elements', []), where)
+        size = _parse_value(panel['size'], f"{where}.size")
+        if not _value_names(size) <= set(GEOMETRY_NAMES):
+            raise StyleSpecError(f"{where}.size: 面板尺寸只能由箱子尺寸决定")
+        return {
+            'size': size,
+            'background': _parse_value(panel.get('background', [255, 255, 255]), f"{where}.background"),
+            'elements': elements,
+        }
+
+    def _parse_elements(self, elements, where):
+        """检查并解析一组元素（资源图片的子元素递归解析）"""
+        parsed_elements = []
+        for index, element in enumerate(elements):
+            element_where = f"{where}.elements[{index}]"
+            kind = element.get('type')
+            if kind not in ELEMENT_FIELDS:
+                raise StyleSpecError(f"{element_where}: 未知的元素类型 {kind!r}，可选: {', '.join(ELEMENT_FIELDS)}")
+            unknown = set(element) - set(ELEMENT_FIELDS[kind]) - {'type', 'when'}
+            if unknown:
+                raise StyleSpecError(f"{element_where}: {kind} 元素不支持字段 {sorted(unknown)}")
+            if kind == 'text' and element.get('font') not in self.fonts:
+                raise StyleSpecError(f"{element_where}: 未定义的字体 {element.get('font')!r}")
+            if kind == 'asset' and element.get('asset') not in self.assets:
+                raise StyleSpecError(f"{element_where}: 未定义的资源 {element.get('asset')!r}")
+            if 'id' in element:
+                element_id = element['id']
+                if not (isinstance(element_id, str) and element_id.isidentifier()) or element_id in RESERVED_NAMES:
+                    raise StyleSpecError(f"{element_where}: id {element_id!r} 不是合法的名称或与内置名称重复")
+            fields = {key: value for key, value in element.items()
+                      if key not in ('type', 'font', 'asset', 'id', 'elements')}
+            parsed = {key: _parse_value(value, f"{element_where}.{key}") for key, value in fields.items()}
+            parsed['type'] = kind
+            for key in ('font', 'asset', 'id'):
+                if key in element:
+                    parsed[key] = element[key]
+            if 'elements' in element:
+                parsed['elements'] = self._parse_elements(element['elements'], element_where)
+            parsed_elements.append(parsed)
+        return parsed_elements
+
+    def content_fields(self, panel_name):
+        """面板引用的 SKU 内容字段（面板缓存键的一部分）"""
+        panel = self.panels[panel_name]
+        if 'from' in panel:
+            return self.content_fields(panel['from'])
+        names = _value_names(panel['background']) | _value_names(panel['elements'])
+        return tuple(name for name in CONTENT_NAMES if name in names)
+
+
+@functools.lru_cache(maxsize=None)
+def load_style_spec(path):
+    """读取并检查样式描述文件（按路径缓存）"""
+    path = Path.Path(path)
+    try:
+        data = json.loads(path.read_text(encoding='utf-8'))
+    except json.JSONDecodeError as exc:
+        raise StyleSpecError(f"{path.name}: JSON 格式错误: {exc}") from None
+    return StyleSpec(data, source=path.name)
+
+
+def geometry_namespace(sku_config):
+    """编译阶段可用的名称：箱子尺寸和分辨率"""
+    return {name: getattr(sku_config, name) for name in GEOMETRY_NAMES}
+
+
+def content_namespace(sku_config):
+    """执行阶段额外可用的名称：SKU 内容"""
+    return {name: getattr(sku_config, name) for name in CONTENT_NAMES}
+
+
+def _cm(values, dpi):
+    """像素坐标 -> cm"""
+    return tuple(value / dpi for value in values)
+
+
+@functools.lru_cache(maxsize=64)
+def _font(path, size):
+    return ImageFont.truetype(path, size=size)
+
+
+class RenderPlan:
+    """
+    样式描述在某个 (箱子尺寸, 分辨率) 下的渲染计划
+    regions: {区域名: ((x, y, 宽, 高), 面板名)}；panels: 面板名 -> 编译后的面板（尺寸和只依赖尺寸的参数已算好）
+    """
+
+    def __init__(self, spec, sku_config):
+        self.spec = spec
+        self.geometry = geometry_namespace(sku_config)
+        static_names = frozenset(GEOMETRY_NAMES)
+        self.regions = {}
+        for region_name, (box, panel_name) in spec.regions.items():
+            box = _bind(box, self.geometry, static_names)
+            if isinstance(box, list):
+                raise StyleSpecError(f"{spec.source}: regions.{region_name}.box 只能由箱子尺寸决定")
+            self.regions[region_name] = (box, panel_name)
+        self.panels = {}
+        for panel_name, panel in spec.panels.items():
+            if 'from' in panel:
+                self.panels[panel_name] = panel
+                continue
+            size = tuple(int(length) for length in _bind(panel['size'], self.geometry))
+            namespace = dict(self.geometry, w=size[0], h=size[1])
+            names = static_names | set(PANEL_NAMES)
+            self.panels[panel_name] = {
+                'size': size,
+                'background': _bind(panel['background'], namespace, names),
+                'elements': _compile_elements(panel['elements'], namespace, names),
+            }
+
+    def layout(self):
+        """样式的 get_layout_config 结果"""
+        return {region_name: box for region_name, (box, _) in self.regions.items()}
+
+    def panels_mapping(self):
+        return {region_name: panel_name for region_name, (_, panel_name) in self.regions.items()}
+
+    def resolve_panel(self, panel_name, sku_config, style):
+        """
+        计算面板中每个元素的最终参数（不绘图），返回 (尺寸, 背景色, 元素列表)
+        元素为 dict：type 之外的字段都是具体的值，text 元素附带 font_path、size、xy 和 background（底框，可为 None），
+        asset 元素附带 image（旋转后）、pixels（旋转前的缩放结果）、xy 和 elements（子元素，可为空）
+        """
+        panel = self.panels[panel_name]
+        namespace = dict(self.geometry, **content_namespace(sku_config), w=panel['size'][0], h=panel['size'][1])
+        background = _bind(panel['background'], namespace)
+        return panel['size'], background, self._resolve_elements(panel['elements'], namespace, style)
+
+    def _resolve_elements(self, elements, namespace, style):
+        namespace = dict(namespace)
+        resolved = []
+        for element in elements:
+            if 'when' in element and not _bind(element['when'], namespace):
+                continue
+            kind = element['type']
+            if kind == 'text':
+                item = self._resolve_text(element, namespace, style)
+            elif kind == 'asset':
+                item = self._resolve_asset(element, namespace, style)
+            else:
+                item = {key: _bind(value, namespace) for key, value in element.items() if key != 'when'}
+            if 'id' in element:
+                namespace[element['id']] = item['bounds']
+            resolved.append(item)
+        return resolved
+
+    def _resolve_text(self, element, namespace, style):
+        text = str(_bind(element['text'], namespace))
+        font_path = style.font_paths[element['font']]
+        fit = _bind(element.get('fit'), namespace)
+        if fit:
+            size = general_functions.get_max_font_size(
+                text, font_path, fit['width'], max_height=fit.get('height'),
+                min_size=fit.get('min_size', 10), max_size=fit.get('max_size', 1000))
+        else:
+            size = int(_bind(element['size'], namespace))
+        rotate = _bind(element.get('rotate', 0), namespace) % 360
+        draw = ImageDraw.Draw(Image.new('L', (1, 1)))
+        font = _font(font_path, size)
+        left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+        text_w, text_h = right - left, bottom - top
+        if rotate in (90, 270):
+            text_w, text_h = text_h, text_w
+        local = dict(namespace, text_w=text_w, text_h=text_h, text_len=draw.textlength(text, font=font))
+        xy = (_bind(element['x'], local), _bind(element['y'], local))
+        return {
+            'type': 'text', 'text': text, 'font_path': font_path, 'size': size, 'rotate': rotate, 'xy': xy,
+            'bbox': (left, top, right, bottom),
+            'fill': _bind(element.get('fill', [0, 0, 0]), namespace),
+            'background': self._text_background(element, namespace, xy, right - left, bottom - top),
+            'bounds': ElementBounds(xy[0], xy[1], text_w, text_h),
+        }
+
+    @staticmethod
+    def _text_background(element, namespace, xy, text_w, text_h):
+        """文字的圆角底框（与 general_functions.draw_rounded_bg_for_text_smooth 的尺寸和位置相同），没有时返回 None"""
+        background = _bind(element.get('background'), namespace)
+        if not background:
+            return None
+        padding_x, padding_y = background.get('padding_cm', (0.8, 0.3))
+        dpi = namespace['dpi']
+        px_padding_x = int(padding_x * dpi)
+        px_padding_y = int(padding_y * dpi)
+        x, y = xy
+        box = (x - px_padding_x, y - int(px_padding_y * 0.7),
+               x + text_w + px_padding_x, y + text_h + int(px_padding_y * 1.4))
+        return {'box': box, 'fill': background.get('fill', (0, 0, 0)), 'radius': background.get('radius', 15)}
+
+    def _resolve_asset(self, element, namespace, style):
+        height = _bind(element.get('height'), namespace)
+        width = _bind(element.get('width'), namespace)
+        image = style.scaled_resource(element['asset'], height=None if height is None else int(height),
+                                      width=None if width is None else int(width))
+        rotate = _bind(element.get('rotate', 0), namespace) % 360
+        pixels = image
+        if rotate:
+            image = image.rotate(rotate, expand=True)
+        local = dict(namespace, asset_w=image.width, asset_h=image.height)
+        xy = (int(_bind(element['x'], local)), int(_bind(element['y'], local)))
+        children = self._resolve_elements(element.get('elements', []), dict(namespace, w=pixels.width, h=pixels.height),
+                                          style)
+        return {
+            'type': 'asset', 'asset': element['asset'], 'image': image, 'pixels': pixels, 'rotate': rotate, 'xy': xy,
+            'elements': children, 'bounds': ElementBounds(xy[0], xy[1], image.width, image.height),
+        }
+
+    def record_panel(self, panel_name, sku_config, style):
+        """按计划记录一个面板的绘制操作（display_list.PanelRecording，坐标单位 cm）"""
+        size, background, elements = self.resolve_panel(panel_name, sku_config, style)
+        dpi = sku_config.dpi
+
+        return PanelRecording(_cm(size, dpi), background, self._record_items(elements, dpi, style))
+
+    def _record_items(self, elements, dpi, style):
+        """已计算的元素 -> 绘制操作（坐标单位 cm）"""
+        items = []
+        for element in elements:
+            kind = element['type']
+            if kind == 'text' and element['background']:
+                text_background = element['background']
+                items.append({'type': 'rect', 'box': _cm(text_background['box'], dpi), 'fill': text_background['fill'],
+                              'radius': text_background['radius'] / dpi})
+            if kind == 'text':
+                item = {'type': 'text', 'text': element['text'], 'font_path': element['font_path'],
+                        'size': element['size'] / dpi, 'xy': _cm(element['xy'], dpi), 'fill': element['fill'],
+                        'rotate': element['rotate']}
+            elif kind == 'asset':
+                item = {'type': 'image', 'image': style.resources[element['asset']], 'xy': _cm(element['xy'], dpi),
+                        'size': _cm(element['pixels'].size, dpi), 'rotate': element['rotate'],
+                        'pixels': element['pixels'], 'source': element['asset']}
+                if element['elements']:
+                    item['items'] = self._record_items(element['elements'], dpi, style)
+            elif kind == 'rect':
+                item = {'type': 'rect', 'box': _cm(element['box'], dpi), 'fill': element.get('fill', (0, 0, 0)),
+                        'radius': element.get('radius', 0) / dpi}
+            elif kind == 'barcode':
+                item = {'type': 'barcode', 'code': element['code'], 'box': _cm(element['box'], dpi)}
+            elif kind == 'stripes':
+                item = {'type': 'stripes', 'height_cm': element['height_cm'],
+                        'bottom_margin_cm': element.get('bottom_margin_cm', 0),
+                        'stripe_width': element.get('stripe_width', 30) / dpi,
+                        'fill': element.get('fill', (0, 0, 0)), 'background': element.get('background', (255, 255, 255))}
+            else:
+                item = dict(element, x_start=element['x_start'] / dpi, x_end=element['x_end'] / dpi,
+                            y=element['y'] / dpi)
+            items.append(item)
+        return items
+
+    def draw_panel(self, panel_name, sku_config, style):
+        """按计划绘制一个面板（按 sku_config 的分辨率回放其绘制记录），返回 RGB 图片"""
+        return self.record_panel(panel_name, sku_config, style).rasterize(sku_config.ppi)
+
+    def dry_run(self, sku_config, style):
+        """不绘图，返回 {面板名: (尺寸, 背景色, 元素列表)}，派生面板为 {'from': ..., 'rotate': ...}"""
+        return {panel_name: panel if 'from' in panel else self.resolve_panel(panel_name, sku_config, style)
+                for panel_name, panel in self.panels.items()}
+
+
+class SpecStyle(BoxMarkStyle):
+    """
+    声明式样式的基类：子类只需指定 spec_path（用 register_style_spec 生成并注册）
+    渲染计划按 (尺寸, 分辨率) 缓存在 plan_cache 中，面板按引用的 SKU 字段缓存在 panel_cache 中
+    """
+
+    spec_path = None
+    vector_output = True
+
+    def __init__(self, base_dir, ppi=300):
+        self.spec = load_style_spec(self.spec_path)
+        self.palette_colors = self.spec.palette_colors
+        self.plan_cache = PanelCache(max_entries=64)
+        super().__init__(base_dir, ppi)
+
+    def get_style_name(self):
+        return self.spec.name
+
+    def get_style_description(self):
+        return self.spec.description
+
+    def get_required_params(self):
+        return self.spec.required_params
+
+    def _load_resources(self):
+        assets_dir = Path.Path(self.base_dir) / 'assets'
+        self.resources = {name: open_asset(assets_dir / path) for name, path in self.spec.assets.items()}
+
+    def _load_fonts(self):
+        assets_dir = Path.Path(self.base_dir) / 'assets'
+        self.font_paths = {name: asset_file(assets_dir / path) for name, path in self.spec.fonts.items()}
+
+    def render_plan(self, sku_config):
+        """返回 sku_config 尺寸下的渲染计划（按尺寸和分辨率缓存）"""
+        key = tuple(getattr(sku_config, name) for name in GEOMETRY_KEY_FIELDS)
+        return self.plan_cache.get_or_create(key, lambda: RenderPlan(self.spec, sku_config))
+
+    def get_layout_config(self, sku_config):
+        return self.render_plan(sku_config).layout()
+
+    def get_panels_mapping(self, sku_config):
+        return self.render_plan(sku_config).panels_mapping()
+
+    def generate_panel(self, panel_name, sku_config):
+        """生成一个面板，按 (面板, 尺寸, 面板引用的 SKU 字段) 缓存"""
+        plan = self.render_plan(sku_config)
+        panel = plan.panels[panel_name]
+        if 'from' in panel:
+            source = self.generate_panel(panel['from'], sku_config)
+            return source.rotate(panel['rotate'], expand=True) if panel['rotate'] else source
+        fields = PANEL_BASE_FIELDS + GEOMETRY_KEY_FIELDS + self.spec.content_fields(panel_name)
+        key = ('spec', self.spec.name, panel_name) + tuple(_resolve_field(sku_config, field) for field in fields)
+        return self.panel_cache.get_or_create(key, lambda: plan.draw_panel(panel_name, sku_config, self))
+
+    def render_panels(self, sku_config, executor=None):
+        """生成所有面板；传入 executor（如 ThreadPoolExecutor）时各面板并行绘制"""
+        names = list(self.render_plan(sku_config).panels)
+        if executor is None:
+            images = [self.generate_panel(name, sku_config) for name in names]
+        else:
+            images = list(executor.map(lambda name: self.generate_panel(name, sku_config), names))
+        return dict(zip(names, images))
+
+    def generate_all_panels(self, sku_config):
+        return self.render_panels(sku_config)
+
+    def record_panels(self, sku_config):
+        """记录所有面板的绘制操作（与分辨率无关），返回 {面板名: (面板记录, 旋转角度)}"""
+        plan = self.render_plan(sku_config)
+        recordings = {name: (plan.record_panel(name, sku_config, self), 0)
+                      for name, panel in plan.panels.items() if 'from' not in panel}
+        for name, panel in plan.panels.items():
+            if 'from' in panel:
+                recordings[name] = (recordings[panel['from']][0], panel['rotate'])
+        return recordings
+
+    def dry_run(self, sku_config):
+        """计算所有面板的最终排版参数而不绘图，见 RenderPlan.dry_run"""
+        return self.render_plan(sku_config).dry_run(sku_config, self)
+
+
+def register_style_spec(path):
+    """为样式描述文件生成 SpecStyle 子类并注册到 StyleRegistry，返回该类"""
+    spec = load_style_spec(path)
+    class_name = ''.join(part.capitalize() for part in spec.name.split('_')) + 'Style'
+    style_class = type(class_name, (SpecStyle,), {'spec_path': Path.Path(path), '__doc__': spec.description})
+    return StyleRegistry.register(style_class)
+
+
+def register_style_specs(directory):
+    """注册目录下所有 *.json 样式描述文件，返回注册的样式类列表"""
+    return [register_style_spec(path) for path in sorted(Path.Path(directory).glob('*.json'))]
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+SVG 输出 - 把绘制记录（display_list.DisplayList）写成 SVG，供局域网内的网页预览和打样
+- 坐标单位为 cm（viewBox 与 width / height 的 cm 一致），浏览器缩放不失真
+- 文字输出为 <text>，字体用 @font-face 引用样式的字体文件；条码、虚线和斜纹输出为矢量图形，区域边框为描边
+- 每个资源图片、每种字体只引用（或内嵌）一次，重复使用的图片和面板用 <use> 引用
+- 只支持声明式样式（style_spec）：Python 样式类的面板在记录中是整幅图片，写成 SVG 只是包了一层的位图，直接拒绝
+
+asset_href(path) 把字体 / 资源图片的文件路径映射为 URL（如 HTTP 服务的 /assets/...），
+返回 None 或不传时以 data: URI 内嵌，生成的 SVG 可单独保存打开
+
+用法:
+    display_list = generator.record_display_list(sku_config)
+    svg_text = display_list_to_svg(display_list)
+"""
+import base64
+import io
+import mimetypes
+import pathlib as Path
+from xml.sax.saxutils import escape, quoteattr
+
+import barcode
+from PIL import ImageFont
+
+
+# python-barcode 的 ImageWriter 默认模块宽度 0.2 mm、左右留白 1 mm（generate_barcode_image 的设置），即每侧 5 个模块
+BARCODE_QUIET_MODULES = 5
+# 测量字体度量时使用的字号（结果按实际字号等比换算）
+METRICS_FONT_SIZE = 1000
+# 区域边框在屏幕上的线宽（像素，non-scaling-stroke，缩放时保持不变）
+STROKE_WIDTH_PX = 1.5
+
+
+def _num(value):
+    """坐标输出为最多 4 位小数（cm，精度 1 微米）"""
+    text = f"{value:.4f}".rstrip('0').rstrip('.')
+    return '0' if text in ('', '-0') else text
+
+
+def _color(rgb):
+    return '#{:02x}{:02x}{:02x}'.format(*rgb[:3])
+
+
+def _data_uri(data, mime):
+    return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def _rotated_transform(x, y, width, height, rotate):
+    """
+    与 PIL rotate(angle, expand=True) 后粘贴到 (x, y) 相同的变换：内容 (0, 0, width, height) 绕中心逆时针旋转 rotate 度，
+    旋转后的外接矩形左上角位于 (x, y)
+    """
+    if not rotate:
+        return f"translate({_num(x)},{_num(y)})"
+    box_w, box_h = (height, width) if rotate % 180 == 90 else (width, height)
+    return (f"translate({_num(x + box_w / 2)},{_num(y + box_h / 2)}) rotate({_num(-rotate)}) "
+            f"translate({_num(-width / 2)},{_num(-height / 2)})")
+
+
+class SVGBuilder:
+    """把一个 DisplayList 转为 SVG 文本，资源图片、字体和面板按对象去重"""
+
+    def __init__(self, display_list, asset_href=None):
+        if any(panel.max_ppi is not None for panel in display_list.panels()):
+            raise ValueError("绘制记录中有整幅图片记录的面板（Python 样式），不能输出为 SVG，请使用 PDF 或 PNG")
+        self.display_list = display_list
+        self.asset_href = asset_href
+        self.defs = []
+        self._fonts = {}    # 字体路径 -> font-family 名
+        self._metrics = {}  # 字体路径 -> 测量用字体
+        self._images = {}   # id(图片) -> defs 中的 id
+        self._panels = {}   # id(面板记录) -> defs 中的 id
+
+    # --- 外部文件 ---
+
+    def _href(self, path, mime):
+        href = self.asset_href(path) if self.asset_href else None
+        return href or _data_uri(Path.Path(path).read_bytes(), mime)
+
+    def _font_family(self, font_path):
+        family = self._fonts.get(font_path)
+        if family is None:
+            family = self._fonts[font_path] = f"boxmark-font-{len(self._fonts)}"
+        return family
+
+    def _font_metrics(self, font_path):
+        font = self._metrics.get(font_path)
+        if font is None:
+            font = self._metrics[font_path] = ImageFont.truetype(font_path, size=METRICS_FONT_SIZE)
+        return font
+
+    def _image_id(self, image, linked):
+        """
+        图片在 defs 中定义一次（1x1 单位大小，引用时按目标尺寸缩放）
+        linked 为 True（样式资源）时引用其源文件，否则内嵌 PNG
+        """
+        image_id = self._images.get(id(image))
+        if image_id is not None:
+            return image_id
+        image_id = self._images[id(image)] = f"image-{len(self._images)}"
+        source = image.info.get('asset_source') if linked else None
+        if source:
+            href = self._href(source, mimetypes.guess_type(source)[0] or 'image/png')
+        else:
+            # 没有源文件的图片：内嵌 PNG
+            buffer = io.BytesIO()
+            image.save(buffer, 'PNG', optimize=True)
+            href = _data_uri(buffer.getvalue(), 'image/png')
+        self.defs.append(f'<image id="{image_id}" width="1" height="1" preserveAspectRatio="none" href="{href}"/>')
+        return image_id
+
+    # --- 绘制操作 ---
+
+    def _image(self, item):
+        width, height = item['size']
+        transform = _rotated_transform(item['xy'][0], item['xy'][1], width, height, item['rotate'])
+        image_id = self._image_id(item['image'], 'source' in item)
+        if not item.get('items'):
+            return f'<use href="#{image_id}" transform="{transform} scale({_num(width)},{_num(height)})"/>'
+        # 图片上的操作坐标相对图片，与图片一起变换
+        return (f'<g transform="{transform}"><use href="#{image_id}" transform="scale({_num(width)},{_num(height)})"/>'
+                f'{self._items(item["items"], item["size"])}</g>')
+
+    def _text(self, item):
+        font = self._font_metrics(item['font_path'])
+        scale = item['size'] / METRICS_FONT_SIZE
+        ascent = font.getmetrics()[0] * scale
+        attrs = (f'font-family="{self._font_family(item["font_path"])}" font-size="{_num(item["size"])}" '
+                 f'fill="{_color(item["fill"])}"')
+        text = escape(item['text'])
+        x, y = item['xy']
+        if not item['rotate']:
+            # ImageDraw.text 的坐标是文字顶部（上升线），SVG 的 y 是基线
+            return f'<text x="{_num(x)}" y="{_num(y + ascent)}" {attrs}>{text}</text>'
+        left, top, right, bottom = (value * scale for value in font.getbbox(item['text']))
+        transform = _rotated_transform(x, y, right - left, bottom - top, item['rotate'])
+        return (f'<g transform="{transform}"><text x="{_num(-left)}" y="{_num(ascent - top)}" {attrs}>'
+                f'{text}</text></g>')
+
+    def _rect(self, item):
+        # ImageDraw.rectangle 的右下角像素包含在内
+        pixel = 2.54 / self.display_list.ppi
+        x0, y0, x1, y1 = item['box']
+        radius = item.get('radius', 0)
+        rounded = f' rx="{_num(radius)}"' if radius > 0 else ''
+        return (f'<rect x="{_num(x0)}" y="{_num(y0)}" width="{_num(x1 - x0 + pixel)}" '
+                f'height="{_num(y1 - y0 + pixel)}"{rounded} fill="{_color(item.get("fill", (0, 0, 0)))}"/>')
+
+    def _barcode(self, item):
+        """Code128 按模块输出为矢量竖条（相邻的黑色模块合并为一个矩形）"""
+        x, y, width, height = item['box']
+        modules = barcode.get_barcode_class('code128')(str(item['code'])).build()[0]
+        module_w = width / (len(modules) + 2 * BARCODE_QUIET_MODULES)
+        bars = []
+        start = None
+        for index, bit in enumerate(modules + '0'):
+            if bit == '1' and start is None:
+                start = index
+            elif bit != '1' and start is not None:
+                bar_x = x + (BARCODE_QUIET_MODULES + start) * module_w
+                bars.append(f'<rect x="{_num(bar_x)}" y="{_num(y)}" width="{_num((index - start) * module_w)}" '
+                            f'height="{_num(height)}"/>')
+                start = None
+        return f'<g fill="#000000">{"".join(bars)}</g>'
+
+    def _dashed_line(self, item):
+        width = item.get('width_cm', 0.025)
+        gap = item.get('gap_cm', 0.13)
+        if item.get('dotted'):
+            dash = f'stroke-dasharray="0 {_num(width + gap)}" stroke-linecap="round"'
+        else:
+            dash = f'stroke-dasharray="{_num(item.get("dash_cm", 0.17))} {_num(gap)}"'
+        return (f'<line x1="{_num(item["x_start"])}" y1="{_num(item["y"])}" x2="{_num(item["x_end"])}" '
+                f'y2="{_num(item["y"])}" stroke="{_color(item.get("fill", (0, 0, 0)))}" '
+                f'stroke-width="{_num(width)}" {dash}/>')
+
+    def _stripes(self, item, size):
+        """斜纹条块：底色矩形 + 裁剪到条块范围内的平行四边形（斜纹位置与 draw_diagonal_stripes 相同）"""
+        panel_w, panel_h = size
+        stripe_h = item['height_cm']
+        top = panel_h - item['bottom_margin_cm'] - stripe_h
+        bottom = top + stripe_h
+        stripe_w = item['stripe_width']
+        offset = stripe_w * 1.5
+        clip_id = f"stripes-{len(self.defs)}"
+        self.defs.append(f'<clipPath id="{clip_id}"><rect x="0" y="{_num(top)}" width="{_num(panel_w)}" '
+                         f'height="{_num(stripe_h)}"/></clipPath>')
+        stripes = []
+        for index in range(int((panel_w + stripe_h) / offset) + 2):
+            x = index * offset - stripe_h
+            points = ((x, bottom), (x + stripe_w, bottom), (x + stripe_w + stripe_h, top), (x + stripe_h, top))
+            stripes.append(f'<polygon points="{" ".join(f"{_num(px)},{_num(py)}" for px, py in points)}"/>')
+        return (f'<g clip-path="url(#{clip_id})"><rect x="0" y="{_num(top)}" width="{_num(panel_w)}" '
+                f'height="{_num(stripe_h)}" fill="{_color(item["background"])}"/>'
+                f'<g fill="{_color(item["fill"])}">{"".join(stripes)}</g></g>')
+
+    def _panel_id(self, panel):
+        """面板在 defs 中定义一次，多个区域用 <use> 引用"""
+        panel_id = self._panels.get(id(panel))
+        if panel_id is not None:
+            return panel_id
+        panel_id = self._panels[id(panel)] = f"panel-{len(self._panels)}"
+        width, height = panel.size
+        background = f'<rect width="{_num(width)}" height="{_num(height)}" fill="{_color(panel.background)}"/>'
+        self.defs.append(f'<g id="{panel_id}">{background}{self._items(panel.items, panel.size)}</g>')
+        return panel_id
+
+    def _items(self, items, size):
+        """一组绘制操作（size 为所在面板或图片的尺寸）"""
+        writers = {'image': self._image, 'text': self._text, 'rect': self._rect,
+                   'barcode': self._barcode, 'dashed_line': self._dashed_line,
+                   'stripes': lambda item: self._stripes(item, size)}
+        return ''.join(writers[item['type']](item) for item in items)
+
+    # --- 整体 ---
+
+    def build(self):
+        display_list = self.display_list
+        width, height = display_list.size
+        body = []
+        for panel, region_name, (x, y), rotate in display_list.placements:
+            transform = _rotated_transform(x, y, panel.size[0], panel.size[1], rotate)
+            body.append(f'<use href="#{self._panel_id(panel)}" transform="{transform}" data-region={quoteattr(region_name)}/>')
+        # vector-effect 不继承，需要写在每个边框上
+        strokes = ''.join(f'<rect x="{_num(x)}" y="{_num(y)}" width="{_num(w)}" height="{_num(h)}" '
+                          f'vector-effect="non-scaling-stroke"/>'
+                          for x, y, w, h in display_list.strokes)
+        body.append(f'<g fill="none" stroke="#000000" stroke-width="{STROKE_WIDTH_PX}">{strokes}</g>')
+        font_faces = ''.join(
+            f"@font-face{{font-family:'{family}';src:url('{self._href(path, 'font/ttf')}');}}"
+            for path, family in self._fonts.items())
+        style = f'<style>{escape(font_faces)}</style>' if font_faces else ''
+        return (f'<?xml version="1.0" encoding="UTF-8"?>\n'
+                f'<svg xmlns="http://www.w3.org/2000/svg" width="{_num(width)}cm" height="{_num(height)}cm" '
+                f'viewBox="0 0 {_num(width)} {_num(height)}">'
+                f'{style}<defs>{"".join(self.defs)}</defs>'
+                f'<rect width="{_num(width)}" height="{_num(height)}" fill="#ffffff"/>{"".join(body)}</svg>')
+
+
+def display_list_to_svg(display_list, asset_href=None):
+    """
+    把绘制记录写成 SVG 文本（只支持声明式样式的记录，含整幅图片面板时抛出 ValueError）
+    参数：
+        asset_href: 字体 / 资源图片文件路径 -> URL 的函数，返回 None 或不传时以 data: URI 内嵌
+    """
+    return SVGBuilder(display_list, asset_href=asset_href).build()